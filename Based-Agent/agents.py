@@ -1,19 +1,35 @@
+import functools
+import inspect
 import json
-from swarm import Agent
-from cdp import *
-from typing import List, Dict, Any
 import os
-from openai import OpenAI
+import sys
+import threading
+import time
+import uuid
 from decimal import Decimal
 from typing import Union
-from web3 import Web3
-from web3.exceptions import ContractLogicError
-from cdp.errors import ApiError, UnsupportedAssetError
-from config import TWITTER_CONFIG
 
-# Configure the CDP SDK
-# This loads the API key from a JSON file. Make sure this file exists and contains valid credentials.
-Cdp.configure_from_json("./Based-Agent/cdp_api_key.json")
+from swarm import Agent
+
+from journal_utils import OperationJournal, describe_entry, receipt_status
+from metrics_utils import metrics
+from openai_utils import ArtCache, get_openai_client
+from registry_utils import ContractRegistry, describe_contract
+from render_utils import get_renderer
+from swarm_utils import wallet_lock
+from tx_utils import (
+    TransactionWatcher,
+    TransferCoalescer,
+    reports_status,
+    transaction_hash,
+    transaction_status,
+)
+from wallet_utils import BalanceCache, LazyWallet
+
+# The CDP SDK, web3, tweepy and the OpenAI client are imported inside the
+# functions that need them. Importing this module therefore doesn't touch the
+# network, which keeps restarts fast and lets other processes read the tool
+# schemas without credentials.
 
 # Create a new wallet on the Base Sepolia testnet
 # You could make this a function for the agent to create a wallet on any network
@@ -36,27 +52,462 @@ Cdp.configure_from_json("./Based-Agent/cdp_api_key.json")
 # agent_wallet.save_seed(file_path, encrypt=True)
 # print(f"Seed for wallet {agent_wallet.id} saved to {file_path}")
 
-# # Example of loading a saved wallet:
-# # 1. Fetch the wallet by ID
-fetched_wallet = Wallet.fetch("9dfbb57e-888e-4d64-96ae-70699c0a7b7c")
-# # 2. Load the saved seed
-fetched_wallet.load_seed("wallet_seed.json")
-agent_wallet = fetched_wallet
-wallet_data = agent_wallet.export_data()
-wallet_dict = wallet_data.to_dict()
-print(agent_wallet.default_address)
+# The saved wallet is fetched by ID and its seed loaded the first time a tool
+# touches agent_wallet (see wallet_utils.py). Set CDP_API_KEY_FILE,
+# CDP_WALLET_ID and CDP_WALLET_SEED_FILE to use a different wallet.
+agent_wallet = LazyWallet()
+
+# Balances are cached per wallet and asset for BALANCE_CACHE_TTL seconds.
+# Tools that move funds adjust or invalidate the entries they affect.
+balance_cache = BalanceCache()
 # Example of importing previously exported wallet data:
 # imported_wallet = Wallet.import_data(wallet_dict)
 
 
 
 
+# Confirm-later mode: when enabled, on-chain tools return a pending operation
+# ID as soon as the transaction is submitted instead of waiting for it to be
+# confirmed. One background watcher polls every in-flight transaction, and the
+# agent follows up with check_pending_operations. Enable with
+# BASED_AGENT_CONFIRM_LATER=1.
+CONFIRM_LATER = (os.environ.get("BASED_AGENT_CONFIRM_LATER", "").lower()
+                 in ("1", "true", "yes"))
+tx_watcher = TransactionWatcher()
+# Time from submission to a final state, for everything the watcher confirms
+tx_watcher.add_listener(lambda operation: metrics.observe(
+    "confirmation_seconds", operation.confirmed_at - operation.submitted_at,
+    tool=operation.kind))
+
+# Onchain tools are journaled: each call is appended to BASED_AGENT_JOURNAL
+# with an idempotency key and its transaction hashes before we wait on it. An
+# identical call made within BASED_AGENT_DEDUPE_SECONDS while the first is
+# still in flight (or was interrupted) is not sent again unless it passes
+# repeat=true, and calls left in flight by a crash are reconciled against the
+# chain on the next start. Finished calls can always be repeated.
+operation_journal = OperationJournal()
+_journal_context = threading.local()
+_journal_active_keys = set()
+_journal_reconciled = False
+_journal_reconcile_lock = threading.Lock()
+
+def check_transaction_receipt(tx_hash):
+    """Onchain status of a transaction: "complete", "failed" or None if unmined."""
+    return receipt_status(tx_hash, agent_wallet.network_id)
+
+def reconcile_journal():
+    """
+    Settle journal entries left in flight by an earlier run. Runs once, before the
+    first journaled tool call.
+    
+    Returns:
+        list: The reconciled entries
+    """
+    global _journal_reconciled
+    with _journal_reconcile_lock:
+        if _journal_reconciled:
+            return []
+        _journal_reconciled = True
+        entries = operation_journal.reconcile(check_transaction_receipt,
+                                              active_keys=set(_journal_active_keys))
+    for entry in entries:
+        hashes = ", ".join(entry.get("tx_hashes") or []) or "no transaction recorded"
+        get_renderer().status(f"Journal: {entry['tool']} from an earlier run is "
+                              f"{entry['status']} ({hashes})")
+    return entries
+
+def journal_submitted(*submitted):
+    """Record the transactions the current journaled tool call just submitted."""
+    key = getattr(_journal_context, "key", None)
+    if key:
+        operation_journal.submitted(key,
+                                    [transaction_hash(item) for item in submitted])
+
+def journal_failed(error):
+    """Finish the current journaled call's entry as failed onchain."""
+    key = getattr(_journal_context, "key", None)
+    if key and operation_journal.get(key)["status"] != "failed":
+        operation_journal.finish(key, "failed", error=error)
+
+def journal_follow(operations):
+    """
+    Finish the current call's journal entry once its watcher operations settle.
+    
+    Used when a tool returns before its transactions are final (confirm-later
+    mode or a batch that outlived its wait).
+    
+    Args:
+        operations (list): PendingOperations submitted by the call
+    """
+    key = getattr(_journal_context, "key", None)
+    if not key or not operations:
+        return
+    _journal_context.following = True
+
+    def follow():
+        tx_watcher.wait(operations)
+        summaries = [operation.summary() for operation in operations]
+        statuses = [operation.status for operation in operations]
+        # A timeout only means the watcher stopped waiting. The entry stays
+        # "submitted", so the next identical call asks the chain for the receipts
+        if "timeout" not in statuses:
+            if "complete" not in statuses:
+                operation_journal.finish(key, "failed", error="; ".join(summaries))
+            else:
+                operation_journal.finish(key, "complete", result="\n".join(summaries))
+        _journal_active_keys.discard(key)
+
+    threading.Thread(target=follow, name="journal-follow", daemon=True).start()
+
+def journaled(func):
+    """
+    Journal an onchain tool: hold back repeats of identical calls that are still
+    unfinished and record the rest.
+    
+    The tool gains a `repeat` argument; repeat=true sends the call even if an
+    identical one is still pending or was interrupted.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, repeat: bool = False, **kwargs):
+        call = signature.bind(*args, **kwargs)
+        call.apply_defaults()
+        arguments = dict(call.arguments)
+        key = operation_journal.key(agent_wallet.wallet_id, func.__name__,
+                                    arguments)
+        if not _journal_reconciled:
+            reconcile_journal()
+
+        recorded = operation_journal.recent(key)
+        # An identical transfer made while the first is still in its coalescing
+        # window joins the merged transaction instead of being held back
+        merging = recorded is not None and joins_open_transfer(func.__name__,
+                                                               arguments)
+        if recorded and not repeat and not merging:
+            if recorded["status"] == "submitted" and key not in _journal_active_keys:
+                # Left unresolved earlier (e.g. a confirmation timeout): ask the chain
+                # before answering, so a call that did go through is reported rather
+                # than sent twice
+                try:
+                    recorded = operation_journal.resolve(recorded,
+                                                         check_transaction_receipt)
+                except Exception as e:
+                    print(f"Error checking journal entry {key}: {str(e)}",
+                          file=sys.stderr)
+            if recorded["status"] != "failed":
+                return describe_entry(recorded)
+        if recorded and (repeat or merging):
+            # Its own entry, so the unfinished call's record is kept
+            key = f"{key}-{uuid.uuid4().hex[:8]}"
+
+        operation_journal.start(key, func.__name__, arguments)
+        _journal_active_keys.add(key)
+        _journal_context.key, _journal_context.following = key, False
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            entry = operation_journal.get(key)
+            if entry["status"] == "started":
+                operation_journal.finish(key, "rejected", error=str(e))
+            _journal_active_keys.discard(key)
+            raise
+        finally:
+            following = _journal_context.following
+            _journal_context.key = None
+
+        entry = operation_journal.get(key)
+        if entry["status"] == "started":
+            # Nothing was submitted (validation or balance error); a retry is fine
+            operation_journal.finish(key, "rejected", result=str(result))
+        elif (entry["status"] == "submitted" and not following
+              and not str(result).startswith(("Error", "Unexpected error"))):
+            operation_journal.finish(key, "complete", result=str(result))
+        if not following:
+            _journal_active_keys.discard(key)
+        return result
+
+    # Offer repeat to the model alongside the tool's own arguments
+    wrapper.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter("repeat", inspect.Parameter.KEYWORD_ONLY, default=False,
+                          annotation=bool),
+    ])
+    return wrapper
+
+def pending_message(description, operation):
+    """What a tool reports for a transaction handed to the watcher."""
+    return (f"Submitted {description}. Pending operation {operation.id}; "
+            "use check_pending_operations to follow it up.")
+
+def confirm_transaction(kind, submitted, description, on_complete, assets=("eth",)):
+    """
+    Wait for a submitted transaction, or hand it to the watcher in confirm-later mode.
+    
+    Args:
+        kind (str): Name of the tool that submitted the transaction
+        submitted: The object returned by the CDP wallet call
+        description (str): What was submitted, used in the pending message
+        on_complete (Callable): Builds the success message from the confirmed object
+        assets (tuple): Assets whose cached balances are stale once the transaction
+            settles
+    
+    Returns:
+        str: The success message, or the pending operation handle
+    """
+    journal_submitted(submitted)
+    if CONFIRM_LATER:
+        operation = tx_watcher.track(
+            kind,
+            submitted,
+            description,
+            on_complete,
+            on_finish=lambda _: balance_cache.invalidate(agent_wallet, *assets),
+        )
+        journal_follow([operation])
+        return pending_message(description, operation)
+    start = time.perf_counter()
+    try:
+        submitted.wait()
+    finally:
+        balance_cache.invalidate(agent_wallet, *assets)
+        metrics.observe("confirmation_seconds", time.perf_counter() - start,
+                        tool=kind)
+    if transaction_status(submitted) == "failed":
+        journal_failed(f"the {description} failed onchain")
+        return f"Error: the {description} failed onchain."
+    return on_complete(submitted)
+
+# Tokens and NFT collections the agent deploys are remembered in
+# BASED_AGENT_CONTRACTS (contracts.json), filed under the wallet that deployed
+# them, so tools accept their symbols or names and an unsupported-asset error
+# for a fresh token can be explained.
+contract_registry = ContractRegistry()
+
+def registry_scope():
+    """The (network, wallet address) the agent's registry entries are filed under."""
+    return agent_wallet.network_id, agent_wallet.default_address.address_id
+
+def resolve_asset(asset_id):
+    """
+    Contract address of a token this agent deployed, looked up by symbol or name;
+    anything else is returned unchanged.
+    """
+    if asset_id.lower() in ("eth", "usdc") or asset_id.lower().startswith("0x"):
+        return asset_id
+    return contract_registry.resolve(asset_id, *registry_scope(), kind="erc20")
+
+def unsupported_asset_message(asset_id, asset_address):
+    """
+    Error for a token CDP reported as unsupported, explaining the indexing delay for
+    tokens this agent deployed.
+    
+    Args:
+        asset_id (str): Asset as the agent named it
+        asset_address (str): Resolved contract address
+    
+    Returns:
+        str: The error message
+    """
+    entry = contract_registry.lookup(asset_address, *registry_scope(), kind="erc20")
+    if entry is None:
+        return (f"Error: The asset {asset_id} is not supported on this network. "
+                "It may have been recently deployed. Please try again in about 30 "
+                "minutes.")
+    age_minutes = (time.time() - entry["deployed_at"]) / 60
+    wait = contract_registry.expected_index_wait(entry)
+    retry = (f"in about {max(1, round(wait / 60))} minutes" if wait
+             else "in a few minutes")
+    return (f"Error: {entry['symbol']} ({asset_address}) was deployed "
+            f"{age_minutes:.0f} minutes ago and isn't indexed by CDP yet, so it can't "
+            f"be used in transfers or balance checks. Try again {retry}.")
+
+# Transfer coalescing: with BASED_AGENT_COALESCE_SECONDS set, transfer_asset
+# holds each transfer for that many seconds, and transfers of the same asset to
+# the same address made meanwhile go out as one transaction (one gas fee, one
+# confirmation). Every caller gets the merged transaction's result. Off by
+# default.
+COALESCE_SECONDS = float(os.environ.get("BASED_AGENT_COALESCE_SECONDS", "0"))
+
+def is_gasless(asset_id):
+    """USDC transfers on Base Mainnet are sent gasless."""
+    return agent_wallet.network_id == "base-mainnet" and asset_id.lower() == "usdc"
+
+class InsufficientBalanceError(ValueError):
+    """A merged transfer would spend more than the wallet holds."""
+
+def send_merged_transfer(amount, asset_id, destination_address):
+    # Each caller checked its own amount; the merged total has to fit the balance
+    # as well
+    if asset_id.lower() not in ("eth", "usdc"):
+        balance = balance_cache.get(agent_wallet, asset_id)
+        if balance < Decimal(str(amount)):
+            raise InsufficientBalanceError(
+                f"Insufficient balance. You have {balance} {asset_id}, but transfers "
+                f"to {destination_address} made together add up to {amount}.")
+    # Taken here rather than by the tool runner, so the wallet isn't locked while
+    # the window is open
+    with wallet_lock:
+        return agent_wallet.transfer(amount, asset_id, destination_address,
+                                     gasless=is_gasless(asset_id))
+
+transfer_coalescer = (TransferCoalescer(send_merged_transfer, COALESCE_SECONDS)
+                      if COALESCE_SECONDS > 0 else None)
+
+def joins_open_transfer(tool, arguments):
+    """Whether a call is a transfer that would join a still-open coalescing group."""
+    if tool != "transfer_asset" or transfer_coalescer is None:
+        return False
+    return transfer_coalescer.is_open(resolve_asset(str(arguments["asset_id"])),
+                                      str(arguments["destination_address"]))
+
+def coalesced_transfer(amount, asset_id, destination_address):
+    """
+    Send a transfer through the coalescing queue and confirm the merged transaction
+    once.
+    
+    Args:
+        amount (Union[int, float, Decimal]): This caller's amount
+        asset_id (str): Asset to send
+        destination_address (str): Recipient's address
+    
+    Returns:
+        str: The merged transaction's result, shared by every caller that joined
+            it
+    """
+    group = transfer_coalescer.transfer(amount, asset_id, destination_address)
+    if isinstance(group.error, InsufficientBalanceError):
+        return str(group.error)
+    if group.error is not None:
+        raise group.error
+    balance_cache.adjust(agent_wallet, asset_id, -Decimal(str(amount)))
+    if group.count > 1:
+        metrics.increment("transfers_coalesced_total", asset=asset_id.lower())
+    gasless_msg = " (gasless)" if is_gasless(asset_id) else ""
+    combined_msg = (f" ({group.count} transfers combined into one transaction)"
+                    if group.count > 1 else "")
+    description = (f"transfer of {group.total} {asset_id} to "
+                   f"{destination_address}{combined_msg}")
+    assets = (asset_id,) if is_gasless(asset_id) else (asset_id, "eth")
+
+    def on_complete(_):
+        return (f"Transferred {group.total} {asset_id}{gasless_msg} to "
+                f"{destination_address}{combined_msg}")
+
+    # Every caller journals the shared hash; only the first confirms or tracks it
+    journal_submitted(group.submitted)
+    if CONFIRM_LATER:
+        operation = group.once("operation", lambda: tx_watcher.track(
+            "transfer_asset",
+            group.submitted,
+            description,
+            on_complete,
+            on_finish=lambda _: balance_cache.invalidate(agent_wallet, *assets),
+        ))
+        journal_follow([operation])
+        return pending_message(description, operation)
+    result = group.once("result", lambda: confirm_transaction(
+        "transfer_asset", group.submitted, description, on_complete, assets=assets
+    ))
+    # Only the first caller confirmed; the others' entries share its outcome
+    if transaction_status(group.submitted) == "failed":
+        journal_failed(f"the {description} failed onchain")
+    return result
+
+# Seconds a batch tool waits for all of its transactions before reporting. The
+# watcher gives up on a transaction after the same time, so a batch never
+# outwaits the operations it is waiting on.
+BATCH_CONFIRM_TIMEOUT = tx_watcher.timeout_seconds
+
+def confirm_batch(kind, submissions):
+    """
+    Track a batch of submitted transactions together and wait for all of them.
+    
+    Every transaction is handed to the watcher, so they confirm concurrently
+    and the batch takes about as long as its slowest transaction. In
+    confirm-later mode this returns without waiting.
+    
+    Args:
+        kind (str): Name of the tool that submitted the batch
+        submissions (list): (description, submitted, assets) per row; submitted
+            is the exception instead if the row could not be submitted
+    
+    Returns:
+        list: A PendingOperation, or the submission exception, per row
+    """
+    rows = []
+    for description, submitted, assets in submissions:
+        if isinstance(submitted, Exception):
+            rows.append(submitted)
+            continue
+        rows.append(tx_watcher.track(
+            kind,
+            submitted,
+            description,
+            on_finish=lambda _, assets=assets: balance_cache.invalidate(agent_wallet,
+                                                                        *assets),
+        ))
+
+    operations = [row for row in rows if not isinstance(row, Exception)]
+    journal_submitted(*(operation.submitted for operation in operations))
+    if CONFIRM_LATER or not operations:
+        journal_follow(operations)
+        return rows
+
+    deadline = time.monotonic() + BATCH_CONFIRM_TIMEOUT
+    reported = 0
+    while time.monotonic() < deadline:
+        finished = sum(operation.done for operation in operations)
+        if finished != reported:
+            get_renderer().status(
+                f"{kind}: {finished}/{len(operations)} transactions settled")
+            reported = finished
+        if finished == len(operations):
+            break
+        tx_watcher.wait(operations, timeout=tx_watcher.poll_interval)
+    if not all(operation.done for operation in operations):
+        journal_follow(operations)
+    elif all(operation.status == "failed" for operation in operations):
+        journal_failed(f"all {len(operations)} transactions failed onchain")
+    return rows
+
+def format_batch_table(headers, rows):
+    """
+    Render batch results as a compact fixed-width table.
+    
+    Args:
+        headers (list): Column names
+        rows (list): One list of cell values per row
+    
+    Returns:
+        str: The table
+    """
+    cells = ([[str(header) for header in headers]]
+             + [[str(cell) for cell in row] for row in rows])
+    widths = [max(len(row[column]) for row in cells)
+              for column in range(len(headers))]
+    return "\n".join(
+        "  ".join(cell.ljust(width)
+                  for cell, width in zip(row, widths, strict=True)).rstrip()
+        for row in cells
+    )
+
+def batch_row_status(row):
+    """Status and transaction hash for one row returned by confirm_batch."""
+    if isinstance(row, Exception):
+        return f"error: {str(row)}", "-"
+    transaction_hash = getattr(row.submitted, "transaction_hash", None) or "-"
+    if row.error and row.status != "complete":
+        return f"{row.status}: {row.error}", transaction_hash
+    return row.status, transaction_hash
+
 # Request funds from the faucet (only works on testnet)
 # faucet = agent_wallet.faucet()
 # print(f"Faucet transaction: {faucet}")
 # print(f"Agent wallet address: {agent_wallet.default_address.address_id}")
 
 # Function to create a new ERC-20 token
+@journaled
 def create_token(name, symbol, initial_supply):
     """
     Create a new ERC-20 token.
@@ -69,24 +520,42 @@ def create_token(name, symbol, initial_supply):
     Returns:
         str: A message confirming the token creation with details
     """
+    def on_complete(contract):
+        contract_registry.register(*registry_scope(), "erc20",
+                                   contract.contract_address, name, symbol,
+                                   initial_supply=initial_supply)
+        return (f"Token {name} ({symbol}) created with initial supply of "
+                f"{initial_supply} and contract address {contract.contract_address}. "
+                f"It can be referred to as {symbol} from now on.")
+
     deployed_contract = agent_wallet.deploy_token(name, symbol, initial_supply)
-    deployed_contract.wait()
-    return f"Token {name} ({symbol}) created with initial supply of {initial_supply} and contract address {deployed_contract.contract_address}"
+    return confirm_transaction(
+        "create_token",
+        deployed_contract,
+        f"deployment of token {name} ({symbol})",
+        on_complete,
+    )
 
 # Function to transfer assets
+@journaled
 def transfer_asset(amount, asset_id, destination_address):
     """
     Transfer an asset to a specific address.
     
     Args:
         amount (Union[int, float, Decimal]): Amount to transfer
-        asset_id (str): Asset identifier ("eth", "usdc") or contract address of an ERC-20 token
+        asset_id (str): Asset identifier ("eth", "usdc"), contract address of an
+            ERC-20 token, or the symbol of a token this agent created
         destination_address (str): Recipient's address
     
     Returns:
         str: A message confirming the transfer or describing an error
     """
+    from cdp.errors import UnsupportedAssetError
+
     try:
+        asset_address = resolve_asset(asset_id)
+
         # Check if we're on Base Mainnet and the asset is USDC for gasless transfer
         is_mainnet = agent_wallet.network_id == "base-mainnet"
         is_usdc = asset_id.lower() == "usdc"
@@ -94,38 +563,157 @@ def transfer_asset(amount, asset_id, destination_address):
 
         # For ETH and USDC, we can transfer directly without checking balance
         if asset_id.lower() in ["eth", "usdc"]:
+            if transfer_coalescer is not None:
+                return coalesced_transfer(amount, asset_id, destination_address)
             transfer = agent_wallet.transfer(amount, asset_id, destination_address, gasless=gasless)
-            transfer.wait()
+            balance_cache.adjust(agent_wallet, asset_id, -Decimal(str(amount)))
             gasless_msg = " (gasless)" if gasless else ""
-            return f"Transferred {amount} {asset_id}{gasless_msg} to {destination_address}"
+            return confirm_transaction(
+                "transfer_asset",
+                transfer,
+                f"transfer of {amount} {asset_id} to {destination_address}",
+                lambda _: (f"Transferred {amount} {asset_id}{gasless_msg} to "
+                           f"{destination_address}"),
+                assets=(asset_id,) if gasless else (asset_id, "eth"),
+            )
             
         # For other assets, check balance first
+        if contract_registry.awaiting_index(*registry_scope(), asset_address):
+            return unsupported_asset_message(asset_id, asset_address)
         try:
-            balance = agent_wallet.balance(asset_id)
+            balance = balance_cache.get(agent_wallet, asset_address)
         except UnsupportedAssetError:
-            return f"Error: The asset {asset_id} is not supported on this network. It may have been recently deployed. Please try again in about 30 minutes."
+            contract_registry.set_indexed(*registry_scope(), asset_address, False)
+            return unsupported_asset_message(asset_id, asset_address)
+        contract_registry.set_indexed(*registry_scope(), asset_address, True)
 
         if balance < amount:
             return f"Insufficient balance. You have {balance} {asset_id}, but tried to transfer {amount}."
 
-        transfer = agent_wallet.transfer(amount, asset_id, destination_address)
-        transfer.wait()
-        return f"Transferred {amount} {asset_id} to {destination_address}"
+        if transfer_coalescer is not None:
+            return coalesced_transfer(amount, asset_address, destination_address)
+        transfer = agent_wallet.transfer(amount, asset_address, destination_address)
+        balance_cache.adjust(agent_wallet, asset_address, -Decimal(str(amount)))
+        return confirm_transaction(
+            "transfer_asset",
+            transfer,
+            f"transfer of {amount} {asset_id} to {destination_address}",
+            lambda _: f"Transferred {amount} {asset_id} to {destination_address}",
+            assets=(asset_address, "eth"),
+        )
     except Exception as e:
         return f"Error transferring asset: {str(e)}. If this is a custom token, it may have been recently deployed. Please try again in about 30 minutes, as it needs to be indexed by CDP first."
 
+# Function to transfer assets to many recipients at once
+@journaled
+def batch_transfer(transfers: str):
+    """
+    Transfer assets to many addresses in one operation. The balance is checked
+    once, all transfers are submitted back-to-back and then confirmed together.
+    
+    Args:
+        transfers (str): JSON list of transfers, each either {"amount": ...,
+            "asset_id": ..., "destination_address": ...} or [amount, asset_id,
+            destination_address]; asset_id may be the symbol of a token this agent
+            created
+    
+    Returns:
+        str: A table with the status of each transfer
+    """
+    from cdp.errors import UnsupportedAssetError
+
+    try:
+        rows = []
+        for entry in json.loads(transfers):
+            if isinstance(entry, dict):
+                amount, asset_id, destination_address = (
+                    entry["amount"], entry["asset_id"], entry["destination_address"])
+            else:
+                amount, asset_id, destination_address = entry
+            rows.append((Decimal(str(amount)), resolve_asset(str(asset_id)),
+                         str(destination_address)))
+    except (ValueError, KeyError, TypeError) as e:
+        return (f"Error: Could not parse transfers: {str(e)}. Pass a JSON list of "
+                "{\"amount\", \"asset_id\", \"destination_address\"} objects.")
+    if not rows:
+        return "Error: No transfers given."
+
+    # One balance check per asset for the whole batch
+    totals = {}
+    for amount, asset_id, _ in rows:
+        totals[asset_id.lower()] = totals.get(asset_id.lower(), Decimal(0)) + amount
+    for asset_id, total in totals.items():
+        if contract_registry.awaiting_index(*registry_scope(), asset_id):
+            return unsupported_asset_message(asset_id, asset_id)
+        try:
+            balance = balance_cache.get(agent_wallet, asset_id)
+        except UnsupportedAssetError:
+            contract_registry.set_indexed(*registry_scope(), asset_id, False)
+            return unsupported_asset_message(asset_id, asset_id)
+        except Exception as e:
+            return (f"Error checking {asset_id} balance: {str(e)}. If this is a "
+                    "custom token, it may not be indexed by CDP yet.")
+        if balance < total:
+            return (f"Insufficient balance. You have {balance} {asset_id}, but the "
+                    f"batch transfers {total}.")
+
+    # Submit back-to-back in the given order so the wallet's nonces stay in order
+    gasless_usdc = agent_wallet.network_id == "base-mainnet"
+    submissions = []
+    for amount, asset_id, destination_address in rows:
+        gasless = gasless_usdc and asset_id.lower() == "usdc"
+        try:
+            transfer = agent_wallet.transfer(amount, asset_id, destination_address,
+                                             gasless=gasless)
+            balance_cache.adjust(agent_wallet, asset_id, -amount)
+            submitted = transfer
+        except Exception as e:
+            submitted = e
+        assets = (asset_id,) if gasless else (asset_id, "eth")
+        description = f"transfer of {amount} {asset_id} to {destination_address}"
+        submissions.append((description, submitted, assets))
+
+    results = confirm_batch("batch_transfer", submissions)
+
+    table = []
+    for index, ((amount, asset_id, destination_address), result) in enumerate(
+            zip(rows, results, strict=True), start=1):
+        status, transaction_hash = batch_row_status(result)
+        if CONFIRM_LATER and not isinstance(result, Exception):
+            status = f"{result.status} ({result.id})"
+        table.append([index, amount, asset_id, destination_address, status,
+                      transaction_hash])
+    confirmed = sum(1 for result in results
+                    if not isinstance(result, Exception)
+                    and result.status == "complete")
+    header = (f"Batch transfer: {len(rows)} rows, {confirmed} confirmed, "
+              f"{len(rows) - confirmed} not confirmed")
+    headers = ["#", "amount", "asset", "destination", "status", "tx"]
+    return header + "\n" + format_batch_table(headers, table)
+
 # Function to get the balance of a specific asset
 def get_balance(asset_id):
     """
     Get the balance of a specific asset in the agent's wallet.
     
     Args:
-        asset_id (str): Asset identifier ("eth", "usdc") or contract address of an ERC-20 token
+        asset_id (str): Asset identifier ("eth", "usdc"), contract address of an
+            ERC-20 token, or the symbol of a token this agent created
     
     Returns:
         str: A message showing the current balance of the specified asset
     """
-    balance = agent_wallet.balance(asset_id)
+    from cdp.errors import UnsupportedAssetError
+
+    asset_address = resolve_asset(asset_id)
+    if contract_registry.awaiting_index(*registry_scope(), asset_address):
+        return unsupported_asset_message(asset_id, asset_address)
+    try:
+        balance = balance_cache.get(agent_wallet, asset_address)
+    except UnsupportedAssetError:
+        contract_registry.set_indexed(*registry_scope(), asset_address, False)
+        return unsupported_asset_message(asset_id, asset_address)
+    contract_registry.set_indexed(*registry_scope(), asset_address, True)
     return f"Current balance of {asset_id}: {balance}"
 
 # Function to request ETH from the faucet (testnet only)
@@ -139,9 +727,27 @@ def request_eth_from_faucet():
     if agent_wallet.network_id == "base-mainnet":
         return "Error: The faucet is only available on Base Sepolia testnet."
     
+    previous = balance_cache.get(agent_wallet, "eth")
     faucet_tx = agent_wallet.faucet()
+    # The cached ETH balance is stale once the faucet's transaction lands, not when
+    # it's requested
+    if reports_status(faucet_tx):
+        tx_watcher.track(
+            "request_eth_from_faucet",
+            faucet_tx,
+            "ETH faucet request",
+            lambda _: "ETH from the faucet arrived",
+            on_finish=lambda _: balance_cache.invalidate(agent_wallet, "eth"),
+        )
+    else:
+        # Nothing to watch: wait for the credit to show up in the balance instead
+        balance_cache.invalidate_when_changed(
+            agent_wallet, "eth", previous, timeout_seconds=tx_watcher.timeout_seconds)
     return f"Requested ETH from faucet. Transaction: {faucet_tx}"
 
+# Repeated (or near-identical) art prompts are answered from disk
+art_cache = ArtCache()
+
 # Function to generate art using DALL-E (requires separate OpenAI API key)
 def generate_art(prompt):
     """
@@ -153,23 +759,32 @@ def generate_art(prompt):
     Returns:
         str: Status message about the art generation, including the image URL if successful
     """
+    model, size, quality = "dall-e-3", "1024x1024", "standard"
     try:
-        client = OpenAI()
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1,
-        )
+        cached_url = art_cache.get(prompt, model, size, quality)
+        if cached_url:
+            return f"Generated artwork available at: {cached_url}"
+
+        client = get_openai_client()
+        with metrics.timer("external_seconds", service="openai",
+                           endpoint="images.generate"):
+            response = client.images.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=1,
+            )
         
         image_url = response.data[0].url
+        art_cache.put(prompt, model, size, quality, image_url)
         return f"Generated artwork available at: {image_url}"
         
     except Exception as e:
         return f"Error generating artwork: {str(e)}"
 
 # Function to deploy an ERC-721 NFT contract
+@journaled
 def deploy_nft(name, symbol, base_uri):
     """
     Deploy an ERC-721 NFT contract.
@@ -182,32 +797,47 @@ def deploy_nft(name, symbol, base_uri):
     Returns:
         str: Status message about the NFT deployment, including the contract address
     """
+    def on_complete(contract):
+        contract_registry.register(*registry_scope(), "erc721",
+                                   contract.contract_address, name, symbol,
+                                   base_uri=base_uri)
+        return (f"Successfully deployed NFT contract '{name}' ({symbol}) at address "
+                f"{contract.contract_address} with base URI: {base_uri}. It can be "
+                f"referred to as {symbol} from now on.")
+
     try:
         deployed_nft = agent_wallet.deploy_nft(name, symbol, base_uri)
-        deployed_nft.wait()
-        contract_address = deployed_nft.contract_address
-        
-        return f"Successfully deployed NFT contract '{name}' ({symbol}) at address {contract_address} with base URI: {base_uri}"
+        return confirm_transaction(
+            "deploy_nft",
+            deployed_nft,
+            f"deployment of NFT contract '{name}' ({symbol})",
+            on_complete,
+        )
         
     except Exception as e:
         return f"Error deploying NFT contract: {str(e)}"
 
 # Function to mint an NFT
-def mint_nft(contract_address, mint_to):
+@journaled
+def mint_nft(contract_address, mint_to, quantity: int = 1):
     """
     Mint an NFT to a specified address.
     
     Args:
-        contract_address (str): Address of the NFT contract
+        contract_address (str): Address of the NFT contract, or the symbol or name
+            of a collection this agent deployed
         mint_to (str): Address to mint NFT to
+        quantity (int): Number of NFTs to mint (default 1)
     
     Returns:
         str: Status message about the NFT minting
     """
     try:
+        contract_address = contract_registry.resolve(contract_address,
+                                                     *registry_scope(), kind="erc721")
         mint_args = {
             "to": mint_to,
-            "quantity": "1"
+            "quantity": str(quantity)
         }
         
         mint_invocation = agent_wallet.invoke_contract(
@@ -215,14 +845,91 @@ def mint_nft(contract_address, mint_to):
             method="mint", 
             args=mint_args
         )
-        mint_invocation.wait()
-        
-        return f"Successfully minted NFT to {mint_to}"
+        return confirm_transaction(
+            "mint_nft",
+            mint_invocation,
+            f"mint of an NFT from {contract_address} to {mint_to}",
+            lambda _: f"Successfully minted NFT to {mint_to}",
+        )
         
     except Exception as e:
         return f"Error minting NFT: {str(e)}"
 
+# Function to mint NFTs to many recipients at once
+@journaled
+def bulk_mint_nft(contract_address: str, recipients: str):
+    """
+    Mint NFTs from one contract to many addresses. All mints are submitted
+    back-to-back and confirmed together; a failed mint does not stop the rest.
+    
+    Args:
+        contract_address (str): Address of the NFT contract, or the symbol or name
+            of a collection this agent deployed
+        recipients (str): JSON list of addresses (one NFT each), a JSON list of
+            {"address": ..., "quantity": ...} objects, or a JSON object mapping
+            address to quantity
+    
+    Returns:
+        str: A table with the status of each mint
+    """
+    try:
+        parsed = json.loads(recipients)
+        if isinstance(parsed, dict):
+            parsed = [{"address": address, "quantity": quantity}
+                      for address, quantity in parsed.items()]
+        rows = []
+        for entry in parsed:
+            if isinstance(entry, dict):
+                address = str(entry["address"])
+                quantity = int(entry.get("quantity", 1))
+            else:
+                address, quantity = str(entry), 1
+            if quantity < 1:
+                raise ValueError(
+                    f"quantity for {address} must be at least 1, got {quantity}")
+            rows.append((address, quantity))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return (f"Error: Could not parse recipients: {str(e)}. Pass a JSON list of "
+                "addresses or of {\"address\", \"quantity\"} objects.")
+    if not rows:
+        return "Error: No recipients given."
+    contract_address = contract_registry.resolve(contract_address, *registry_scope(),
+                                                 kind="erc721")
+
+    submissions = []
+    for mint_to, quantity in rows:
+        try:
+            submitted = agent_wallet.invoke_contract(
+                contract_address=contract_address,
+                method="mint",
+                args={"to": mint_to, "quantity": str(quantity)},
+            )
+        except Exception as e:
+            submitted = e
+        description = f"mint of {quantity} NFT(s) from {contract_address} to {mint_to}"
+        submissions.append((description, submitted, ("eth",)))
+
+    results = confirm_batch("bulk_mint_nft", submissions)
+
+    table = []
+    for index, ((mint_to, quantity), result) in enumerate(
+            zip(rows, results, strict=True), start=1):
+        status, transaction_hash = batch_row_status(result)
+        if CONFIRM_LATER and not isinstance(result, Exception):
+            status = f"{result.status} ({result.id})"
+        table.append([index, mint_to, quantity, status, transaction_hash])
+    minted = sum(quantity for (_, quantity), result in zip(rows, results, strict=True)
+                 if not isinstance(result, Exception) and result.status == "complete")
+    failed = sum(1 for result in results
+                 if isinstance(result, Exception)
+                 or result.status in ("failed", "timeout"))
+    header = (f"Bulk mint from {contract_address}: {len(rows)} recipients, "
+              f"{minted} NFT(s) confirmed, {failed} failed")
+    headers = ["#", "recipient", "qty", "status", "tx"]
+    return header + "\n" + format_batch_table(headers, table)
+
 # Function to swap assets (only works on Base Mainnet)
+@journaled
 def swap_assets(amount: Union[int, float, Decimal], from_asset_id: str, to_asset_id: str):
     """
     Swap one asset for another using the trade function.
@@ -230,8 +937,10 @@ def swap_assets(amount: Union[int, float, Decimal], from_asset_id: str, to_asset
 
     Args:
         amount (Union[int, float, Decimal]): Amount of the source asset to swap
-        from_asset_id (str): Source asset identifier
-        to_asset_id (str): Destination asset identifier
+        from_asset_id (str): Source asset identifier, or the symbol of a token this
+            agent created
+        to_asset_id (str): Destination asset identifier, or the symbol of a token
+            this agent created
 
     Returns:
         str: Status message about the swap
@@ -240,9 +949,18 @@ def swap_assets(amount: Union[int, float, Decimal], from_asset_id: str, to_asset
         return "Error: Asset swaps are only available on Base Mainnet. Current network is not Base Mainnet."
 
     try:
+        from_asset_id = resolve_asset(from_asset_id)
+        to_asset_id = resolve_asset(to_asset_id)
         trade = agent_wallet.trade(amount, from_asset_id, to_asset_id)
-        trade.wait()
-        return f"Successfully swapped {amount} {from_asset_id} for {to_asset_id}"
+        balance_cache.adjust(agent_wallet, from_asset_id, -Decimal(str(amount)))
+        return confirm_transaction(
+            "swap_assets",
+            trade,
+            f"swap of {amount} {from_asset_id} for {to_asset_id}",
+            lambda _: (f"Successfully swapped {amount} {from_asset_id} for "
+                       f"{to_asset_id}"),
+            assets=(from_asset_id, to_asset_id, "eth"),
+        )
     except Exception as e:
         return f"Error swapping assets: {str(e)}"
 
@@ -251,6 +969,66 @@ BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_MAINNET = "0x4cCb0BB02FCABA27e82a56646E81
 BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET = "0x49aE3cC2e3AA768B1e5654f5D3C6002144A59581"
 L2_RESOLVER_ADDRESS_MAINNET = "0xC6d566A56A1aFf6508b41f6c90ff131615583BCD"
 L2_RESOLVER_ADDRESS_TESTNET = "0x6533C94869D28fAA8dF77cc63f9e2b2D6Cf77eBA"
+BASENAME_SUFFIX_MAINNET = ".base.eth"
+BASENAME_SUFFIX_TESTNET = ".basetest.eth"
+
+@functools.lru_cache(maxsize=None)
+def basename_resolver_contract():
+    """
+    Build the L2 resolver encoder once per process.
+    
+    Returns:
+        Contract: web3 contract object used to ABI-encode resolver calls
+    """
+    from web3 import Web3
+
+    return Web3().eth.contract(abi=l2_resolver_abi)
+
+@functools.lru_cache(maxsize=4096)
+def basename_namehash(base_name: str) -> bytes:
+    """
+    Compute the ENS namehash of a Basename, memoized.
+    
+    Args:
+        base_name (str): The full Basename (e.g. "example.base.eth")
+    
+    Returns:
+        bytes: The namehash
+    """
+    from ens import ENS
+
+    return ENS.namehash(base_name)
+
+def normalize_basename(basename: str, is_mainnet: bool) -> str:
+    """
+    Return the full Basename for the wallet's network, adding the suffix if it is
+    missing.
+    
+    Args:
+        basename (str): A label ("myname") or full Basename ("myname.base.eth")
+        is_mainnet (bool): True if on mainnet, False if on testnet
+    
+    Returns:
+        str: The full, lowercased Basename
+    
+    Raises:
+        ValueError: If the name has the other network's suffix or is not a single
+            label of at least 3 characters
+    """
+    suffix = BASENAME_SUFFIX_MAINNET if is_mainnet else BASENAME_SUFFIX_TESTNET
+    other_suffix = BASENAME_SUFFIX_TESTNET if is_mainnet else BASENAME_SUFFIX_MAINNET
+    name = basename.strip().lower()
+    if name.endswith(other_suffix):
+        raise ValueError(f"{basename} is for the other network; names on this "
+                         f"network end in {suffix}")
+    label = name[:-len(suffix)] if name.endswith(suffix) else name
+    if not label or "." in label:
+        raise ValueError(f"{basename} is not a valid Basename; use a single label "
+                         f"like 'myname' or 'myname{suffix}'")
+    if len(label) < 3:
+        raise ValueError(
+            f"{basename} is too short; Basenames need at least 3 characters")
+    return label + suffix
 
 # Function to create registration arguments for Basenames
 def create_register_contract_method_args(base_name: str, address_id: str, is_mainnet: bool) -> dict:
@@ -265,11 +1043,9 @@ def create_register_contract_method_args(base_name: str, address_id: str, is_mai
     Returns:
         dict: Formatted arguments for the register contract method
     """
-    w3 = Web3()
-    
-    resolver_contract = w3.eth.contract(abi=l2_resolver_abi)
+    resolver_contract = basename_resolver_contract()
     
-    name_hash = w3.ens.namehash(base_name)
+    name_hash = basename_namehash(base_name)
     
     address_data = resolver_contract.encode_abi(
         "setAddr",
@@ -295,6 +1071,7 @@ def create_register_contract_method_args(base_name: str, address_id: str, is_mai
     return register_args
 
 # Function to register a basename
+@journaled
 def register_basename(basename: str, amount: float = 0.002):
     """
     Register a basename for the agent's wallet.
@@ -306,12 +1083,15 @@ def register_basename(basename: str, amount: float = 0.002):
     Returns:
         str: Status message about the basename registration
     """
+    from web3.exceptions import ContractLogicError
+
     address_id = agent_wallet.default_address.address_id
     is_mainnet = agent_wallet.network_id == "base-mainnet"
 
-    suffix = ".base.eth" if is_mainnet else ".basetest.eth"
-    if not basename.endswith(suffix):
-        basename += suffix
+    try:
+        basename = normalize_basename(basename, is_mainnet)
+    except ValueError as e:
+        return f"Error registering basename: {str(e)}"
 
     register_args = create_register_contract_method_args(basename, address_id, is_mainnet)
 
@@ -329,24 +1109,184 @@ def register_basename(basename: str, amount: float = 0.002):
             amount=amount,
             asset_id="eth",
         )
-        invocation.wait()
-        return f"Successfully registered basename {basename} for address {address_id}"
+        balance_cache.adjust(agent_wallet, "eth", -Decimal(str(amount)))
+        return confirm_transaction(
+            "register_basename",
+            invocation,
+            f"registration of basename {basename}",
+            lambda _: (f"Successfully registered basename {basename} for address "
+                       f"{address_id}"),
+        )
     except ContractLogicError as e:
         return f"Error registering basename: {str(e)}"
     except Exception as e:
         return f"Unexpected error registering basename: {str(e)}"
+
+# Function to register many basenames at once
+@journaled
+def register_basenames(basenames: str, amount: float = 0.002):
+    """
+    Register many basenames in one operation. Every name is validated and encoded
+    before anything is submitted; registrations are then submitted back-to-back
+    and confirmed together.
+    
+    Args:
+        basenames (str): JSON list of basenames, or of {"basename": ...,
+            "address": ...} objects to register names for other addresses
+            (defaults to the agent's address)
+        amount (float): Amount of ETH to pay for each registration (default 0.002)
     
-# add the following import to the top of the file, add the code below it, and add the new functions to the based_agent.functions list
+    Returns:
+        str: A table with the status of each registration
+    """
+    try:
+        entries = [
+            entry if isinstance(entry, dict) else {"basename": entry}
+            for entry in json.loads(basenames)
+        ]
+    except (ValueError, TypeError) as e:
+        return f"Error: Could not parse basenames: {str(e)}. Pass a JSON list of names."
+    if not entries:
+        return "Error: No basenames given."
 
-from twitter_utils import TwitterBot
+    is_mainnet = agent_wallet.network_id == "base-mainnet"
+    default_address = agent_wallet.default_address.address_id
 
-# Initialize TwitterBot with credentials from config
-twitter_bot = TwitterBot(
-    api_key=TWITTER_CONFIG["api_key"],
-    api_secret=TWITTER_CONFIG["api_secret"],
-    access_token=TWITTER_CONFIG["access_token"],
-    access_token_secret=TWITTER_CONFIG["access_token_secret"]
-)
+    # Validate and encode everything before spending anything
+    requests, errors, seen = [], [], set()
+    for entry in entries:
+        try:
+            basename = normalize_basename(str(entry["basename"]), is_mainnet)
+            if basename in seen:
+                raise ValueError(f"{basename} is listed more than once")
+            seen.add(basename)
+            address_id = entry.get("address") or default_address
+            register_args = create_register_contract_method_args(
+                basename, address_id, is_mainnet)
+            requests.append((basename, address_id, register_args))
+        except Exception as e:
+            errors.append(f"- {entry.get('basename')}: {str(e)}")
+    if errors:
+        return ("Error: Nothing was registered. Fix these basenames and try again:\n"
+                + "\n".join(errors))
+
+    contract_address = (
+        BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_MAINNET if is_mainnet
+        else BASENAMES_REGISTRAR_CONTROLLER_ADDRESS_TESTNET
+    )
+    submissions = []
+    for basename, address_id, register_args in requests:
+        try:
+            submitted = agent_wallet.invoke_contract(
+                contract_address=contract_address,
+                method="register",
+                args=register_args,
+                abi=registrar_abi,
+                amount=amount,
+                asset_id="eth",
+            )
+            balance_cache.adjust(agent_wallet, "eth", -Decimal(str(amount)))
+        except Exception as e:
+            submitted = e
+        description = f"registration of basename {basename} for {address_id}"
+        submissions.append((description, submitted, ("eth",)))
+
+    results = confirm_batch("register_basenames", submissions)
+
+    table = []
+    for index, ((basename, address_id, _), result) in enumerate(
+            zip(requests, results, strict=True), start=1):
+        status, transaction_hash = batch_row_status(result)
+        if CONFIRM_LATER and not isinstance(result, Exception):
+            status = f"{result.status} ({result.id})"
+        table.append([index, basename, address_id, status, transaction_hash])
+    registered = sum(1 for result in results
+                     if not isinstance(result, Exception)
+                     and result.status == "complete")
+    header = f"Basename registration: {len(requests)} names, {registered} registered"
+    headers = ["#", "basename", "address", "status", "tx"]
+    return header + "\n" + format_batch_table(headers, table)
+
+# Function to check on transactions submitted in confirm-later mode
+def check_pending_operations(operation_id: str = "", wait_seconds: float = 0):
+    """
+    Check the status of submitted transactions that are waiting for confirmation.
+    
+    Args:
+        operation_id (str): ID of the pending operation (e.g. "op-3"); leave empty
+            to check all of them
+        wait_seconds (float): Seconds to wait for confirmation before answering (0
+            answers immediately)
+    
+    Returns:
+        str: Status of the requested operation(s)
+    """
+    if operation_id:
+        operation = tx_watcher.get(operation_id)
+        if operation is None:
+            return f"Error: No operation with ID {operation_id}."
+        operations = [operation]
+    else:
+        operations = tx_watcher.operations()
+        if not operations:
+            return "No submitted operations to check."
+
+    if wait_seconds:
+        tx_watcher.wait([op for op in operations if not op.done],
+                        timeout=float(wait_seconds))
+
+    return "\n".join(operation.summary() for operation in operations)
+    
+# Function to list the contracts this agent has deployed
+def list_known_contracts(kind: str = ""):
+    """
+    List the tokens and NFT collections this agent has deployed on the current
+    network, with their addresses.
+    
+    Args:
+        kind (str): "erc20" for tokens only, "erc721" for NFT collections only, or
+            empty for both
+    
+    Returns:
+        str: One line per contract, newest first
+    """
+    kind = kind.lower().strip() or None
+    if kind not in (None, "erc20", "erc721"):
+        return "Error: kind must be erc20, erc721 or empty."
+    contracts = contract_registry.contracts(*registry_scope(), kind)
+    if not contracts:
+        return "No contracts deployed by this agent on this network yet."
+    return "\n".join(describe_contract(entry) for entry in contracts)
+
+# Twitter functions. The bot is only created (and tweepy imported) when one of
+# them is first called.
+
+_twitter_bot = None
+_twitter_bot_lock = threading.Lock()
+
+def get_twitter_bot():
+    """
+    Return the shared TwitterBot, creating it on first use.
+    
+    Returns:
+        TwitterBot: Bot initialized with credentials from config
+    """
+    global _twitter_bot
+    if _twitter_bot is None:
+        with _twitter_bot_lock:
+            if _twitter_bot is None:
+                from config import TWITTER_CONFIG
+
+                from twitter_utils import TwitterBot
+
+                # Initialize TwitterBot with credentials from config
+                _twitter_bot = TwitterBot(
+                    api_key=TWITTER_CONFIG["api_key"],
+                    api_secret=TWITTER_CONFIG["api_secret"],
+                    access_token=TWITTER_CONFIG["access_token"],
+                    access_token_secret=TWITTER_CONFIG["access_token_secret"]
+                )
+    return _twitter_bot
 
 # Add these new functions to your existing functions list
 
@@ -361,27 +1301,28 @@ def post_to_twitter(content: str):
         str: Status message about the tweet
     """
     try:
-        return twitter_bot.post_tweet(content)
+        return get_twitter_bot().post_tweet(content)
     except Exception as e:
         return f"Error posting to Twitter: {str(e)}. This may be due to API access limitations."
 
 def check_twitter_mentions():
     """
-    Check recent Twitter mentions.
+    Check for Twitter mentions that arrived since the last check. Cheap enough to
+    call every turn.
     
     Returns:
-        str: Formatted string of recent mentions
+        str: Formatted string of new mentions, with tweet IDs for replying
     """
     try:
-        mentions = twitter_bot.read_mentions()
+        mentions = get_twitter_bot().read_mentions()
         if not mentions:
-            return "No recent mentions found"
+            return "No new mentions since the last check"
         
-        result = "Recent mentions:\n"
+        result = "New mentions:\n"
         for mention in mentions:
             if 'error' in mention:
                 return f"Error checking mentions: {mention['error']}"
-            result += f"- @{mention['user']}: {mention['text']}\n"
+            result += f"- [{mention['id']}] @{mention['user']}: {mention['text']}\n"
         return result
     except Exception as e:
         return f"Error checking Twitter mentions: {str(e)}. This may be due to API access limitations."
@@ -397,7 +1338,28 @@ def reply_to_twitter_mention(tweet_id: str, content: str):
     Returns:
         str: Status message about the reply
     """
-    return twitter_bot.reply_to_tweet(tweet_id, content)
+    return get_twitter_bot().reply_to_tweet(tweet_id, content)
+
+def reply_to_twitter_mentions(replies: str):
+    """
+    Reply to several tweets at once.
+    
+    Args:
+        replies (str): JSON list of {"tweet_id": ..., "content": ...} objects
+    
+    Returns:
+        str: Status message for each reply
+    """
+    try:
+        parsed = json.loads(replies)
+        parsed = [{"tweet_id": str(reply["tweet_id"]), "content": str(reply["content"])}
+                  for reply in parsed]
+    except (ValueError, KeyError, TypeError) as e:
+        return (f"Error: Could not parse replies: {str(e)}. Pass a JSON list of "
+                "{\"tweet_id\", \"content\"} objects.")
+    results = get_twitter_bot().reply_to_tweets(parsed)
+    return "\n".join(f"- {reply['tweet_id']}: {result}"
+                     for reply, result in zip(parsed, results, strict=True))
 
 def search_twitter(query: str):
     """
@@ -409,7 +1371,7 @@ def search_twitter(query: str):
     Returns:
         str: Formatted string of matching tweets
     """
-    tweets = twitter_bot.search_tweets(query)
+    tweets = get_twitter_bot().search_tweets(query)
     if not tweets:
         return f"No tweets found matching query: {query}"
     
@@ -469,23 +1431,81 @@ registrar_abi = [
 ]
 
 
+# Tools that spend from the agent's wallet. They run one at a time, in the
+# order the model asked for them, even when other tool calls from the same
+# turn run in parallel (see swarm_utils.ParallelSwarm).
+SERIALIZED_TOOLS = {
+    "create_token",
+    "transfer_asset",
+    "batch_transfer",
+    "request_eth_from_faucet",
+    "deploy_nft",
+    "mint_nft",
+    "bulk_mint_nft",
+    "swap_assets",
+    "register_basename",
+    "register_basenames",
+}
+if transfer_coalescer is not None:
+    # Coalesced transfers wait out their window unlocked; the merged send takes
+    # wallet_lock itself
+    SERIALIZED_TOOLS.discard("transfer_asset")
+
+# Tool groups for tool_utils.ToolRouter. Each turn only offers the groups whose
+# keywords appear in the latest user message (plus ALWAYS_OFFERED_TOOLS); a
+# message that matches no group gets every tool.
+TOOL_GROUPS = {
+    "twitter": {
+        "tools": ["post_to_twitter", "check_twitter_mentions",
+                  "reply_to_twitter_mention", "reply_to_twitter_mentions",
+                  "search_twitter"],
+        "keywords": [r"twitter", r"tweet", r"mention", r"\breply", r"\bpost\b",
+                     r"@\w+"],
+    },
+    "tokens": {
+        "tools": ["create_token", "transfer_asset", "batch_transfer", "get_balance",
+                  "request_eth_from_faucet", "swap_assets", "list_known_contracts"],
+        "keywords": [r"token", r"erc-?20", r"transfer", r"\bsend", r"balance",
+                     r"faucet", r"\bfund", r"swap", r"trade", r"\beth\b", r"usdc",
+                     r"0x[0-9a-f]{40}"],
+    },
+    "nfts": {
+        "tools": ["deploy_nft", "mint_nft", "bulk_mint_nft", "generate_art",
+                  "list_known_contracts"],
+        "keywords": [r"nft", r"erc-?721", r"\bmint", r"collection", r"\bart",
+                     r"image", r"picture", r"draw"],
+    },
+    "basenames": {
+        "tools": ["register_basename", "register_basenames"],
+        "keywords": [r"basename", r"\.base\.eth", r"\bens\b", r"domain"],
+    },
+}
+
+ALWAYS_OFFERED_TOOLS = {"get_balance", "check_pending_operations"}
+
 # Create the Based Agent with all available functions
 based_agent = Agent(
     name="Based Agent",
-    instructions="You are a helpful agent that can interact onchain on the Base Layer 2 using the Coinbase Developer Platform SDK. You can create tokens, transfer assets, generate art, deploy NFTs, mint NFTs, register basenames, and swap assets (on mainnet only). If you ever need to know your address, it is {agent_wallet.default_address.address_id}. If you ever need funds, you can request them from the faucet. You can also deploy your own ERC-20 tokens, NFTs, and interact with them. If someone asks you to do something you can't do, you can say so, and encourage them to implement it themselves using the CDP SDK, recommend they go to docs.cdp.coinbase.com for more informaton. You can also offer to help them implement it by writing the function and telling them to add it to the agents.py file and within your list of callable functions.",
+    instructions="You are a helpful agent that can interact onchain on the Base Layer 2 using the Coinbase Developer Platform SDK. You can create tokens, transfer assets, generate art, deploy NFTs, mint NFTs, register basenames, and swap assets (on mainnet only). If you ever need to know your address, it is {agent_wallet.default_address.address_id}. If you ever need funds, you can request them from the faucet. You can also deploy your own ERC-20 tokens, NFTs, and interact with them. If a tool gives you a pending operation ID, use check_pending_operations to see whether it has confirmed. Tokens and NFT collections you deploy are remembered, so you can refer to them by symbol; use list_known_contracts to see them. If someone asks you to do something you can't do, you can say so, and encourage them to implement it themselves using the CDP SDK, recommend they go to docs.cdp.coinbase.com for more informaton. You can also offer to help them implement it by writing the function and telling them to add it to the agents.py file and within your list of callable functions.",
     functions=[
         create_token, 
         transfer_asset, 
+        batch_transfer,
         get_balance, 
         request_eth_from_faucet, 
         generate_art,  # Uncomment this line if you have configured the OpenAI API
         deploy_nft, 
         mint_nft,
+        bulk_mint_nft,
         swap_assets,
         register_basename,
+        register_basenames,
+        check_pending_operations,
+        list_known_contracts,
         post_to_twitter,
         check_twitter_mentions,
         reply_to_twitter_mention,
+        reply_to_twitter_mentions,
         search_twitter
     ],
 )
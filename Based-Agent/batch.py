@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics_utils import metrics, percentile
+
+# What each conversation's guide is asked to explore, assigned round-robin.
+# Replace with --scenarios to cover your own cases.
+DEFAULT_SCENARIOS = [
+    "creating a new token and sending some of it to another address",
+    "deploying an NFT collection and minting from it",
+    "checking balances and topping up from the faucet",
+    "engaging with the community on Twitter",
+    "registering a basename",
+    "generating art and turning it into an NFT",
+]
+
+# Tool results that start with these count as tool errors
+TOOL_ERROR_PREFIXES = ("Error", "Unexpected error")
+
+
+def load_scenarios(path: str):
+    """
+    Read scenarios from a JSON list of strings or a text file with one scenario per line
+
+    Args:
+        path (str): Scenario file
+
+    Returns:
+        List[str]: The scenarios
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(".json"):
+        return [str(scenario) for scenario in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+class BatchRunner:
+    def __init__(self, agent, client, guide_client, turns: int = 5,
+                 concurrency: int = 8, output_dir: str = "batch_runs",
+                 token_budget: int = 4000):
+        """
+        Runs many two-agent conversations at once without a human at the keyboard
+
+        Each conversation is a coroutine that alternates guide and agent
+        turns for a fixed number of turns. The blocking model and tool calls
+        run on a thread pool of `concurrency` workers, so while one
+        conversation waits on its guide, others are running agent turns.
+        Both sides keep a ConversationMemory, so prompts stay bounded however
+        many turns are run.
+
+        Args:
+            agent (Agent): Agent under test
+            client (Swarm): Client for the agent's turns (see run.create_client)
+            guide_client (OpenAI): Client for the guide's turns
+            turns (int): Exchanges per conversation
+            concurrency (int): Model or agent calls in flight at once
+            output_dir (str): Where transcripts and timings are written
+            token_budget (int): Prompt budget for each side's history
+        """
+        self.agent = agent
+        self.client = client
+        self.guide_client = guide_client
+        self.turns = turns
+        self.concurrency = concurrency
+        self.output_dir = output_dir
+        self.token_budget = token_budget
+        self.timings = []
+
+    def _write(self, path: str, record: dict):
+        with open(path, "a") as f:
+            f.write(json.dumps(dict(record, ts=time.time()), default=str) + "\n")
+
+    def _agent_turn(self, messages):
+        with metrics.timer("turn_seconds", mode="batch"):
+            return self.client.run(agent=self.agent, messages=messages)
+
+    async def run_conversation(self, index: int, scenario: str) -> dict:
+        """
+        Run one conversation to completion, writing its transcript as it goes
+
+        Args:
+            index (int): Conversation number, used in file names
+            scenario (str): What the guide should explore
+
+        Returns:
+            dict: Per-conversation result with turns completed and any error
+        """
+        from memory_utils import ConversationMemory
+        from run import GUIDE_INSTRUCTIONS, GUIDE_OPENING, ask_guide
+
+        name = f"conversation-{index:04d}"
+        transcript = os.path.join(self.output_dir, "transcripts", f"{name}.jsonl")
+        timings_path = os.path.join(self.output_dir, "timings.jsonl")
+        guide_memory = ConversationMemory(token_budget=self.token_budget)
+        agent_memory = ConversationMemory(token_budget=self.token_budget)
+        guide_memory.extend([
+            {"role": "system", "content": GUIDE_INSTRUCTIONS},
+            {"role": "user", "content": f"{GUIDE_OPENING} Focus on {scenario}."},
+        ])
+        self._write(transcript, {"conversation": name, "role": "scenario",
+                                 "content": scenario})
+
+        completed = 0
+        try:
+            for turn in range(1, self.turns + 1):
+                start = time.perf_counter()
+                guide_message = await asyncio.to_thread(ask_guide, self.guide_client,
+                                                        guide_memory.messages())
+                guide_seconds = time.perf_counter() - start
+                guide_memory.append({"role": "assistant", "content": guide_message})
+                agent_memory.append({"role": "user", "content": guide_message})
+                self._write(transcript, {"conversation": name, "turn": turn,
+                                         "role": "guide", "content": guide_message})
+
+                start = time.perf_counter()
+                response = await asyncio.to_thread(self._agent_turn,
+                                                   agent_memory.messages())
+                agent_seconds = time.perf_counter() - start
+                agent_memory.extend(response.messages)
+                for message in response.messages:
+                    self._write(transcript, dict(message, conversation=name, turn=turn))
+
+                tool_results = [message for message in response.messages
+                                if message.get("role") == "tool"]
+                reply = response.messages[-1]["content"] if response.messages else None
+                reply = reply or "No response from Based Agent."
+                guide_memory.append({"role": "user",
+                                     "content": f"Based Agent response: {reply}"})
+
+                timing = {
+                    "conversation": name,
+                    "turn": turn,
+                    "guide_seconds": round(guide_seconds, 4),
+                    "agent_seconds": round(agent_seconds, 4),
+                    "tool_calls": [message.get("tool_name")
+                                   for message in tool_results],
+                    "tool_errors": sum(
+                        str(message.get("content") or "").startswith(
+                            TOOL_ERROR_PREFIXES)
+                        for message in tool_results
+                    ),
+                    "agent_history_tokens": agent_memory.token_count(),
+                }
+                self.timings.append(timing)
+                self._write(timings_path, timing)
+                completed = turn
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            self._write(transcript, {"conversation": name, "role": "error",
+                                     "content": error})
+            return {"conversation": name, "scenario": scenario, "turns": completed,
+                    "error": error}
+        return {"conversation": name, "scenario": scenario, "turns": completed,
+                "error": None}
+
+    async def run(self, conversations: int, scenarios=None) -> dict:
+        """
+        Run every conversation and write summary.json
+
+        Args:
+            conversations (int): Number of conversations
+            scenarios (List[str]): Scenarios assigned round-robin, DEFAULT_SCENARIOS
+                if omitted
+
+        Returns:
+            dict: The summary
+        """
+        scenarios = scenarios or DEFAULT_SCENARIOS
+        os.makedirs(os.path.join(self.output_dir, "transcripts"), exist_ok=True)
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.concurrency,
+                                                     thread_name_prefix="batch"))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            self.run_conversation(index, scenarios[index % len(scenarios)])
+            for index in range(conversations)
+        ))
+        elapsed = time.perf_counter() - start
+
+        guide_times = [timing["guide_seconds"] for timing in self.timings]
+        agent_times = [timing["agent_seconds"] for timing in self.timings]
+        turns = sum(result["turns"] for result in results)
+        summary = {
+            "conversations": conversations,
+            "turns_per_conversation": self.turns,
+            "concurrency": self.concurrency,
+            "turns": turns,
+            "failed_conversations": sum(result["error"] is not None
+                                        for result in results),
+            "tool_calls": sum(len(timing["tool_calls"]) for timing in self.timings),
+            "tool_errors": sum(timing["tool_errors"] for timing in self.timings),
+            "seconds": round(elapsed, 3),
+            "turns_per_second": round(turns / elapsed, 3) if elapsed else 0.0,
+            "guide_p50": percentile(guide_times, 0.5),
+            "guide_p99": percentile(guide_times, 0.99),
+            "agent_p50": percentile(agent_times, 0.5),
+            "agent_p99": percentile(agent_times, 0.99),
+            "results": results,
+        }
+        with open(os.path.join(self.output_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def run_batch(conversations: int = 10, turns: int = 5, concurrency: int = 8,
+              output_dir: str = None, scenarios=None, token_budget: int = 4000) -> dict:
+    """
+    Run a batch of two-agent conversations with the Based Agent
+
+    Args:
+        conversations (int): Number of conversations
+        turns (int): Exchanges per conversation
+        concurrency (int): Model or agent calls in flight at once
+        output_dir (str): Output directory, a new timestamped one under batch_runs/
+            if omitted
+        scenarios (List[str]): Scenarios assigned round-robin
+        token_budget (int): Prompt budget for each side's history
+
+    Returns:
+        dict: The summary that was written to summary.json
+    """
+    from agents import based_agent
+    from openai_utils import get_openai_client
+    from run import create_client
+
+    output_dir = output_dir or os.path.join("batch_runs",
+                                            time.strftime("%Y%m%d-%H%M%S"))
+    runner = BatchRunner(based_agent, create_client(), get_openai_client(), turns=turns,
+                         concurrency=concurrency, output_dir=output_dir,
+                         token_budget=token_budget)
+    return asyncio.run(runner.run(conversations, scenarios))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many unattended two-agent conversations with the Based Agent"
+    )
+    parser.add_argument("--conversations", type=int, default=10,
+                        help="Number of conversations")
+    parser.add_argument("--turns", type=int, default=5,
+                        help="Exchanges per conversation")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Model or agent calls in flight at once")
+    parser.add_argument("--output-dir",
+                        help="Where transcripts, timings.jsonl and summary.json go")
+    parser.add_argument("--scenarios",
+                        help="JSON list or text file (one per line) of scenarios "
+                             "for the guide")
+    parser.add_argument("--token-budget", type=int, default=4000,
+                        help="Prompt budget for each side's history")
+    parser.add_argument("--llm-replay", choices=["record", "replay", "auto"],
+                        help="See run.py --llm-replay")
+    args = parser.parse_args()
+
+    if args.llm_replay:
+        os.environ["BASED_AGENT_LLM_REPLAY"] = args.llm_replay
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else None
+    summary = run_batch(args.conversations, args.turns, args.concurrency,
+                        args.output_dir, scenarios, args.token_budget)
+    totals = {key: value for key, value in summary.items() if key != "results"}
+    print(json.dumps(totals, indent=2))
+    sys.exit(0 if summary["failed_conversations"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
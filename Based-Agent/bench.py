@@ -0,0 +1,383 @@
+import argparse
+import builtins
+import contextlib
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from metrics_utils import percentile
+
+# Cold-start budget in seconds. Restarting an agent should never cost more
+# than this before it can take input.
+IMPORT_BUDGET_SECONDS = 1.5
+FIRST_PROMPT_BUDGET_SECONDS = 0.5
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRST_PROMPT_MARKER = "Choose a mode"
+
+# What the offline chat benchmark says to the agent, in rotation
+CHAT_PROMPTS = [
+    "What's my ETH balance?",
+    "Deploy a token for the community",
+    "Post something on Twitter",
+    "Send a little ETH to a friend",
+]
+
+
+def measure_import_time(module: str = "agents") -> float:
+    """
+    Time a cold import of a module in a fresh interpreter
+
+    Args:
+        module (str): Name of the module to import
+
+    Returns:
+        float: Seconds spent in the import statement
+    """
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=AGENT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_time_to_first_prompt(script: str = "run.py", timeout: float = 60) -> float:
+    """
+    Time from process launch until the mode menu asks for input
+
+    Args:
+        script (str): Entry point to launch
+        timeout (float): Seconds to wait for the prompt before giving up
+
+    Returns:
+        float: Seconds until the prompt was printed
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", script],
+        cwd=AGENT_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    output = ""
+    try:
+        while FIRST_PROMPT_MARKER not in output:
+            char = process.stdout.read(1)
+            if not char:
+                raise RuntimeError(
+                    f"{script} exited before showing a prompt:\n{output}")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"No prompt from {script} after {timeout} seconds")
+            output += char
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run_startup_benchmark(runs: int = 5) -> bool:
+    """
+    Report median import time and time to first prompt against the budget
+
+    Args:
+        runs (int): Number of cold starts to measure
+
+    Returns:
+        bool: True if both medians are within budget
+    """
+    import_times = [measure_import_time("agents") for _ in range(runs)]
+    prompt_times = [measure_time_to_first_prompt() for _ in range(runs)]
+
+    rows = [
+        ("import agents", statistics.median(import_times), max(import_times),
+         IMPORT_BUDGET_SECONDS),
+        ("first prompt", statistics.median(prompt_times), max(prompt_times),
+         FIRST_PROMPT_BUDGET_SECONDS),
+    ]
+    within_budget = True
+    print(f"{'stage':<16}{'median':>10}{'max':>10}{'budget':>10}")
+    for stage, median, worst, budget in rows:
+        status = "ok" if median <= budget else "OVER"
+        within_budget = within_budget and median <= budget
+        print(f"{stage:<16}{median:>9.3f}s{worst:>9.3f}s{budget:>9.2f}s  {status}")
+    return within_budget
+
+
+def _tool_errors() -> int:
+    from metrics_utils import metrics
+
+    rows = metrics.snapshot()["counters"].get("tool_total", [])
+    return sum(row["value"] for row in rows if row["outcome"] == "error")
+
+
+def _traced_memory() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def install_fakes(latency: float = 0.0, jitter: float = 0.0,
+                  failure_rate: float = 0.0, llm_failure_rate: float = 0.0,
+                  confirm_seconds: float = 0.0, seed: int = 0):
+    """
+    Point agents.py at the in-process fakes from fake_services
+
+    State files (journal, art cache, Twitter cursor, contract registry) go to a
+    temporary directory, so this must run before agents is first imported.
+
+    Args:
+        latency (float): Seconds added to every fake service call
+        jitter (float): Up to this many extra seconds per call
+        failure_rate (float): Probability that a wallet or Twitter call fails
+        llm_failure_rate (float): Probability that a chat completion fails
+        confirm_seconds (float): Time for a fake transaction to confirm
+        seed (int): Seed for reproducible runs
+
+    Returns:
+        dict: The installed fakes by name
+    """
+    state_dir = tempfile.mkdtemp(prefix="based-agent-bench-")
+    os.environ["BASED_AGENT_JOURNAL"] = os.path.join(state_dir,
+                                                     "operation_journal.jsonl")
+    os.environ["ART_CACHE_DIR"] = os.path.join(state_dir, "art_cache")
+    os.environ["TWITTER_STATE_FILE"] = os.path.join(state_dir, "twitter_state.json")
+    os.environ["BASED_AGENT_CONTRACTS"] = os.path.join(state_dir, "contracts.json")
+
+    import agents
+    import openai_utils
+    from fake_services import FakeOpenAI, FakeTwitter, FakeWallet, Faults
+    from twitter_utils import RateLimitScheduler, TwitterBot
+
+    wallet = FakeWallet(Faults(latency, jitter, failure_rate, seed),
+                        confirm_seconds=confirm_seconds)
+    openai_client = FakeOpenAI(Faults(latency, jitter, llm_failure_rate, seed + 1),
+                               seed=seed)
+    twitter = FakeTwitter(Faults(latency, jitter, failure_rate, seed + 2)).install()
+
+    agents.agent_wallet._wallet = wallet
+    openai_utils._client = openai_client
+    bot = TwitterBot("bench", "bench", "bench", "bench")
+    # The benchmark measures the agent, not the posting budget
+    bot.scheduler = RateLimitScheduler(bot.api, posts_per_minute=600000, burst=100000)
+    agents._twitter_bot = bot
+    return {"wallet": wallet, "openai": openai_client, "twitter": twitter,
+            "state_dir": state_dir}
+
+
+def benchmark_tools(rounds: int = 5) -> list:
+    """
+    Call every tool of the agent directly with canned arguments
+
+    Each tool is called once untimed first, so one-off imports don't count.
+
+    Args:
+        rounds (int): Calls per tool
+
+    Returns:
+        list: One (tool, p50, p99, errors) row per tool
+    """
+    from agents import based_agent
+    from fake_services import TOOL_ARGS
+
+    rows = []
+    for function in based_agent.functions:
+        timings = []
+        errors = 0
+        with contextlib.suppress(Exception):
+            function(**TOOL_ARGS.get(function.__name__, {}))
+        for _ in range(rounds):
+            start = time.perf_counter()
+            try:
+                result = function(**TOOL_ARGS.get(function.__name__, {}))
+                errors += str(result).startswith(("Error", "Unexpected error"))
+            except Exception:
+                errors += 1
+            timings.append(time.perf_counter() - start)
+        rows.append((function.__name__, percentile(timings, 0.5),
+                     percentile(timings, 0.99), errors))
+    return rows
+
+
+def benchmark_chat(turns: int) -> dict:
+    """Drive run_chat_loop for a number of turns with scripted user input"""
+    import run
+    from agents import based_agent
+
+    marks = []
+
+    def scripted_input(_prompt=""):
+        marks.append(time.perf_counter())
+        return CHAT_PROMPTS[(len(marks) - 1) % len(CHAT_PROMPTS)]
+
+    original_input = builtins.input
+    builtins.input = scripted_input
+    try:
+        return _run_phase(lambda: run.run_chat_loop(based_agent, max_turns=turns),
+                          turns, marks)
+    finally:
+        builtins.input = original_input
+
+
+def benchmark_autonomous(turns: int) -> dict:
+    """Drive run_autonomous_loop for some turns, woken by fake mentions and a tick"""
+    import agents
+    import run
+    from event_utils import EventScheduler, balance_change_source, mentions_source
+
+    marks = []
+
+    def tick():
+        marks.append(time.perf_counter())
+        return [run.AUTONOMOUS_THOUGHT]
+
+    scheduler = EventScheduler(min_interval=0.001, max_interval=0.001)
+    scheduler.add_source("tick", tick)
+    scheduler.add_source("mentions", mentions_source(agents.get_twitter_bot))
+    scheduler.add_source("balance", balance_change_source(agents.agent_wallet, "eth"))
+    return _run_phase(
+        lambda: run.run_autonomous_loop(agents.based_agent, scheduler=scheduler,
+                                        max_turns=turns),
+        turns, marks,
+    )
+
+
+def _run_phase(loop, turns: int, marks: list) -> dict:
+    errors_before = _tool_errors()
+    memory_before = _traced_memory()
+    start = time.perf_counter()
+    error = None
+    try:
+        loop()
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+    elapsed = time.perf_counter() - start
+    marks = marks + [start + elapsed]
+    completed = len(marks) - 2 if error else turns
+    turn_times = [later - earlier
+                  for earlier, later in zip(marks, marks[1:], strict=False)]
+    turn_times = turn_times[:max(completed, 0)]
+    return {
+        "turns": completed,
+        "seconds": elapsed,
+        "turns_per_second": completed / elapsed if elapsed else 0.0,
+        "p50": percentile(turn_times, 0.5),
+        "p99": percentile(turn_times, 0.99),
+        "tool_errors": _tool_errors() - errors_before,
+        "memory_per_turn": ((_traced_memory() - memory_before) / completed
+                            if completed > 0 else 0.0),
+        "error": error,
+    }
+
+
+def run_offline_benchmark(turns: int = 50, rounds: int = 5, latency: float = 0.0,
+                          jitter: float = 0.0, failure_rate: float = 0.0,
+                          llm_failure_rate: float = 0.0,
+                          confirm_seconds: float = 0.0, seed: int = 0) -> bool:
+    """
+    Benchmark every tool, the chat loop and the autonomous loop against local fakes
+
+    Needs no credentials or network access. Reports per-tool p50/p99
+    latency, turns per second, turn latency and memory growth per turn.
+
+    Args:
+        turns (int): Turns for each loop
+        rounds (int): Direct calls per tool
+        latency (float): Seconds added to every fake service call
+        jitter (float): Up to this many extra seconds per call
+        failure_rate (float): Probability that a wallet or Twitter call fails
+        llm_failure_rate (float): Probability that a chat completion fails
+        confirm_seconds (float): Time for a fake transaction to confirm
+        seed (int): Seed for reproducible runs
+
+    Returns:
+        bool: True if both loops ran every turn
+    """
+    from render_utils import JsonlRenderer, set_renderer
+
+    fakes = install_fakes(latency, jitter, failure_rate, llm_failure_rate,
+                          confirm_seconds, seed)
+    tracemalloc.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        set_renderer(JsonlRenderer(stream=devnull))
+        tool_rows = benchmark_tools(rounds)
+        memory_start = _traced_memory()
+        phases = [("chat", benchmark_chat(turns)),
+                  ("auto", benchmark_autonomous(turns))]
+    memory_total = _traced_memory() - memory_start
+    tracemalloc.stop()
+    fakes["twitter"].uninstall()
+
+    print(f"{'tool':<28}{'p50':>12}{'p99':>12}{'errors':>8}")
+    for name, p50, p99, errors in tool_rows:
+        print(f"{name:<28}{p50 * 1000:>10.2f}ms{p99 * 1000:>10.2f}ms{errors:>8}")
+    print()
+    print(f"{'loop':<8}{'turns':>7}{'turns/s':>10}{'p50':>12}{'p99':>12}"
+          f"{'tool errors':>13}{'mem/turn':>12}")
+    all_turns = True
+    for name, phase in phases:
+        print(f"{name:<8}{phase['turns']:>7}{phase['turns_per_second']:>10.1f}"
+              f"{phase['p50'] * 1000:>10.1f}ms{phase['p99'] * 1000:>10.1f}ms"
+              f"{phase['tool_errors']:>13}{phase['memory_per_turn'] / 1024:>9.1f}KiB")
+        if phase["error"]:
+            print(f"  {name} loop stopped early: {phase['error']}")
+            all_turns = False
+    print(f"\nmemory growth across both loops: {memory_total / 1024:.1f}KiB")
+    print(f"injected failures: wallet {fakes['wallet'].faults.failures}, "
+          f"twitter {fakes['twitter'].faults.failures}, "
+          f"openai {fakes['openai'].faults.failures}")
+    return all_turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Based Agent benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subparsers.add_parser(
+        "startup", help="Cold-start import time and time to first prompt")
+    startup.add_argument("--runs", type=int, default=5,
+                         help="Number of cold starts to measure")
+
+    offline = subparsers.add_parser(
+        "offline", help="Tools, chat and autonomous loops against local fakes")
+    offline.add_argument("--turns", type=int, default=50, help="Turns for each loop")
+    offline.add_argument("--rounds", type=int, default=5, help="Direct calls per tool")
+    offline.add_argument("--latency", type=float, default=0.0,
+                         help="Seconds added to every fake service call")
+    offline.add_argument("--jitter", type=float, default=0.0,
+                         help="Up to this many extra seconds per call")
+    offline.add_argument("--failure-rate", type=float, default=0.0,
+                         help="Probability a wallet or Twitter call fails")
+    offline.add_argument("--llm-failure-rate", type=float, default=0.0,
+                         help="Probability a chat completion fails")
+    offline.add_argument("--confirm-seconds", type=float, default=0.0,
+                         help="Time for a fake transaction to confirm")
+    offline.add_argument("--seed", type=int, default=0,
+                         help="Seed for reproducible runs")
+
+    args = parser.parse_args()
+    if args.benchmark == "startup":
+        sys.exit(0 if run_startup_benchmark(args.runs) else 1)
+    if args.benchmark == "offline":
+        sys.exit(0 if run_offline_benchmark(
+            args.turns, args.rounds, args.latency, args.jitter, args.failure_rate,
+            args.llm_failure_rate, args.confirm_seconds, args.seed,
+        ) else 1)
+
+
+if __name__ == "__main__":
+    main()
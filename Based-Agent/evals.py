@@ -1,13 +1,66 @@
-from swarm import Swarm
-from agents import weather_agent
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-client = Swarm()
+from agents import ALWAYS_OFFERED_TOOLS, TOOL_GROUPS, based_agent
+from replay_utils import ReplayOpenAI
+from swarm_utils import ParallelSwarm
+from tool_utils import ToolRouter
+
+# Tool routing evals for based_agent. Model responses are recorded in
+# EVAL_CACHE, so re-running an unchanged suite is answered from disk and only
+# new or edited cases (or a changed agent) reach the API.
+EVAL_CACHE = os.environ.get("BASED_AGENT_EVAL_CACHE", "evals_responses.jsonl.gz")
+EVAL_MODE = os.environ.get("BASED_AGENT_EVAL_MODE", "auto")
+
+# (query, expected tool) pairs; a tuple accepts any of several tools
+TOOL_CASES = [
+    ("What's my ETH balance?", "get_balance"),
+    ("How much USDC do I have?", "get_balance"),
+    ("Create a token called Moon Coin with symbol MOON and a supply of 1000000.",
+     "create_token"),
+    ("Send 0.01 ETH to 0x000000000000000000000000000000000000dEaD.", "transfer_asset"),
+    ("I'm out of testnet ETH, can you top me up from the faucet?",
+     "request_eth_from_faucet"),
+    ("Make me a picture of a cat surfing a wave at sunset.", "generate_art"),
+    ("Deploy an NFT collection named Based Cats with symbol BCAT and base URI "
+     "https://example.com/cats/.", "deploy_nft"),
+    ("Mint an NFT from contract 0x00000000000000000000000000000000000000AA to "
+     "0x0000000000000000000000000000000000000001.", "mint_nft"),
+    ("Swap 0.1 ETH for USDC.", "swap_assets"),
+    ("Register the basename coolagent for me.", "register_basename"),
+    ("Tweet 'gm Base builders'.", "post_to_twitter"),
+    ("Do I have any new mentions on Twitter?", "check_twitter_mentions"),
+    ("Search Twitter for posts about onchain summer.", "search_twitter"),
+    ("Which tokens have I deployed so far?", "list_known_contracts"),
+    ("Is my last transaction confirmed yet?",
+     ("check_pending_operations", "get_balance")),
+]
+
+NO_TOOL_CASES = [
+    "Hi!",
+    "What is a Layer 2?",
+    "Who's the president of the United States?",
+]
+
+
+
+def create_eval_client(openai_client):
+    """Swarm client set up like run.create_client, so routing is tested end-to-end"""
+    router = ToolRouter(TOOL_GROUPS, always=ALWAYS_OFFERED_TOOLS)
+    return ParallelSwarm(client=openai_client, router=router)
 
 
-def run_and_get_tool_calls(agent, query):
+client = create_eval_client(ReplayOpenAI(path=EVAL_CACHE, mode=EVAL_MODE))
+
+
+def run_and_get_tool_calls(agent, query, swarm_client=None):
     message = {"role": "user", "content": query}
-    response = client.run(
+    response = (swarm_client or client).run(
         agent=agent,
         messages=[message],
         execute_tools=False,
@@ -15,30 +68,91 @@ def run_and_get_tool_calls(agent, query):
     return response.messages[-1].get("tool_calls")
 
 
-@pytest.mark.parametrize(
-    "query",
-    [
-        "What's the weather in NYC?",
-        "Tell me the weather in London.",
-        "Do I need an umbrella today? I'm in chicago.",
-    ],
-)
-def test_calls_weather_when_asked(query):
-    tool_calls = run_and_get_tool_calls(weather_agent, query)
-
-    assert len(tool_calls) == 1
-    assert tool_calls[0]["function"]["name"] == "get_weather"
-
-
-@pytest.mark.parametrize(
-    "query",
-    [
-        "Who's the president of the United States?",
-        "What is the time right now?",
-        "Hi!",
-    ],
-)
-def test_does_not_call_weather_when_not_asked(query):
-    tool_calls = run_and_get_tool_calls(weather_agent, query)
-
-    assert not tool_calls
+def check_case(query, expected, swarm_client=None):
+    """
+    Run one routing case
+
+    Args:
+        query (str): User message
+        expected (Union[str, tuple, None]): Tool(s) the model should call, None for
+            no tool
+        swarm_client (Swarm): Client to use, the module's replaying client if omitted
+
+    Returns:
+        tuple: (passed, names of the tools the model called)
+    """
+    tool_calls = run_and_get_tool_calls(based_agent, query, swarm_client) or []
+    names = [tool_call["function"]["name"] for tool_call in tool_calls]
+    if expected is None:
+        return not names, names
+    accepted = (expected,) if isinstance(expected, str) else expected
+    return len(names) == 1 and names[0] in accepted, names
+
+
+@pytest.mark.parametrize("query,expected", TOOL_CASES)
+def test_calls_expected_tool(query, expected):
+    passed, names = check_case(query, expected)
+    assert passed, f"expected {expected}, got {names}"
+
+
+@pytest.mark.parametrize("query", NO_TOOL_CASES)
+def test_does_not_call_tools_when_not_needed(query):
+    passed, names = check_case(query, None)
+    assert passed, f"expected no tool call, got {names}"
+
+
+def run_evals(workers: int = 8, mode: str = EVAL_MODE, cache: str = EVAL_CACHE) -> bool:
+    """
+    Run every case concurrently and print a report
+
+    Args:
+        workers (int): Cases in flight at once
+        mode (str): Replay mode, see replay_utils.ReplayOpenAI
+        cache (str): Response store file
+
+    Returns:
+        bool: True if every case passed
+    """
+    openai_client = ReplayOpenAI(path=cache, mode=mode)
+    swarm_client = create_eval_client(openai_client)
+    cases = TOOL_CASES + [(query, None) for query in NO_TOOL_CASES]
+
+    def run_case(case):
+        query, expected = case
+        try:
+            passed, names = check_case(query, expected, swarm_client)
+            return query, expected, passed, names, None
+        except Exception as e:
+            return query, expected, False, [], f"{type(e).__name__}: {str(e)}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_case, cases))
+    elapsed = time.perf_counter() - start
+
+    failures = 0
+    for query, expected, passed, names, error in results:
+        failures += not passed
+        status = "PASS" if passed else "FAIL"
+        got = error or (", ".join(names) or "no tool")
+        print(f"{status}  {query[:60]:<60}  "
+              f"expected {expected or 'no tool'}, got {got}")
+    print(f"\n{len(results) - failures}/{len(results)} passed in {elapsed:.1f}s "
+          f"({openai_client.hits} replayed, {openai_client.misses} from the API)")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Based Agent tool routing evals")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Cases in flight at once")
+    parser.add_argument("--mode", choices=["record", "replay", "auto"],
+                        default=EVAL_MODE,
+                        help="auto replays recorded responses and records the rest")
+    parser.add_argument("--cache", default=EVAL_CACHE, help="Recorded response file")
+    args = parser.parse_args()
+    sys.exit(0 if run_evals(args.workers, args.mode, args.cache) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List
+
+# Ranges for the five cron fields: minute, hour, day of month, month, day of week
+# (0 = Sunday)
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> set:
+    values = set()
+    for part in field.split(","):
+        part, _, step = part.partition("/")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-"))
+        else:
+            start = int(part)
+            end = high if step else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field {field!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, int(step or 1)))
+    return values
+
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        """
+        A five field cron expression such as "*/15 * * * *"
+
+        Supports *, numbers, ranges (1-5), lists (1,3) and steps (*/10). As in
+        cron, when both day-of-month and day-of-week are restricted (neither
+        starts with *), a day matching either one fires.
+
+        Args:
+            expression (str): minute hour day-of-month month day-of-week
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} must have 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(field, low, high)
+            for field, (low, high) in zip(fields, CRON_FIELDS, strict=True)
+        )
+        self.days_or_weekdays = not (fields[2].startswith("*")
+                                     or fields[4].startswith("*"))
+
+    def matches(self, moment: datetime) -> bool:
+        """Whether the schedule fires in the minute containing moment"""
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        day_matches = (day or weekday) if self.days_or_weekdays else (day and weekday)
+        return (moment.minute in self.minutes and moment.hour in self.hours
+                and moment.month in self.months and day_matches)
+
+
+class Event:
+    def __init__(self, source: str, description: str, data=None):
+        """
+        Something that happened and may be worth an agent turn
+
+        Args:
+            source (str): Name of the source that produced it
+            description (str): Line shown to the agent
+            data: Raw payload from the source
+        """
+        self.source = source
+        self.description = description
+        self.data = data
+        self.created_at = time.time()
+
+    def __repr__(self) -> str:
+        return f"<Event {self.source}: {self.description}>"
+
+
+class PollingSource:
+    def __init__(self, name: str, poll: Callable[[], List[str]], min_interval: float,
+                 max_interval: float):
+        """
+        A source that has to be asked for news, with adaptive backoff
+
+        Each poll that returns nothing doubles the interval up to
+        max_interval; any news drops it back to min_interval.
+
+        Args:
+            name (str): Source name used on its events
+            poll (Callable): Returns a list of event descriptions (empty if nothing
+                happened)
+            min_interval (float): Seconds between polls while active
+            max_interval (float): Longest wait between polls while idle
+        """
+        self.name = name
+        self.poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.next_poll = 0.0
+
+
+class EventScheduler:
+    def __init__(self, min_interval: float = 10, max_interval: float = 300):
+        """
+        Decides when the autonomous agent should take a turn
+
+        Turns are triggered by events instead of a fixed timer. Push sources
+        (e.g. confirmed transactions) call emit() directly, polling sources
+        are checked with adaptive backoff, and cron schedules fire at most
+        once per matching minute. Events that arrive together are handed out
+        as one batch so they cost one turn.
+
+        Args:
+            min_interval (float): Default polling interval for active sources
+            max_interval (float): Default polling interval ceiling for idle sources
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._sources = []
+        self._schedules = []
+        self._pending = []
+        self._condition = threading.Condition()
+
+    def emit(self, source: str, description: str, data=None):
+        """Queue an event and wake up the waiting loop; safe to call from any thread"""
+        with self._condition:
+            self._pending.append(Event(source, description, data))
+            self._condition.notify_all()
+
+    def add_source(self, name: str, poll: Callable[[], List[str]],
+                   min_interval: float = None, max_interval: float = None):
+        """
+        Register a polling source
+
+        Args:
+            name (str): Source name used on its events
+            poll (Callable): Returns a list of event descriptions; exceptions are
+                logged and count as no news
+            min_interval (float): Seconds between polls while active (defaults to the
+                scheduler's)
+            max_interval (float): Longest wait between polls while idle (defaults to
+                the scheduler's)
+        """
+        self._sources.append(PollingSource(
+            name, poll, min_interval or self.min_interval,
+            max_interval or self.max_interval,
+        ))
+
+    def add_schedule(self, name: str, expression: str, description: str):
+        """
+        Register a cron schedule
+
+        Args:
+            name (str): Source name used on its events
+            expression (str): Five field cron expression
+            description (str): Prompt given to the agent when it fires
+        """
+        self._schedules.append([name, CronSchedule(expression), description, None])
+
+    def _poll_sources(self, now: float):
+        for source in self._sources:
+            if now < source.next_poll:
+                continue
+            try:
+                descriptions = source.poll() or []
+            except Exception as e:
+                print(f"Error polling {source.name}: {str(e)}", file=sys.stderr)
+                descriptions = []
+            for description in descriptions:
+                self.emit(source.name, description)
+            if descriptions:
+                source.interval = source.min_interval
+            else:
+                source.interval = min(source.interval * 2, source.max_interval)
+            source.next_poll = now + source.interval
+
+    def _check_schedules(self, now: float):
+        moment = datetime.fromtimestamp(now)
+        minute = moment.replace(second=0, microsecond=0)
+        for schedule in self._schedules:
+            name, cron, description, last_fired = schedule
+            if last_fired != minute and cron.matches(moment):
+                schedule[3] = minute
+                self.emit(name, description, data={"prompt": True})
+
+    def _next_wakeup(self, now: float) -> float:
+        wakeups = [source.next_poll for source in self._sources]
+        if self._schedules:
+            # Schedules are checked at the top of every minute
+            wakeups.append(now - now % 60 + 60)
+        return min(wakeups) if wakeups else now + self.max_interval
+
+    def wait(self, timeout: float = None) -> List[Event]:
+        """
+        Block until at least one event is available and return all pending events
+
+        Args:
+            timeout (float): Give up after this many seconds and return an empty list
+
+        Returns:
+            List[Event]: Events in arrival order
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            now = time.time()
+            self._check_schedules(now)
+            self._poll_sources(now)
+            with self._condition:
+                if not self._pending:
+                    wakeup = self._next_wakeup(now)
+                    if deadline is not None:
+                        wakeup = min(wakeup, deadline)
+                    self._condition.wait(max(0, wakeup - time.time()))
+                if self._pending:
+                    events, self._pending = self._pending, []
+                    return events
+            if deadline is not None and time.time() >= deadline:
+                return []
+
+    def status(self) -> List[dict]:
+        """Current polling interval of each source, for logs"""
+        return [{"source": source.name, "interval": source.interval}
+                for source in self._sources]
+
+
+def balance_change_source(wallet, asset_id: str = "eth") -> Callable[[], List[str]]:
+    """
+    Build a poll function that reports incoming funds: increases in the wallet's
+    balance of an asset
+
+    Decreases (the agent's own transfers, mints and gas) only move the
+    baseline. Reporting them would wake the agent for its own actions, and
+    it could act again in response.
+
+    Args:
+        wallet: Wallet to read
+        asset_id (str): Asset to watch
+
+    Returns:
+        Callable: Poll function for EventScheduler.add_source
+    """
+    last = {"balance": None}
+
+    def poll() -> List[str]:
+        balance = wallet.balance(asset_id)
+        previous, last["balance"] = last["balance"], balance
+        if previous is None or balance <= previous:
+            return []
+        return [f"{asset_id.upper()} balance increased from {previous} to {balance}"]
+
+    return poll
+
+
+def mentions_source(get_bot: Callable) -> Callable[[], List[str]]:
+    """
+    Build a poll function that reports new Twitter mentions
+
+    Args:
+        get_bot (Callable): Returns the TwitterBot (called lazily on each poll)
+
+    Returns:
+        Callable: Poll function for EventScheduler.add_source
+    """
+    def poll() -> List[str]:
+        mentions = get_bot().read_mentions()
+        errors = [mention["error"] for mention in mentions if "error" in mention]
+        if errors:
+            raise RuntimeError(errors[0])
+        return [f"New Twitter mention [{mention['id']}] from @{mention['user']}: "
+                f"{mention['text']}" for mention in mentions]
+
+    return poll
+
+
+def format_events(events: List[Event]) -> str:
+    """
+    Turn a batch of events into the user message for one agent turn
+
+    Scheduled prompts are passed through as they are; everything else is
+    listed as news for the agent to react to.
+
+    Args:
+        events (List[Event]): Events that triggered the turn
+
+    Returns:
+        str: The prompt
+    """
+    def is_prompt(event: Event) -> bool:
+        return isinstance(event.data, dict) and bool(event.data.get("prompt"))
+
+    prompts = [event.description for event in events if is_prompt(event)]
+    news = [event for event in events if not is_prompt(event)]
+    parts = []
+    if news:
+        lines = "\n".join(f"- [{event.source}] {event.description}" for event in news)
+        parts.append(
+            f"Since your last turn, the following happened:\n{lines}\n"
+            "Decide whether any of it needs a response and act on it now. "
+            "Don't take any more input from me."
+        )
+    parts.extend(prompts)
+    return "\n\n".join(parts)
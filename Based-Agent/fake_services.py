@@ -0,0 +1,487 @@
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+import types
+from decimal import Decimal
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlparse
+
+# In-process stand-ins for CDP, OpenAI and Twitter, used by `bench.py offline`
+# to run the agent without network access or credentials. Each service takes
+# a Faults object for latency and failure injection. Methods keep the real
+# signatures, so some of their arguments go unused (the ARG002 noqa marks).
+
+BURN_ADDRESS = "0x000000000000000000000000000000000000dEaD"
+FIRST_ADDRESS = "0x0000000000000000000000000000000000000001"
+SECOND_ADDRESS = "0x0000000000000000000000000000000000000002"
+NFT_ADDRESS = "0x00000000000000000000000000000000000000AA"
+WALLET_ADDRESS = "0x00000000000000000000000000000000000000BA"
+
+# Arguments the fake model uses when it calls each tool
+TOOL_ARGS = {
+    "create_token": {"name": "Bench Token", "symbol": "BNCH",
+                     "initial_supply": 1000000},
+    "transfer_asset": {"amount": 0.0001, "asset_id": "eth",
+                       "destination_address": BURN_ADDRESS},
+    "batch_transfer": {"transfers": json.dumps([[0.0001, "eth", FIRST_ADDRESS],
+                                                [0.0002, "eth", SECOND_ADDRESS]])},
+    "get_balance": {"asset_id": "eth"},
+    "request_eth_from_faucet": {},
+    "generate_art": {"prompt": "A blue square floating above the Base chain"},
+    "deploy_nft": {"name": "Bench NFT", "symbol": "BNFT",
+                   "base_uri": "https://example.com/nft/"},
+    "mint_nft": {"contract_address": NFT_ADDRESS, "mint_to": FIRST_ADDRESS},
+    "bulk_mint_nft": {"contract_address": NFT_ADDRESS,
+                      "recipients": json.dumps([FIRST_ADDRESS, SECOND_ADDRESS])},
+    "swap_assets": {"amount": 0.0001, "from_asset_id": "eth", "to_asset_id": "usdc"},
+    "register_basename": {"basename": "benchagent"},
+    "register_basenames": {"basenames": json.dumps(["benchagent1", "benchagent2"])},
+    "check_pending_operations": {},
+    "post_to_twitter": {"content": "gm from the benchmark"},
+    "check_twitter_mentions": {},
+    "reply_to_twitter_mention": {"tweet_id": "1000", "content": "thanks!"},
+    "reply_to_twitter_mentions": {"replies": json.dumps([
+        {"tweet_id": "1000", "content": "thanks!"},
+        {"tweet_id": "1001", "content": "gm"},
+    ])},
+    "search_twitter": {"query": "base"},
+}
+
+
+class FaultInjected(Exception):
+    """Raised by a fake service when the failure injector fires"""
+
+
+class Faults:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 0):
+        """
+        Latency and failure injection for a fake service
+
+        Args:
+            latency (float): Seconds added to every call
+            jitter (float): Up to this many extra seconds, uniformly random
+            failure_rate (float): Probability that a call fails
+            seed (int): Seed for reproducible runs
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def delay(self):
+        with self._lock:
+            extra = self._random.random() * self.jitter if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            self.failures += failed
+            return failed
+
+    def apply(self, what: str):
+        """Sleep for the configured latency, then maybe raise FaultInjected"""
+        self.delay()
+        if self.should_fail():
+            raise FaultInjected(f"injected failure in {what}")
+
+
+def _fake_hash(*parts) -> str:
+    return "0x" + hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+# CDP ----------------------------------------------------------------------
+
+class FakeSubmission:
+    def __init__(self, faults: Faults, confirm_seconds: float, fail: bool,
+                 contract_address: str = None):
+        """
+        A submitted transaction that confirms after confirm_seconds
+
+        Quacks like the CDP Transfer / SmartContract / ContractInvocation / Trade
+        objects.
+        """
+        self._faults = faults
+        self._confirm_at = time.monotonic() + confirm_seconds
+        self._fail = fail
+        self.id = f"fake-{next(FakeWallet._ids)}"
+        self.transaction_hash = _fake_hash(self.id)
+        self.transaction_link = f"https://sepolia.basescan.org/tx/{self.transaction_hash}"
+        self.contract_address = contract_address
+
+    @property
+    def terminal_state(self) -> bool:
+        return time.monotonic() >= self._confirm_at
+
+    @property
+    def status(self) -> str:
+        if not self.terminal_state:
+            return "broadcast"
+        return "failed" if self._fail else "complete"
+
+    def reload(self):
+        self._faults.delay()
+        return self
+
+    def wait(self, interval_seconds: float = 0.2, timeout_seconds: float = 20):  # noqa: ARG002
+        remaining = self._confirm_at - time.monotonic()
+        if remaining > timeout_seconds:
+            time.sleep(timeout_seconds)
+            raise TimeoutError("Transfer timed out")
+        if remaining > 0:
+            time.sleep(remaining)
+        return self
+
+    def __str__(self) -> str:
+        return (f"FakeTransaction: (id: {self.id}, status: {self.status}, "
+                f"transaction_hash: {self.transaction_hash})")
+
+
+class FakeWallet:
+    _ids = itertools.count(1)
+
+    def __init__(self, faults: Faults = None, confirm_seconds: float = 0.0,
+                 network_id: str = "base-sepolia", starting_balance: str = "1000"):
+        """
+        In-memory stand-in for a CDP Wallet
+
+        Submitting calls sleep for the injected latency and may raise;
+        submitted transactions confirm after confirm_seconds and may fail
+        onchain at the injected failure rate.
+
+        Args:
+            faults (Faults): Latency and failure injection
+            confirm_seconds (float): Time from submission to confirmation
+            network_id (str): Reported network
+            starting_balance (str): Balance of every asset at start
+        """
+        self.faults = faults or Faults()
+        self.confirm_seconds = confirm_seconds
+        self.network_id = network_id
+        self.id = "fake-wallet"
+        self.default_address = types.SimpleNamespace(address_id=WALLET_ADDRESS)
+        self._balances = {}
+        self._starting_balance = Decimal(starting_balance)
+        self._lock = threading.Lock()
+
+    def balance(self, asset_id: str) -> Decimal:
+        self.faults.apply("balance")
+        with self._lock:
+            return self._balances.get(asset_id.lower(), self._starting_balance)
+
+    def _submit(self, what: str, contract_address: str = None,
+                spend: tuple = None) -> FakeSubmission:
+        self.faults.apply(what)
+        if spend:
+            asset_id, amount = spend
+            with self._lock:
+                key = asset_id.lower()
+                balance = self._balances.get(key, self._starting_balance)
+                self._balances[key] = balance - Decimal(str(amount))
+        return FakeSubmission(self.faults, self.confirm_seconds,
+                              self.faults.should_fail(), contract_address)
+
+    def transfer(self, amount, asset_id, destination, gasless=False):  # noqa: ARG002
+        return self._submit("transfer", spend=(asset_id, amount))
+
+    def deploy_token(self, name, symbol, total_supply):  # noqa: ARG002
+        return self._submit("deploy_token",
+                            contract_address=_fake_hash("token", name, symbol)[:42])
+
+    def deploy_nft(self, name, symbol, base_uri):  # noqa: ARG002
+        return self._submit("deploy_nft",
+                            contract_address=_fake_hash("nft", name, symbol)[:42])
+
+    def invoke_contract(self, contract_address, method, args, abi=None,  # noqa: ARG002
+                        amount=None, asset_id=None):
+        return self._submit("invoke_contract",
+                            spend=(asset_id, amount) if amount else None)
+
+    def trade(self, amount, from_asset_id, to_asset_id):  # noqa: ARG002
+        return self._submit("trade", spend=(from_asset_id, amount))
+
+    def faucet(self, asset_id=None):  # noqa: ARG002
+        return self._submit("faucet")
+
+
+# OpenAI -------------------------------------------------------------------
+
+class _FakeCompletions:
+    def __init__(self, service):
+        self._service = service
+
+    def create(self, model, messages, tools=None, stream=False, **kwargs):  # noqa: ARG002
+        return self._service.chat_completion(model, messages, tools, stream)
+
+
+class _FakeImages:
+    def __init__(self, service):
+        self._service = service
+
+    def generate(self, prompt, model=None, size=None, quality=None,  # noqa: ARG002
+                 n=1, **kwargs):  # noqa: ARG002
+        self._service.faults.apply("images.generate")
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+        url = f"https://images.example.com/{digest}.png"
+        return types.SimpleNamespace(data=[types.SimpleNamespace(url=url)])
+
+
+class FakeOpenAI:
+    def __init__(self, faults: Faults = None, tool_names: List[str] = None,
+                 reply_words: int = 30, seed: int = 0):
+        """
+        Stand-in for the OpenAI client's chat.completions and images endpoints
+
+        The fake model answers a user message with one tool call (cycling
+        through tool_names, or every tool it is offered) and answers tool
+        results with a short text reply, so each turn exercises one tool
+        round trip. Streaming returns real ChatCompletionChunk objects.
+
+        Args:
+            faults (Faults): Latency and failure injection
+            tool_names (List[str]): Tools to call, in rotation
+            reply_words (int): Length of text replies
+            seed (int): Seed for the reply text
+        """
+        self.faults = faults or Faults()
+        self.tool_names = tool_names
+        self.reply_words = reply_words
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions(self))
+        self.images = _FakeImages(self)
+        self._counter = itertools.count()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_tool(self, tools) -> str:
+        offered = [tool["function"]["name"] for tool in tools or []]
+        names = [name for name in (self.tool_names or offered) if name in offered]
+        if not names:
+            return None
+        with self._lock:
+            return names[next(self._counter) % len(names)]
+
+    def _plan(self, messages, tools):
+        last = messages[-1] if messages else {}
+        if last.get("role") == "user":
+            name = self._next_tool(tools)
+            if name:
+                call_id = f"call_{next(self._counter)}"
+                arguments = json.dumps(TOOL_ARGS.get(name, {}))
+                return None, [{"id": call_id, "type": "function",
+                               "function": {"name": name, "arguments": arguments}}]
+        vocabulary = ["onchain", "based", "token", "wallet", "done", "gm", "nft"]
+        with self._lock:
+            words = " ".join(self._random.choice(vocabulary)
+                             for _ in range(self.reply_words))
+        return f"All set: {words}.", None
+
+    def chat_completion(self, model, messages, tools, stream):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        self.faults.apply("chat.completions")
+        content, tool_calls = self._plan(messages, tools)
+        prompt_tokens = sum(len(json.dumps(message, default=str))
+                            for message in messages) // 4
+        completion_tokens = len(content or json.dumps(tool_calls)) // 4
+        created = int(time.time())
+        if not stream:
+            return ChatCompletion.model_validate({
+                "id": f"chatcmpl-fake-{next(self._counter)}",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                    "message": {"role": "assistant", "content": content,
+                                "tool_calls": tool_calls},
+                }],
+                "usage": {"prompt_tokens": prompt_tokens,
+                          "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+        deltas = [{"role": "assistant", "content": None if tool_calls else ""}]
+        if tool_calls:
+            for index, tool_call in enumerate(tool_calls):
+                name = tool_call["function"]["name"]
+                arguments = tool_call["function"]["arguments"]
+                deltas.append({"tool_calls": [{
+                    "index": index, "id": tool_call["id"], "type": "function",
+                    "function": {"name": name, "arguments": ""},
+                }]})
+                for start in range(0, len(arguments), 16):
+                    piece = arguments[start:start + 16]
+                    deltas.append({"tool_calls": [{"index": index,
+                                                   "function": {"arguments": piece}}]})
+        else:
+            deltas.extend({"content": word + " "} for word in content.split(" "))
+        chunk_id = f"chatcmpl-fake-{next(self._counter)}"
+
+        def chunks():
+            finish_reason = "tool_calls" if tool_calls else "stop"
+            for position, delta in enumerate(deltas):
+                last = position == len(deltas) - 1
+                yield ChatCompletionChunk.model_validate({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta,
+                                 "finish_reason": finish_reason if last else None}],
+                })
+
+        return chunks()
+
+
+# Twitter ------------------------------------------------------------------
+
+class _FakeResponse:
+    def __init__(self, status_code: int, payload, headers: Dict):
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+        self.headers = headers
+        self.content = self.text.encode()
+
+
+class _FakeSession:
+    def __init__(self, service):
+        self._service = service
+        self.headers = {}
+        self.params = {}
+
+    def request(self, method, url, data=None, **kwargs):  # noqa: ARG002
+        if isinstance(data, (str, bytes)):
+            data = dict(parse_qsl(data.decode() if isinstance(data, bytes) else data))
+        params = {}
+        for key, value in list(self.params.items()) + list((data or {}).items()):
+            params[key] = value.decode() if isinstance(value, bytes) else value
+        return self._service.handle(method, urlparse(url).path, params)
+
+    def close(self):
+        pass
+
+
+class FakeTwitter:
+    def __init__(self, faults: Faults = None, mentions_per_poll: int = 2,
+                 window_limit: int = 900):
+        """
+        Stand-in for the Twitter v1.1 API behind tweepy
+
+        Installed underneath tweepy's HTTP session, so tweepy's own request
+        building, parsing and pagination still run. Every response carries
+        x-rate-limit headers; injected failures come back as HTTP 503.
+
+        Args:
+            faults (Faults): Latency and failure injection
+            mentions_per_poll (int): New mentions that appear between mention polls
+            window_limit (int): Requests allowed per endpoint per 15 minute window
+        """
+        self.faults = faults or Faults()
+        self.mentions_per_poll = mentions_per_poll
+        self.window_limit = window_limit
+        self.requests = 0
+        self._next_id = itertools.count(1000)
+        self._tweets = {}
+        self._mentions = []
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._installed = None
+
+    def _tweet(self, text: str, user: str = "bench_user", tweet_id: int = None) -> Dict:
+        tweet_id = tweet_id or next(self._next_id)
+        tweet = {
+            "id": tweet_id,
+            "id_str": str(tweet_id),
+            "text": text,
+            "created_at": time.strftime("%a %b %d %H:%M:%S +0000 %Y", time.gmtime()),
+            "user": {"id": 1, "id_str": "1", "screen_name": user, "name": user},
+        }
+        self._tweets[tweet_id] = tweet
+        return tweet
+
+    def _headers(self, endpoint: str) -> Dict:
+        now = time.time()
+        reset, used = self._windows.get(endpoint, (now + 900, 0))
+        if now >= reset:
+            reset, used = now + 900, 0
+        used += 1
+        self._windows[endpoint] = (reset, used)
+        return {"x-rate-limit-remaining": str(max(0, self.window_limit - used)),
+                "x-rate-limit-reset": str(int(reset))}
+
+    def handle(self, method: str, path: str, params: Dict) -> _FakeResponse:  # noqa: ARG002
+        endpoint = path.split("/1.1/", 1)[-1].rsplit(".json", 1)[0]
+        with self._lock:
+            self.requests += 1
+            headers = self._headers(endpoint)
+        try:
+            self.faults.apply(endpoint)
+        except FaultInjected as e:
+            return _FakeResponse(503, {"errors": [{"code": 130, "message": str(e)}]},
+                                 headers)
+        with self._lock:
+            payload = self._route(endpoint, params)
+        if payload is None:
+            error = {"code": 34, "message": "Sorry, that page does not exist."}
+            return _FakeResponse(404, {"errors": [error]}, headers)
+        return _FakeResponse(200, payload, headers)
+
+    def _route(self, endpoint: str, params: Dict):
+        if endpoint == "statuses/update":
+            return self._tweet(params.get("status", ""), user="based_agent")
+        if endpoint == "statuses/mentions_timeline":
+            for _ in range(self.mentions_per_poll):
+                mention = self._tweet("@based_agent what can you do onchain?")
+                self._mentions.insert(0, mention)
+            since_id = int(params.get("since_id") or 0)
+            max_id = int(params.get("max_id") or 0) or None
+            count = int(params.get("count") or 20)
+            return [tweet for tweet in self._mentions
+                    if tweet["id"] > since_id
+                    and (max_id is None or tweet["id"] <= max_id)][:count]
+        if endpoint == "statuses/show":
+            return self._lookup(int(params.get("id", 0)))
+        if endpoint == "statuses/lookup":
+            ids = [int(tweet_id) for tweet_id in str(params.get("id", "")).split(",")
+                   if tweet_id]
+            return [self._lookup(tweet_id) for tweet_id in ids]
+        if endpoint == "search/tweets":
+            max_id = int(params.get("max_id") or 0)
+            if max_id:
+                return {"statuses": [], "search_metadata": {}}
+            count = int(params.get("count") or 15)
+            return {"statuses": [self._tweet(f"talking about {params.get('q')}")
+                                 for _ in range(min(count, 5))],
+                    "search_metadata": {}}
+        return None
+
+    def _lookup(self, tweet_id: int) -> Dict:
+        return self._tweets.get(tweet_id) or self._tweet("an older tweet",
+                                                         tweet_id=tweet_id)
+
+    def install(self):
+        """Route tweepy's HTTP requests to this fake until uninstall() is called"""
+        import tweepy.binder
+
+        service = self
+        self._installed = tweepy.binder.requests
+        tweepy.binder.requests = types.SimpleNamespace(
+            Session=lambda: _FakeSession(service))
+        return self
+
+    def uninstall(self):
+        import tweepy.binder
+
+        if self._installed is not None:
+            tweepy.binder.requests = self._installed
+            self._installed = None
@@ -0,0 +1,358 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+from render_utils import JsonlRenderer
+
+# Restart backoff for crashed agents. A worker that stays up for
+# STABLE_AFTER_SECONDS is considered healthy again and its backoff resets.
+RESTART_BACKOFF_SECONDS = 2
+MAX_RESTART_BACKOFF_SECONDS = 300
+STABLE_AFTER_SECONDS = 120
+
+# State files each worker keeps to itself, with their defaults. The journal is
+# compacted by rewriting the file, which would drop another process's appends.
+WORKER_STATE_FILES = {
+    "TWITTER_STATE_FILE": "twitter_state.json",
+    "BASED_AGENT_JOURNAL": "operation_journal.jsonl",
+    "BASED_AGENT_CONTRACTS": "contracts.json",
+}
+
+
+class QueueRenderer(JsonlRenderer):
+    def __init__(self, name: str, events):
+        """
+        Renderer for fleet workers: every record goes to the supervisor's queue,
+        tagged with the agent name
+
+        Args:
+            name (str): The agent's name in the fleet config
+            events (multiprocessing.Queue): Queue read by the supervisor
+        """
+        super().__init__()
+        self.name = name
+        self.events = events
+
+    def _emit(self, record: dict):
+        self.events.put(dict(record, agent=self.name, ts=time.time()))
+
+
+class QueueStream:
+    def __init__(self, name: str, events):
+        """File-like object that forwards printed lines (e.g. from tools) upstream"""
+        self.name = name
+        self.events = events
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.events.put({"type": "log", "agent": self.name, "content": line,
+                                 "ts": time.time()})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def worker_path(path: str, name: str) -> str:
+    """A worker's copy of a state file: contracts.json -> contracts_alice.json"""
+    root, extension = os.path.splitext(path)
+    return f"{root}_{name}{extension}"
+
+
+def forward_metrics(name: str, events, interval: float):
+    """Send the worker's metrics registry to the supervisor every interval seconds"""
+    from metrics_utils import metrics
+
+    while True:
+        time.sleep(interval)
+        events.put({"type": "worker_metrics", "agent": name,
+                    "content": metrics.snapshot(), "ts": time.time()})
+
+
+def run_agent(config: dict, events, metrics_interval: float = 60):
+    """
+    Entry point of one worker process: point the agent at its own wallet and run
+    the autonomous loop
+
+    Args:
+        config (dict): One entry of the fleet config
+        events (multiprocessing.Queue): Queue read by the supervisor
+        metrics_interval (float): Seconds between metrics sent to the supervisor
+    """
+    name = config["name"]
+    sys.stdout = QueueStream(name, events)
+
+    # Keep per-agent state files apart so workers don't overwrite each other,
+    # next to wherever the fleet's environment puts them
+    for variable, default in WORKER_STATE_FILES.items():
+        os.environ[variable] = worker_path(os.environ.get(variable, default), name)
+    os.environ.setdefault("ART_CACHE_DIR", f".art_cache/{name}")
+
+    from render_utils import set_renderer
+    set_renderer(QueueRenderer(name, events))
+    threading.Thread(target=forward_metrics, args=(name, events, metrics_interval),
+                     name="metrics-forward", daemon=True).start()
+
+    from agents import agent_wallet, based_agent
+    from run import run_autonomous_loop
+
+    agent_wallet.configure(
+        api_key_file=config.get("api_key_file"),
+        wallet_id=config.get("wallet_id"),
+        seed_file=config.get("seed_file"),
+    )
+    try:
+        run_autonomous_loop(based_agent, interval=config.get("interval", 10))
+    except Exception:
+        # Report the crash through the queue; the supervisor restarts the worker
+        events.put({"type": "error", "agent": name, "content": traceback.format_exc(),
+                    "ts": time.time()})
+        sys.exit(1)
+
+
+class AgentProcess:
+    def __init__(self, config: dict):
+        """
+        Supervisor-side state for one agent in the fleet
+
+        Args:
+            config (dict): The agent's fleet config entry
+        """
+        self.config = config
+        self.name = config["name"]
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_SECONDS
+        self.restart_at = 0.0
+        self.metrics = {"turns": 0, "messages": 0, "tool_calls": 0, "tool_errors": 0,
+                        "crashes": 0, "log_lines": 0}
+        # The worker's own metrics registry, as last forwarded
+        self.registry = {}
+
+    def start(self, context, events, metrics_interval: float = 60):
+        self.process = context.Process(target=run_agent,
+                                       args=(self.config, events, metrics_interval),
+                                       name=f"agent-{self.name}", daemon=True)
+        self.process.start()
+        self.started_at = time.time()
+
+    def snapshot(self) -> dict:
+        alive = self.process is not None and self.process.is_alive()
+        return dict(
+            self.metrics,
+            alive=alive,
+            pid=self.process.pid if alive else None,
+            restarts=self.restarts,
+            uptime_seconds=round(time.time() - self.started_at, 1) if alive else 0,
+        )
+
+
+class Fleet:
+    def __init__(self, configs: list, metrics_interval: float = 60,
+                 metrics_file: str = None):
+        """
+        Runs one autonomous agent per wallet config, each in its own process
+
+        Workers that exit are restarted with exponential backoff. Their output
+        is collected over a queue and printed as JSON lines tagged with the
+        agent name, and per-agent counters are printed (and optionally written
+        to metrics_file) every metrics_interval seconds. Workers also forward
+        their metrics registries (latencies, tokens, tool outcomes), which are
+        merged into the same snapshot with an agent label.
+
+        Args:
+            configs (list): Dicts with name, wallet_id, seed_file and optionally
+                api_key_file and interval
+            metrics_interval (float): Seconds between metrics snapshots
+            metrics_file (str): Path to write the latest snapshot to
+        """
+        names = [config["name"] for config in configs]
+        if len(set(names)) != len(names):
+            raise ValueError("Agent names in the fleet config must be unique")
+        # Spawn rather than fork: workers must not inherit the supervisor's threads
+        # or locks
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.agents = {config["name"]: AgentProcess(config) for config in configs}
+        self.metrics_interval = metrics_interval
+        self.metrics_file = metrics_file
+        self.started_at = time.time()
+
+    def _record(self, event: dict):
+        agent = self.agents.get(event.get("agent"))
+        if event.get("type") == "worker_metrics":
+            # Kept for the next snapshot rather than printed
+            if agent is not None:
+                agent.registry = event["content"]
+            return
+        if agent is not None:
+            metrics = agent.metrics
+            kind = event.get("type")
+            if kind == "message":
+                metrics["messages"] += 1
+            elif kind == "tool_call":
+                metrics["tool_calls"] += 1
+            elif (kind == "tool_result"
+                  and str(event.get("content", "")).startswith("Error")):
+                metrics["tool_errors"] += 1
+            elif kind == "note" and event.get("label") == "Agent's Thought":
+                metrics["turns"] += 1
+            elif kind == "error":
+                metrics["crashes"] += 1
+            elif kind == "log":
+                metrics["log_lines"] += 1
+        print(json.dumps(event, default=str), flush=True)
+
+    def _supervise(self):
+        now = time.time()
+        for agent in self.agents.values():
+            if agent.process is not None and agent.process.is_alive():
+                continue
+            if agent.process is not None:
+                # Just exited: schedule a restart
+                code = agent.process.exitcode
+                agent.process = None
+                if now - agent.started_at >= STABLE_AFTER_SECONDS:
+                    agent.backoff = RESTART_BACKOFF_SECONDS
+                agent.restart_at = now + agent.backoff
+                status = f"exited with code {code}, restarting in {agent.backoff}s"
+                self._record({"type": "status", "agent": agent.name, "ts": now,
+                              "content": status})
+                agent.backoff = min(agent.backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+                agent.restarts += 1
+            elif now >= agent.restart_at:
+                agent.start(self.context, self.events, self.metrics_interval)
+                self._record({"type": "status", "agent": agent.name, "ts": now,
+                              "content": f"started (pid {agent.process.pid})"})
+
+    def snapshot(self) -> dict:
+        """Per-agent counters and process state, and the workers' merged metrics"""
+        return {
+            "ts": time.time(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "agents": {name: agent.snapshot() for name, agent in self.agents.items()},
+            "metrics": merge_snapshots({name: agent.registry
+                                        for name, agent in self.agents.items()}),
+        }
+
+    def _write_metrics(self):
+        snapshot = self.snapshot()
+        print(json.dumps(dict(snapshot, type="metrics")), flush=True)
+        if self.metrics_file:
+            tmp_path = f"{self.metrics_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.metrics_file)
+
+    def run(self, duration: float = None):
+        """
+        Start every agent and supervise until interrupted
+
+        Args:
+            duration (float): Stop after this many seconds (runs forever if None)
+        """
+        next_metrics = time.time() + self.metrics_interval
+        try:
+            while duration is None or time.time() - self.started_at < duration:
+                self._supervise()
+                try:
+                    self._record(self.events.get(timeout=0.5))
+                    # Drain whatever else is ready without waiting
+                    while True:
+                        self._record(self.events.get_nowait())
+                except queue.Empty:
+                    pass
+                if time.time() >= next_metrics:
+                    self._write_metrics()
+                    next_metrics = time.time() + self.metrics_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Terminate all workers and write a final metrics snapshot"""
+        for agent in self.agents.values():
+            if agent.process is not None and agent.process.is_alive():
+                agent.process.terminate()
+        for agent in self.agents.values():
+            if agent.process is not None:
+                agent.process.join(timeout=10)
+        self._write_metrics()
+
+
+def merge_snapshots(snapshots: dict) -> dict:
+    """
+    Combine workers' metrics snapshots into one, labelling every series with its
+    agent
+
+    Args:
+        snapshots (dict): Agent name -> MetricsRegistry.snapshot() from that worker
+
+    Returns:
+        dict: {"counters": ..., "histograms": ...} in the snapshot format
+    """
+    merged = {"counters": {}, "histograms": {}}
+    for name, snapshot in sorted(snapshots.items()):
+        for section, metrics in merged.items():
+            for metric, rows in snapshot.get(section, {}).items():
+                metrics.setdefault(metric, []).extend(dict(row, agent=name)
+                                                      for row in rows)
+    return merged
+
+
+def load_fleet_config(path: str) -> list:
+    """
+    Read the fleet config: a JSON list of wallet configs
+
+    Example:
+        [{"name": "alice", "wallet_id": "...", "seed_file": "alice_seed.json",
+          "interval": 10}]
+
+    Args:
+        path (str): Path to the JSON file
+
+    Returns:
+        list: The wallet configs
+    """
+    with open(path) as f:
+        configs = json.load(f)
+    if not isinstance(configs, list) or not configs:
+        raise ValueError(f"{path} must contain a non-empty JSON list of wallet configs")
+    for config in configs:
+        missing = [key for key in ("name", "wallet_id", "seed_file")
+                   if key not in config]
+        if missing:
+            raise ValueError(f"Wallet config {config} is missing {', '.join(missing)}")
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run several autonomous Based Agents, one per wallet"
+    )
+    parser.add_argument("config", help="JSON file with a list of wallet configs")
+    parser.add_argument("--metrics-interval", type=float, default=60,
+                        help="Seconds between metrics snapshots")
+    parser.add_argument("--metrics-file",
+                        help="Also write the latest metrics snapshot to this file")
+    args = parser.parse_args()
+
+    fleet = Fleet(load_fleet_config(args.config), args.metrics_interval,
+                  args.metrics_file)
+    fleet.run()
+
+
+if __name__ == "__main__":
+    main()
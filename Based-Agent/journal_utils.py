@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, List, Optional
+
+# Public RPC endpoints used to look up receipts of transactions that were in
+# flight when the process stopped. Override with BASE_RPC_URL.
+DEFAULT_RPC_URLS = {
+    "base-mainnet": "https://mainnet.base.org",
+    "base-sepolia": "https://sepolia.base.org",
+}
+
+# Entry states. Entries in DEDUPE_STATES (still in flight, or interrupted so
+# the outcome is unknown) answer repeated calls with the same arguments;
+# complete, failed and rejected calls may be made again right away.
+IN_FLIGHT_STATES = ("started", "submitted")
+DEDUPE_STATES = ("started", "submitted", "interrupted")
+
+
+def _normalize(value):
+    # Make equivalent arguments hash the same: 0.1 == "0.10", 0xABC == 0xabc
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return format(Decimal(str(value)).normalize(), "f")
+    if isinstance(value, str):
+        if value.lower().startswith("0x"):
+            return value.lower()
+        try:
+            return format(Decimal(value).normalize(), "f")
+        except InvalidOperation:
+            return value
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return str(value)
+
+
+def receipt_status(tx_hash: str, network_id: str) -> Optional[str]:
+    """
+    Look up a transaction receipt over JSON-RPC
+
+    Args:
+        tx_hash (str): Transaction hash
+        network_id (str): CDP network ID, used to pick the default RPC endpoint
+
+    Returns:
+        Optional[str]: "complete" or "failed" once mined, None if the transaction
+            isn't known yet
+    """
+    from web3 import Web3
+    from web3.exceptions import TransactionNotFound
+
+    rpc_url = os.environ.get("BASE_RPC_URL") or DEFAULT_RPC_URLS.get(network_id)
+    if rpc_url is None:
+        raise ValueError(f"No RPC endpoint for network {network_id}; set BASE_RPC_URL")
+    web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 10}))
+    try:
+        receipt = web3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+    return "complete" if receipt["status"] == 1 else "failed"
+
+
+class OperationJournal:
+    def __init__(self, path: str = None, dedupe_seconds: float = None,
+                 retention_seconds: float = 7 * 24 * 3600):
+        """
+        Append-only record of onchain tool calls
+
+        Every journaled call gets an idempotency key (a hash of the wallet,
+        tool and normalized arguments) and is written as a sequence of JSON
+        lines as it moves from started to submitted (with transaction hashes)
+        to complete or failed. After a crash the journal shows which
+        transactions were in flight, so they can be reconciled instead of
+        sent again, and an identical call made within dedupe_seconds while
+        the first is still in flight (or was interrupted) is not sent twice.
+
+        Args:
+            path (str): Journal file
+                (BASED_AGENT_JOURNAL, default operation_journal.jsonl)
+            dedupe_seconds (float): How long an unfinished call holds back identical
+                repeats (BASED_AGENT_DEDUPE_SECONDS, default 600)
+            retention_seconds (float): Finished entries older than this are dropped
+                when the file is compacted
+        """
+        self.path = path or os.environ.get("BASED_AGENT_JOURNAL",
+                                           "operation_journal.jsonl")
+        if dedupe_seconds is None:
+            dedupe_seconds = float(os.environ.get("BASED_AGENT_DEDUPE_SECONDS", "600"))
+        self.dedupe_seconds = dedupe_seconds
+        self.retention_seconds = retention_seconds
+        self._entries = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(wallet_id: str, tool: str, args: Dict) -> str:
+        """Idempotency key for a tool call"""
+        payload = json.dumps([wallet_id, tool, _normalize(args)], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        lines = 0
+        torn = False
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        torn = True
+                        continue
+                    lines += 1
+                    self._entries.setdefault(record["key"], {}).update(record)
+        except FileNotFoundError:
+            return
+        cutoff = time.time() - self.retention_seconds
+        for key, entry in list(self._entries.items()):
+            if entry["status"] not in IN_FLIGHT_STATES and entry["updated_at"] < cutoff:
+                del self._entries[key]
+        # Compacting also drops a torn line, which the next append would
+        # otherwise run into
+        if torn or lines > 2 * len(self._entries) + 100:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, default=str) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _append(self, key: str, **fields) -> Dict:
+        with self._lock:
+            self._load()
+            record = dict(fields, key=key, updated_at=time.time())
+            entry = self._entries.setdefault(key, {})
+            entry.update(record)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return dict(entry)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The current state of an entry"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def recent(self, key: str) -> Optional[Dict]:
+        """The entry for key if it should answer a repeated call, else None"""
+        entry = self.get(key)
+        if (entry and entry["status"] in DEDUPE_STATES
+                and time.time() - entry["started_at"] < self.dedupe_seconds):
+            return entry
+        return None
+
+    def start(self, key: str, tool: str, args: Dict) -> Dict:
+        """Record that a call is about to submit transactions"""
+        return self._append(key, tool=tool, args=args, status="started",
+                            started_at=time.time(), tx_hashes=[], result=None,
+                            error=None)
+
+    def submitted(self, key: str, tx_hashes: List[str]):
+        """Record the hashes of the transactions a call submitted"""
+        with self._lock:
+            entry = self.get(key) or {}
+            hashes = list(entry.get("tx_hashes") or [])
+            hashes.extend(tx_hash for tx_hash in tx_hashes
+                          if tx_hash and tx_hash not in hashes)
+            self._append(key, status="submitted", tx_hashes=hashes)
+
+    def finish(self, key: str, status: str, result: str = None, error: str = None):
+        """
+        Record how a call ended
+
+        Args:
+            key (str): Idempotency key
+            status (str): "complete", "failed", "rejected" (nothing was submitted) or
+                "interrupted"
+            result (str): The tool's result message
+            error (str): What went wrong
+        """
+        self._append(key, status=status, result=result, error=error)
+
+    def in_flight(self) -> List[Dict]:
+        """Entries that were started or submitted but never finished"""
+        with self._lock:
+            self._load()
+            return [dict(entry) for entry in self._entries.values()
+                    if entry["status"] in IN_FLIGHT_STATES]
+
+    def resolve(self, entry: Dict, check: Callable[[str], Optional[str]]) -> Dict:
+        """
+        Settle one in-flight entry by looking up its transactions
+
+        Args:
+            entry (Dict): An in-flight entry
+            check (Callable): Returns "complete", "failed" or None (unknown) for a
+                transaction hash
+
+        Returns:
+            Dict: The updated entry
+        """
+        hashes = entry.get("tx_hashes") or []
+        if not hashes:
+            # Stopped before a hash was recorded: we can't tell whether anything
+            # was sent
+            if entry["status"] == "started":
+                self.finish(entry["key"], "interrupted",
+                            error="interrupted before a transaction hash was recorded")
+            return self.get(entry["key"])
+        statuses = [check(tx_hash) for tx_hash in hashes]
+        if None in statuses:
+            return entry
+        if "failed" in statuses:
+            failed = statuses.count("failed")
+            self.finish(entry["key"], "failed",
+                        error=f"{failed} of {len(hashes)} transactions failed onchain")
+        else:
+            result = (entry.get("result")
+                      or f"{entry['tool']} confirmed onchain: {', '.join(hashes)}")
+            self.finish(entry["key"], "complete", result=result)
+        return self.get(entry["key"])
+
+    def reconcile(self, check: Callable[[str], Optional[str]],
+                  active_keys=()) -> List[Dict]:
+        """
+        Settle every in-flight entry left over from an earlier run
+
+        Args:
+            check (Callable): Returns "complete", "failed" or None (unknown) for a
+                transaction hash
+            active_keys: Keys of calls running in this process, which are left alone
+
+        Returns:
+            List[Dict]: The entries after reconciliation
+        """
+        reconciled = []
+        for entry in self.in_flight():
+            if entry["key"] in active_keys:
+                continue
+            try:
+                reconciled.append(self.resolve(entry, check))
+            except Exception as e:
+                print(f"Error reconciling journal entry {entry['key']}: {str(e)}",
+                      file=sys.stderr)
+                reconciled.append(entry)
+        return reconciled
+
+
+def describe_entry(entry: Dict) -> str:
+    """Message returned to the agent instead of repeating a journaled call"""
+    hashes = ", ".join(entry.get("tx_hashes") or []) or "none recorded"
+    age = time.time() - entry["started_at"]
+    if entry["status"] == "complete":
+        return f"Already done {age:.0f}s ago (not repeated): {entry.get('result')}"
+    if entry["status"] == "interrupted":
+        return (f"An identical {entry['tool']} call {age:.0f}s ago was interrupted "
+                "before its transaction was recorded, so it may or may not have gone "
+                "through. Check the wallet's balances, then call again with "
+                "repeat=true if it should be sent.")
+    return (f"An identical {entry['tool']} call was submitted {age:.0f}s ago and is "
+            f"still pending (transactions: {hashes}). Not sending it again; call with "
+            "repeat=true to send another one anyway.")
@@ -0,0 +1,141 @@
+import contextlib
+import json
+import os
+from collections import deque
+from typing import Dict, List
+
+# Rough token estimate; good enough to keep prompts inside a budget without
+# pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message: Dict) -> int:
+    """
+    Estimate how many prompt tokens a chat message costs
+
+    Args:
+        message (Dict): Chat message with content and optional tool calls
+
+    Returns:
+        int: Approximate token count
+    """
+    chars = len(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        chars += len(function.get("name") or "") + len(function.get("arguments") or "")
+    return chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class ConversationMemory:
+    def __init__(self, token_budget: int = None, keep_recent_turns: int = 4,
+                 max_tool_output_chars: int = 500, max_summary_lines: int = 60):
+        """
+        Message history that stays within a token budget
+
+        System messages are kept verbatim, as are the most recent turns (a turn
+        starts at each user message). When the history goes over budget the
+        oldest turns are folded into a bounded summary, so both memory use and
+        prompt size stay flat no matter how long the agent runs.
+
+        Args:
+            token_budget (int): Target prompt size
+                (BASED_AGENT_CONTEXT_TOKENS, default 8000)
+            keep_recent_turns (int): Turns that are never summarized
+            max_tool_output_chars (int): Tool outputs are cut to this length once they
+                are no longer in the latest turn
+            max_summary_lines (int): Oldest summary lines are dropped past this many
+        """
+        if token_budget is None:
+            token_budget = int(os.environ.get("BASED_AGENT_CONTEXT_TOKENS", "8000"))
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.max_tool_output_chars = max_tool_output_chars
+        self.pinned = []
+        self.summary = deque(maxlen=max_summary_lines)
+        self.turns = []
+        self._last_summarized_request = None
+
+    def append(self, message: Dict):
+        """Add one message and compact the history if it is over budget"""
+        self.extend([message])
+
+    def extend(self, messages: List[Dict]):
+        """Add several messages, compacting once at the end"""
+        for message in messages:
+            if message.get("role") == "system":
+                self.pinned.append(message)
+            elif message.get("role") == "user" or not self.turns:
+                self.turns.append([message])
+            else:
+                self.turns[-1].append(message)
+        self.compact()
+
+    def messages(self) -> List[Dict]:
+        """The history to send to the model"""
+        messages = list(self.pinned)
+        if self.summary:
+            lines = "\n".join(f"- {line}" for line in self.summary)
+            content = f"Summary of earlier conversation (oldest first):\n{lines}"
+            messages.append({"role": "system", "content": content})
+        for turn in self.turns:
+            messages.extend(turn)
+        return messages
+
+    def token_count(self) -> int:
+        """Estimated prompt tokens for the current history"""
+        return sum(estimate_tokens(message) for message in self.messages())
+
+    def compact(self):
+        """Fold old turns into the summary until the history fits the budget"""
+        if self.token_count() <= self.token_budget:
+            return
+
+        # Cut large tool outputs everywhere except the latest turn first
+        limit = self.max_tool_output_chars
+        for turn in self.turns[:-1]:
+            for index, message in enumerate(turn):
+                content = message.get("content") or ""
+                if message.get("role") == "tool" and len(content) > limit:
+                    turn[index] = dict(message, content=_shorten(content, limit))
+
+        while (len(self.turns) > self.keep_recent_turns
+               and self.token_count() > self.token_budget):
+            self.summary.extend(self._summarize(self.turns.pop(0)))
+
+        # The summary itself gets at most a quarter of the budget
+        summary_budget = self.token_budget // 4
+        while (len(self.summary) > 1
+               and sum(map(len, self.summary)) // CHARS_PER_TOKEN > summary_budget):
+            self.summary.popleft()
+
+    def _summarize(self, turn: List[Dict]) -> List[str]:
+        lines = []
+        for message in turn:
+            role = message.get("role")
+            if role == "user":
+                request = _shorten(message.get("content"), 200)
+                # The autonomous loop sends the same prompt every turn; note it once
+                if request != self._last_summarized_request:
+                    lines.append(f"User: {request}")
+                self._last_summarized_request = request
+            elif role == "assistant":
+                if message.get("content"):
+                    sender = message.get("sender") or "Assistant"
+                    lines.append(f"{sender}: {_shorten(message['content'], 200)}")
+                for tool_call in message.get("tool_calls") or []:
+                    function = tool_call.get("function", {})
+                    arguments = function.get("arguments") or "{}"
+                    with contextlib.suppress(ValueError):
+                        arguments = json.dumps(json.loads(arguments))
+                    arguments = _shorten(arguments, 120)
+                    lines.append(f"Called {function.get('name')}({arguments})")
+            elif role == "tool":
+                output = _shorten(message.get("content"), 160)
+                lines.append(f"{message.get('tool_name', 'tool')} -> {output}")
+        return lines
@@ -0,0 +1,284 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from render_utils import get_renderer
+
+# Latency buckets in seconds: tool calls range from sub-millisecond cache hits
+# to multi-minute onchain confirmations.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300,
+)
+
+PREFIX = "based_agent_"
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple, extra: Dict = None) -> str:
+    pairs = list(labels) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def percentile(values, q: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers (0 if empty), for exact reports
+    where buckets are too coarse
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(q * len(ordered))
+    return ordered[min(len(ordered) - 1, max(0, rank - 1))]
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Cumulative-bucket histogram in the Prometheus style
+
+        Args:
+            buckets (tuple): Upper bounds of the buckets, ascending
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile from the buckets (the upper bound of its bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        bounds = self.buckets + (float("inf"),)
+        for bound, count in zip(bounds, self.counts, strict=True):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Process-wide counters and latency histograms
+
+        Metric names are short ("tool_seconds"); labels are keyword
+        arguments. Everything can be exported as a JSON snapshot or in the
+        Prometheus text format, where names get the based_agent_ prefix.
+        """
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """Add to a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value (usually seconds) in a histogram"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Time a block into the histogram `name` and count it under `name`_total by
+        outcome
+
+        Example:
+            with metrics.timer("external_seconds", service="twitter",
+                               endpoint="update_status"):
+                api.update_status(content)
+        """
+        start = time.perf_counter()
+        outcome = "success"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+            counter = f"{name.rsplit('_seconds', 1)[0]}_total"
+            self.increment(counter, outcome=outcome, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict:
+        """All metrics as plain data, e.g. for a JSON file"""
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append(dict(dict(labels), value=value))
+            histograms = {}
+            for (name, labels), histogram in sorted(self._histograms.items(),
+                                                    key=lambda item: item[0]):
+                summary = dict(dict(labels), **histogram.summary())
+                histograms.setdefault(name, []).append(summary)
+        return {
+            "ts": time.time(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+            names = sorted({name for name, _ in self._histograms})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items(),
+                                                          key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    bounds = histogram.buckets + (float("inf"),)
+                    for bound, count in zip(bounds, histogram.counts, strict=True):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        bucket = _format_labels(labels, {"le": le})
+                        lines.append(f"{PREFIX}{name}_bucket{bucket} {cumulative}")
+                    series = _format_labels(labels)
+                    lines.append(f"{PREFIX}{name}_sum{series} {histogram.sum}")
+                    lines.append(f"{PREFIX}{name}_count{series} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+        """
+        Serve /metrics (Prometheus text) and /metrics.json from a background thread
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to listen on
+
+        Returns:
+            ThreadingHTTPServer: The running server
+        """
+        server = ThreadingHTTPServer((host, port), make_metrics_handler(self))
+        threading.Thread(target=server.serve_forever, name="metrics-http",
+                         daemon=True).start()
+        return server
+
+    def write_snapshots(self, path: str, interval: float = 60):
+        """
+        Write a JSON snapshot to path every interval seconds from a background thread
+
+        Args:
+            path (str): File to (atomically) overwrite
+            interval (float): Seconds between snapshots
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                self.write_snapshot(path)
+
+        threading.Thread(target=run, name="metrics-snapshots", daemon=True).start()
+
+    def write_snapshot(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def make_metrics_handler(registry: MetricsRegistry):
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.prometheus().encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.snapshot()).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsRequestHandler
+
+
+# The registry every module records into
+metrics = MetricsRegistry()
+
+
+def start_exporters(port: int = None, snapshot_path: str = None,
+                    snapshot_interval: float = None):
+    """
+    Start whichever exporters are configured
+
+    Args:
+        port (int): Prometheus endpoint port (BASED_AGENT_METRICS_PORT); not served
+            if unset
+        snapshot_path (str): JSON snapshot file (BASED_AGENT_METRICS_FILE); not
+            written if unset
+        snapshot_interval (float): Seconds between snapshots
+            (BASED_AGENT_METRICS_INTERVAL, default 60)
+    """
+    port = port or int(os.environ.get("BASED_AGENT_METRICS_PORT", "0"))
+    snapshot_path = snapshot_path or os.environ.get("BASED_AGENT_METRICS_FILE")
+    snapshot_interval = snapshot_interval or float(
+        os.environ.get("BASED_AGENT_METRICS_INTERVAL", "60")
+    )
+    if port:
+        metrics.serve(port=port)
+        get_renderer().status(f"Metrics at http://127.0.0.1:{port}/metrics")
+    if snapshot_path:
+        metrics.write_snapshots(snapshot_path, snapshot_interval)
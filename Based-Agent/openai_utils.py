@@ -0,0 +1,163 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+_client = None
+_replay_client = None
+_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """
+    Return the process-wide OpenAI API client
+
+    Every OpenAI caller (Swarm, the two-agent guide, DALL-E) shares this
+    client and therefore one HTTP connection pool, instead of opening a new
+    pool per call.
+
+    Returns:
+        OpenAI: The shared client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+                from openai import DefaultHttpxClient, OpenAI
+
+                max_connections = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))
+                _client = OpenAI(
+                    http_client=DefaultHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=max_connections,
+                            max_keepalive_connections=max_connections,
+                        )
+                    )
+                )
+    return _client
+
+
+def get_openai_client():
+    """
+    Return the client every OpenAI caller should use
+
+    This is the shared API client, wrapped in a replay_utils.ReplayOpenAI
+    when BASED_AGENT_LLM_REPLAY is set to record, replay or auto. Chat
+    completions are then recorded to (or served from) BASED_AGENT_LLM_CACHE
+    (default llm_responses.jsonl.gz).
+
+    Returns:
+        OpenAI: The shared client or its recording wrapper
+    """
+    global _replay_client
+    mode = os.environ.get("BASED_AGENT_LLM_REPLAY")
+    if not mode:
+        return get_api_client()
+    if _replay_client is None:
+        with _client_lock:
+            if _replay_client is None:
+                from replay_utils import ReplayOpenAI
+
+                path = os.environ.get("BASED_AGENT_LLM_CACHE", "llm_responses.jsonl.gz")
+                _replay_client = ReplayOpenAI(path=path, mode=mode)
+    return _replay_client
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Collapse case, whitespace and trailing punctuation so near-identical prompts
+    share a cache entry
+    """
+    return re.sub(r"\s+", " ", prompt).strip().strip(".!").lower()
+
+
+class ArtCache:
+    def __init__(self, directory: str = None, max_bytes: int = None,
+                 url_ttl_seconds: float = 55 * 60):
+        """
+        On-disk cache for generated artwork
+
+        Entries are stored under a hash of the normalized prompt, model, size
+        and quality. When the directory grows past max_bytes, the least
+        recently used entries are deleted. DALL-E image URLs expire after an
+        hour, so entries older than url_ttl_seconds count as misses.
+
+        Args:
+            directory (str): Cache directory (ART_CACHE_DIR, default .art_cache)
+            max_bytes (int): Size limit for the directory
+                (ART_CACHE_MAX_BYTES, default 5 MB)
+            url_ttl_seconds (float): How long a cached image URL is served
+        """
+        self.directory = directory or os.environ.get("ART_CACHE_DIR", ".art_cache")
+        self.max_bytes = max_bytes or int(
+            os.environ.get("ART_CACHE_MAX_BYTES", str(5 * 1024 * 1024))
+        )
+        self.url_ttl_seconds = url_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str, model: str, size: str, quality: str) -> str:
+        """Content address for a generation request"""
+        request = json.dumps([normalize_prompt(prompt), model, size, quality])
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, prompt: str, model: str, size: str, quality: str) -> Optional[str]:
+        """
+        Return the cached image URL for a request, if it is still valid
+
+        Returns:
+            Optional[str]: The image URL, or None on a miss
+        """
+        path = self._path(self.key(prompt, model, size, quality))
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry["created_at"] > self.url_ttl_seconds:
+            self.misses += 1
+            return None
+        # Touch the file so eviction treats it as recently used
+        os.utime(path)
+        self.hits += 1
+        return entry["url"]
+
+    def put(self, prompt: str, model: str, size: str, quality: str, url: str):
+        """Store the image URL for a request, then evict entries over the size limit"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(self.key(prompt, model, size, quality))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"prompt": prompt, "model": model, "size": size,
+                       "quality": quality, "url": url, "created_at": time.time()}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+                total -= size
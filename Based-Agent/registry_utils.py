@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# CDP indexes newly deployed ERC-20 tokens after roughly half an hour; until
+# then transfers and balance reads of the token fail with UnsupportedAssetError.
+DEFAULT_INDEX_DELAY_SECONDS = 30 * 60
+# How long an unsupported-asset answer from CDP is trusted before asking again
+DEFAULT_INDEX_RECHECK_SECONDS = 60
+
+
+class ContractRegistry:
+    def __init__(self, path: str = None, index_delay_seconds: float = None,
+                 index_recheck_seconds: float = None):
+        """
+        Local index of contracts the agent deployed, persisted to a JSON file
+
+        Entries are filed under the network and the wallet address that
+        deployed them, and can be looked up by address, symbol or name, so
+        tools can take "MOON" where they used to need the contract address.
+        The registry also remembers whether CDP has indexed each token yet,
+        so an unsupported-asset error for a fresh token can be explained.
+
+        Args:
+            path (str): JSON file (BASED_AGENT_CONTRACTS, default contracts.json)
+            index_delay_seconds (float): How long CDP usually takes to index a new token
+                (BASED_AGENT_INDEX_DELAY_SECONDS, default 1800)
+            index_recheck_seconds (float): How long a token CDP reported unsupported
+                is answered locally before CDP is asked again
+                (BASED_AGENT_INDEX_RECHECK_SECONDS, default 60)
+        """
+        self.path = path or os.environ.get("BASED_AGENT_CONTRACTS", "contracts.json")
+        if index_delay_seconds is None:
+            index_delay_seconds = float(os.environ.get(
+                "BASED_AGENT_INDEX_DELAY_SECONDS", DEFAULT_INDEX_DELAY_SECONDS
+            ))
+        self.index_delay_seconds = index_delay_seconds
+        if index_recheck_seconds is None:
+            index_recheck_seconds = float(os.environ.get(
+                "BASED_AGENT_INDEX_RECHECK_SECONDS", DEFAULT_INDEX_RECHECK_SECONDS
+            ))
+        self.index_recheck_seconds = index_recheck_seconds
+        self._contracts = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(network_id: str, owner: str, address: str) -> str:
+        return f"{network_id}:{owner.lower()}:{address.lower()}"
+
+    def _load(self):
+        if self._contracts is not None:
+            return
+        self._contracts = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for entry in json.load(f).get("contracts", []):
+                    key = self._key(entry["network_id"], entry.get("owner", ""),
+                                    entry["address"])
+                    self._contracts[key] = entry
+
+    def _save(self):
+        # Write to a temporary file first so a crash never leaves a half-written
+        # registry
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"contracts": list(self._contracts.values())}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def register(self, network_id: str, owner: str, kind: str, address: str,
+                 name: str, symbol: str, **details) -> Dict:
+        """
+        Record a deployed contract
+
+        Args:
+            network_id (str): Network it was deployed on
+            owner (str): Address of the wallet that deployed it
+            kind (str): "erc20" or "erc721"
+            address (str): Contract address
+            name (str): Token or collection name
+            symbol (str): Token or collection symbol
+            **details: Anything else worth keeping (initial_supply, base_uri, ...)
+
+        Returns:
+            Dict: The stored entry
+        """
+        entry = dict(details, network_id=network_id, owner=owner, kind=kind,
+                     address=address, name=name, symbol=symbol, deployed_at=time.time(),
+                     indexed=False if kind == "erc20" else None)
+        with self._lock:
+            self._load()
+            self._contracts[self._key(network_id, owner, address)] = entry
+            self._save()
+        return dict(entry)
+
+    def contracts(self, network_id: str, owner: str, kind: str = None) -> List[Dict]:
+        """A wallet's contracts on a network, newest first, optionally of one kind"""
+        owner = owner.lower()
+        with self._lock:
+            self._load()
+            entries = [dict(entry) for entry in self._contracts.values()
+                       if entry["network_id"] == network_id
+                       and entry.get("owner", "").lower() == owner
+                       and (kind is None or entry["kind"] == kind)]
+        return sorted(entries, key=lambda entry: entry["deployed_at"], reverse=True)
+
+    def lookup(self, identifier: str, network_id: str, owner: str,
+               kind: str = None) -> Optional[Dict]:
+        """
+        Find a contract by address, symbol or name (case-insensitive); the newest
+        deployment wins
+
+        Args:
+            identifier (str): Address, symbol or name
+            network_id (str): Network to search
+            owner (str): Wallet address whose contracts are searched
+            kind (str): Only match this kind of contract
+
+        Returns:
+            Optional[Dict]: The entry, or None if nothing matches
+        """
+        wanted = str(identifier).strip().lower()
+        for entry in self.contracts(network_id, owner, kind):
+            names = (entry["address"], str(entry["symbol"]), str(entry["name"]))
+            if wanted in (name.lower() for name in names):
+                return entry
+        return None
+
+    def resolve(self, identifier: str, network_id: str, owner: str,
+                kind: str = None) -> str:
+        """The contract address for a known symbol or name, otherwise the identifier"""
+        entry = self.lookup(identifier, network_id, owner, kind)
+        return entry["address"] if entry else identifier
+
+    def set_indexed(self, network_id: str, owner: str, address: str, indexed: bool):
+        """
+        Record the outcome of a CDP call involving a token
+
+        Args:
+            network_id (str): Network of the token
+            owner (str): Wallet address that deployed it
+            address (str): Token address
+            indexed (bool): True if CDP accepted the token, False if it reported it
+                unsupported
+        """
+        with self._lock:
+            self._load()
+            entry = self._contracts.get(self._key(network_id, owner, address))
+            if entry is None or (indexed and entry.get("indexed") is True):
+                # Unknown contract, or nothing new to record
+                return
+            entry["indexed"] = indexed
+            if not indexed:
+                # Starts the recheck interval of awaiting_index
+                entry["index_checked_at"] = time.time()
+            self._save()
+
+    def awaiting_index(self, network_id: str, owner: str,
+                       address: str) -> Optional[Dict]:
+        """
+        The entry for a token CDP reported unsupported less than
+        index_recheck_seconds ago, so the answer can be given without asking CDP
+
+        Args:
+            network_id (str): Network of the token
+            owner (str): Wallet address that deployed it
+            address (str): Token address
+
+        Returns:
+            Optional[Dict]: The entry, or None if CDP should be asked
+        """
+        with self._lock:
+            self._load()
+            entry = self._contracts.get(self._key(network_id, owner, address))
+            if (entry is None or entry.get("indexed") is not False
+                    or "index_checked_at" not in entry):
+                return None
+            if time.time() - entry["index_checked_at"] >= self.index_recheck_seconds:
+                return None
+            return dict(entry)
+
+    def expected_index_wait(self, entry: Dict) -> float:
+        """Seconds until CDP would usually have indexed a token, 0 once it has"""
+        return max(0.0, entry["deployed_at"] + self.index_delay_seconds - time.time())
+
+
+def describe_contract(entry: Dict) -> str:
+    """One line description of a registry entry for the agent"""
+    age_minutes = (time.time() - entry["deployed_at"]) / 60
+    status = ""
+    if entry["kind"] == "erc20":
+        indexed = entry.get("indexed")
+        status = ", indexed by CDP" if indexed else ", not yet indexed by CDP"
+    return (f"{entry['symbol']} ({entry['name']}): {entry['kind'].upper()} "
+            f"at {entry['address']} on {entry['network_id']}, "
+            f"deployed {age_minutes:.0f} min ago{status}")
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+import threading
+import time
+
+
+class TerminalRenderer:
+    def __init__(self, stream=None, flush_interval: float = None):
+        """
+        Colored terminal output with buffered writes
+
+        Streamed tokens are collected in a buffer and written out at most
+        once per flush_interval, and always at the end of a message, instead
+        of one write and flush per token.
+
+        Args:
+            stream: File to write to (default sys.stdout)
+            flush_interval (float): Seconds between flushes
+                (BASED_AGENT_FLUSH_INTERVAL, default 0.05)
+        """
+        self.stream = stream or sys.stdout
+        if flush_interval is None:
+            flush_interval = float(os.environ.get("BASED_AGENT_FLUSH_INTERVAL", "0.05"))
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._in_message = False
+
+    def _write(self, text: str):
+        self._buffer.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def status(self, text: str):
+        """A plain progress line such as "Starting autonomous Based Agent loop..." """
+        self._write(f"{text}\n")
+        self.flush()
+
+    def note(self, label: str, text: str, color: str = "90"):
+        """A line that isn't part of the agent's response, e.g. the autonomous prompt"""
+        self._write(f"\n\033[{color}m{label}:\033[0m {text}\n")
+        self.flush()
+
+    def content(self, sender: str, text: str):
+        if not self._in_message:
+            self._write(f"\033[94m{sender}:\033[0m ")
+            self._in_message = True
+        self._write(text)
+
+    def tool_call(self, sender: str, name: str):
+        self._write(f"\033[94m{sender}: \033[95m{name}\033[0m()\n")
+
+    def message_end(self):
+        if self._in_message:
+            self._write("\n")
+            self._in_message = False
+        self.flush()
+
+    def response(self, response):  # noqa: ARG002
+        self.flush()
+
+
+class JsonlRenderer:
+    def __init__(self, stream=None):
+        """
+        Headless output for log pipelines: one JSON object per line
+
+        Each assistant message, tool call and tool result is written as its
+        own line once the turn finishes.
+
+        Args:
+            stream: File to write to (default sys.stdout)
+        """
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def _emit(self, record: dict):
+        record = dict(record, ts=time.time())
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def status(self, text: str):
+        self._emit({"type": "status", "content": text})
+
+    def note(self, label: str, text: str, color: str = None):  # noqa: ARG002
+        self._emit({"type": "note", "label": label, "content": text})
+
+    def content(self, sender: str, text: str):
+        pass
+
+    def tool_call(self, sender: str, name: str):
+        pass
+
+    def message_end(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def response(self, response):
+        for message in response.messages:
+            if message.get("role") == "assistant":
+                if message.get("content"):
+                    self._emit({"type": "message", "sender": message.get("sender"),
+                                "content": message["content"]})
+                for tool_call in message.get("tool_calls") or []:
+                    function = tool_call["function"]
+                    self._emit({
+                        "type": "tool_call",
+                        "sender": message.get("sender"),
+                        "id": tool_call.get("id"),
+                        "name": function["name"],
+                        "arguments": function["arguments"],
+                    })
+            elif message.get("role") == "tool":
+                self._emit({
+                    "type": "tool_result",
+                    "id": message.get("tool_call_id"),
+                    "name": message.get("tool_name"),
+                    "content": message.get("content"),
+                })
+
+
+RENDERERS = {
+    "terminal": TerminalRenderer,
+    "jsonl": JsonlRenderer,
+}
+
+_renderer = None
+
+
+def get_renderer():
+    """
+    Return the process-wide renderer, chosen by BASED_AGENT_OUTPUT
+    ("terminal" or "jsonl")
+
+    Returns:
+        The renderer
+    """
+    global _renderer
+    if _renderer is None:
+        set_renderer(os.environ.get("BASED_AGENT_OUTPUT", "terminal"))
+    return _renderer
+
+
+def set_renderer(name):
+    """
+    Switch the process-wide renderer
+
+    Args:
+        name (Union[str, object]): "terminal" or "jsonl", or a renderer instance
+    """
+    global _renderer
+    if not isinstance(name, str):
+        _renderer = name
+        return
+    if name not in RENDERERS:
+        raise ValueError(
+            f"Unknown output mode {name}; choose from {', '.join(RENDERERS)}"
+        )
+    _renderer = RENDERERS[name]()
@@ -0,0 +1,192 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import types
+from typing import Dict, Optional
+
+# Recorded model responses, so unchanged requests (an eval suite, a replayed
+# development run) are answered from disk instead of the API.
+
+MODES = ("record", "replay", "auto")
+
+
+def request_key(params: Dict) -> str:
+    """
+    Key for a chat completion request: a hash of everything sent to the model
+
+    Args:
+        params (Dict): Keyword arguments of chat.completions.create
+
+    Returns:
+        str: Hex digest that changes whenever the model, messages, tools or options
+            change
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class ResponseStore:
+    def __init__(self, path: str):
+        """
+        Append-only JSON lines file of request key -> response
+
+        Paths ending in .gz are gzip compressed; each record is appended as
+        its own gzip member, so the file stays valid after every write.
+        Everything is held in memory once loaded.
+
+        Args:
+            path (str): File to read and append to
+        """
+        self.path = path
+        self._responses = None
+        self._lock = threading.Lock()
+
+    def _open(self, mode: str, path: str = None):
+        # path defaults to the store; the format always follows the store's name
+        if self.path.endswith(".gz"):
+            return gzip.open(path or self.path, mode + "t", encoding="utf-8")
+        return open(path or self.path, mode)
+
+    def _load(self):
+        if self._responses is not None:
+            return
+        self._responses = {}
+        torn = False
+        try:
+            with self._open("r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True
+                        continue
+                    self._responses[record["key"]] = record["response"]
+        except FileNotFoundError:
+            pass
+        except (EOFError, gzip.BadGzipFile):
+            torn = True
+        if torn:
+            # A record torn by a crash mid-write. Everything before it was read;
+            # rewrite the file so later appends aren't stranded behind it.
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp_path = f"{self.path}.tmp"
+        with self._open("w", tmp_path) as f:
+            for key, response in self._responses.items():
+                f.write(json.dumps({"key": key, "response": response}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            self._load()
+            return self._responses.get(key)
+
+    def put(self, key: str, response: Dict):
+        with self._lock:
+            self._load()
+            self._responses[key] = response
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._open("a") as f:
+                f.write(json.dumps({"key": key, "response": response}) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._responses)
+
+
+class ReplayOpenAI:
+    def __init__(self, client=None, path: str = "llm_responses.jsonl.gz",
+                 mode: str = "auto"):
+        """
+        OpenAI client wrapper that records and replays chat completions
+
+        Streamed completions are recorded chunk by chunk and replayed as the
+        same sequence of chunks. Every other attribute (images, embeddings,
+        ...) is passed through to the wrapped client untouched.
+
+        Args:
+            client (OpenAI): Client used for requests that aren't recorded, the shared
+                one if omitted
+            path (str): Response store file
+            mode (str): "record" always calls the API and saves the response,
+                "replay" only answers from the store (raising ReplayMiss otherwise),
+                "auto" replays what it has and records the rest
+        """
+        if mode not in MODES:
+            raise ValueError(
+                f"Unknown replay mode {mode}; choose from {', '.join(MODES)}"
+            )
+        self._client = client
+        self.mode = mode
+        self.store = ResponseStore(path)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        completions = types.SimpleNamespace(create=self._create)
+        self.chat = types.SimpleNamespace(completions=completions)
+
+    @property
+    def client(self):
+        # Created on first miss, so replaying needs no API key
+        if self._client is None:
+            from openai_utils import get_api_client
+
+            self._client = get_api_client()
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _create(self, **params):
+        key = request_key(params)
+        if self.mode != "record":
+            recorded = self.store.get(key)
+            if recorded is not None:
+                with self._stats_lock:
+                    self.hits += 1
+                return self._rebuild(recorded)
+            if self.mode == "replay":
+                raise ReplayMiss(f"No recorded response for request {key[:12]}")
+        with self._stats_lock:
+            self.misses += 1
+        response = self.client.chat.completions.create(**params)
+        if params.get("stream"):
+            return self._record_stream(key, response)
+        self.store.put(key, {"completion": response.model_dump(mode="json")})
+        return response
+
+    @staticmethod
+    def _rebuild(recorded: Dict):
+        # Fresh objects on every hit: callers (Swarm) modify the message they get back
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        if "chunks" in recorded:
+            return (ChatCompletionChunk.model_validate(chunk)
+                    for chunk in recorded["chunks"])
+        return ChatCompletion.model_validate(recorded["completion"])
+
+    def _record_stream(self, key: str, stream):
+        # Saved only once the stream has been read to the end
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk.model_dump(mode="json"))
+            yield chunk
+        self.store.put(key, {"chunks": chunks})
+
+    def stats(self) -> Dict:
+        """Hit and miss counts, for logs"""
+        with self._stats_lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses,
+                    "recorded": len(self.store)}
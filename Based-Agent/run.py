@@ -1,77 +1,174 @@
-import time
+import argparse
 import json
-from swarm import Swarm
-from swarm.repl import run_demo_loop
-from agents import based_agent
-from openai import OpenAI
+import os
 
+from metrics_utils import metrics, start_exporters
+from render_utils import RENDERERS, get_renderer, set_renderer
 
+# Swarm, the OpenAI client and the agent are imported once a mode has been
+# chosen so the mode menu shows up without waiting on heavy imports.
+
+
+def create_client():
+    """
+    Swarm client that runs independent tool calls from one turn in parallel and
+    only offers the tools a turn needs.
+    """
+    from agents import ALWAYS_OFFERED_TOOLS, SERIALIZED_TOOLS, TOOL_GROUPS
+    from openai_utils import get_openai_client
+    from swarm_utils import ParallelSwarm
+    from tool_utils import ToolRouter
+
+    # BASED_AGENT_TOOL_ROUTING=0 offers every tool on every request
+    router = None
+    routing = os.environ.get("BASED_AGENT_TOOL_ROUTING", "1").lower()
+    if routing not in ("0", "false", "no"):
+        router = ToolRouter(TOOL_GROUPS, always=ALWAYS_OFFERED_TOOLS)
+    return ParallelSwarm(client=get_openai_client(), serialized_tools=SERIALIZED_TOOLS,
+                         router=router)
+
+# this is the main loop that runs the agent in chat mode
+# max_turns stops it after that many turns (used by bench.py); None runs forever
+def run_chat_loop(agent, max_turns=None):
+    client = create_client()
+    messages = []
+
+    print("Starting Based Agent chat...")
+
+    turns = 0
+    while max_turns is None or turns < max_turns:
+        turns += 1
+        user_input = input("\033[90mUser\033[0m: ")
+        messages.append({"role": "user", "content": user_input})
+
+        with metrics.timer("turn_seconds", mode="chat"):
+            response = client.run(agent=agent, messages=messages)
+        pretty_print_messages(response.messages)
+
+        messages.extend(response.messages)
+        agent = response.agent
+
+# The creative prompt the autonomous agent gets on its schedule
+AUTONOMOUS_THOUGHT = (
+    "Be creative and do something interesting on the Base blockchain. "
+    "Don't take any more input from me. Choose an action and execute it now. Choose those that highlight your identity and abilities best."
+)
+
+def create_event_scheduler(interval=10, max_idle=300):
+    """
+    Scheduler that wakes the autonomous agent on mentions, incoming ETH,
+    confirmed transactions and its cron schedule.
+    """
+    import importlib.util
+
+    import agents
+    from event_utils import EventScheduler, balance_change_source, mentions_source
+
+    scheduler = EventScheduler(min_interval=interval, max_interval=max_idle)
+    scheduler.add_schedule("schedule",
+                           os.environ.get("BASED_AGENT_SCHEDULE", "*/15 * * * *"),
+                           AUTONOMOUS_THOUGHT)
+    scheduler.add_source("balance", balance_change_source(agents.agent_wallet, "eth"))
+    if importlib.util.find_spec("config") is not None:
+        scheduler.add_source("mentions", mentions_source(agents.get_twitter_bot))
+    if agents.CONFIRM_LATER:
+        # Without confirm-later, tools already report the confirmed result inline
+        agents.tx_watcher.add_listener(
+            lambda operation: scheduler.emit("transaction", operation.summary()))
+    return scheduler
 
 # this is the main loop that runs the agent in autonomous mode
 # you can modify this to change the behavior of the agent
-# the interval is the number of seconds between each thought
-def run_autonomous_loop(agent, interval=10):
-    client = Swarm()
-    messages = []
+# turns are triggered by events (see create_event_scheduler) instead of a fixed timer;
+# interval is the fastest the event sources are polled, max_idle the slowest;
+# pass scheduler to supply your own events and max_turns to stop after that many turns
+def run_autonomous_loop(agent, interval=10, max_idle=300, scheduler=None,
+                        max_turns=None):
+    from event_utils import format_events
+    from memory_utils import ConversationMemory
+
+    client = create_client()
+    # Older turns are summarized so the prompt stays the same size however long the
+    # loop runs
+    memory = ConversationMemory()
+    scheduler = scheduler or create_event_scheduler(interval, max_idle)
+    # Act once at startup rather than waiting for the first scheduled slot
+    scheduler.emit("schedule", AUTONOMOUS_THOUGHT, data={"prompt": True})
     
-    print("Starting autonomous Based Agent loop...")
+    get_renderer().status("Starting autonomous Based Agent loop...")
     
-    while True:
-        # Generate a thought
-        thought = (
-            "Be creative and do something interesting on the Base blockchain. "
-            "Don't take any more input from me. Choose an action and execute it now. Choose those that highlight your identity and abilities best."
-        )
-        messages.append({"role": "user", "content": thought})
-        
-        print(f"\n\033[90mAgent's Thought:\033[0m {thought}")
+    turns = 0
+    while max_turns is None or turns < max_turns:
+        turns += 1
+        # Sleep until something happens
+        thought = format_events(scheduler.wait())
+        memory.append({"role": "user", "content": thought})
         
-        # Run the agent to generate a response and take action
-        response = client.run(
-            agent=agent,
-            messages=messages,
-            stream=True
-        )
+        get_renderer().note("Agent's Thought", thought)
         
-        # Process and print the streaming response
-        response_obj = process_and_print_streaming_response(response)
+        with metrics.timer("turn_seconds", mode="auto"):
+            # Run the agent to generate a response and take action
+            response = client.run(
+                agent=agent,
+                messages=memory.messages(),
+                stream=True
+            )
+            
+            # Process and print the streaming response
+            response_obj = process_and_print_streaming_response(response)
         
         # Update messages with the new response
-        messages.extend(response_obj.messages)
-        
-        # Wait for the specified interval
-        time.sleep(interval)
+        memory.extend(response_obj.messages)
+
+# The guide that plays the user in two-agent mode (and in batch.py)
+GUIDE_MODEL = "gpt-3.5-turbo"
+GUIDE_INSTRUCTIONS = "You are a user guiding a blockchain agent through various tasks on the Base blockchain. Engage in a conversation, suggesting actions and responding to the agent's outputs. Be creative and explore different blockchain capabilities. Options include creating tokens, transferring assets, minting NFTs, and getting balances. You're not simulating a conversation, but you will be in one yourself. Make sure you follow the rules of improv and always ask for some sort of function to occur. Be unique and interesting."
+GUIDE_OPENING = "Start a conversation with the Based Agent and guide it through some blockchain tasks."
+
+def ask_guide(openai_client, openai_messages):
+    """Get the guide's next message, timed into the metrics."""
+    with metrics.timer("llm_seconds", model=GUIDE_MODEL, role="guide"):
+        openai_response = openai_client.chat.completions.create(
+            model=GUIDE_MODEL,
+            messages=openai_messages
+        )
+    if openai_response.usage is not None:
+        usage = openai_response.usage
+        metrics.increment("llm_prompt_tokens_total", usage.prompt_tokens,
+                          model=GUIDE_MODEL, role="guide")
+        metrics.increment("llm_completion_tokens_total", usage.completion_tokens,
+                          model=GUIDE_MODEL, role="guide")
+    return openai_response.choices[0].message.content
 
 # this is the main loop that runs the agent in two-agent mode
 # you can modify this to change the behavior of the agent
+# for many unattended conversations at once, see batch.py
 def run_openai_conversation_loop(agent):
     """Facilitates a conversation between an OpenAI-powered agent and the Based Agent."""
-    client = Swarm()
-    openai_client = OpenAI()
+    from openai_utils import get_openai_client
+
+    client = create_client()
+    openai_client = get_openai_client()
     messages = []
     
-    print("Starting OpenAI-Based Agent conversation loop...")
+    get_renderer().status("Starting OpenAI-Based Agent conversation loop...")
     
     # Initial prompt to start the conversation
     openai_messages = [
-        {"role": "system", "content": "You are a user guiding a blockchain agent through various tasks on the Base blockchain. Engage in a conversation, suggesting actions and responding to the agent's outputs. Be creative and explore different blockchain capabilities. Options include creating tokens, transferring assets, minting NFTs, and getting balances. You're not simulating a conversation, but you will be in one yourself. Make sure you follow the rules of improv and always ask for some sort of function to occur. Be unique and interesting."},
-        {"role": "user", "content": "Start a conversation with the Based Agent and guide it through some blockchain tasks."}
+        {"role": "system", "content": GUIDE_INSTRUCTIONS},
+        {"role": "user", "content": GUIDE_OPENING}
     ]
     
     while True:
         # Generate OpenAI response
-        openai_response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=openai_messages
-        )
-        
-        openai_message = openai_response.choices[0].message.content
-        print(f"\n\033[92mOpenAI Guide:\033[0m {openai_message}")
+        openai_message = ask_guide(openai_client, openai_messages)
+        get_renderer().note("OpenAI Guide", openai_message, color="92")
         
         # Send OpenAI's message to Based Agent
         messages.append({"role": "user", "content": openai_message})
-        response = client.run(agent=agent, messages=messages, stream=True)
-        response_obj = process_and_print_streaming_response(response)
+        with metrics.timer("turn_seconds", mode="two-agent"):
+            response = client.run(agent=agent, messages=messages, stream=True)
+            response_obj = process_and_print_streaming_response(response)
         
         # Update messages with Based Agent's response
         messages.extend(response_obj.messages)
@@ -85,12 +182,20 @@ def run_openai_conversation_loop(agent):
         if user_input.lower() == 'exit':
             break
 
+# this serves the agent over HTTP so one process can hold many conversations
+# each session keeps its own history; onchain tools still run one at a time
+def run_server_mode(agent, host="127.0.0.1", port=8000):
+    from server import run_server
+
+    run_server(agent, create_client(), host=host, port=port)
+
 def choose_mode():
     while True:
         print("\nAvailable modes:")
         print("1. chat    - Interactive chat mode")
         print("2. auto    - Autonomous action mode")
         print("3. two-agent - AI-to-agent conversation mode")
+        print("4. server  - Local HTTP API serving many sessions")
         
         choice = input("\nChoose a mode (enter number or name): ").lower().strip()
         
@@ -98,9 +203,11 @@ def choose_mode():
             '1': 'chat',
             '2': 'auto',
             '3': 'two-agent',
+            '4': 'server',
             'chat': 'chat',
             'auto': 'auto',
-            'two-agent': 'two-agent'
+            'two-agent': 'two-agent',
+            'server': 'server'
         }
         
         if choice in mode_map:
@@ -108,8 +215,10 @@ def choose_mode():
         print("Invalid choice. Please try again.")
 
 # Boring stuff to make the logs pretty
-def process_and_print_streaming_response(response):
-    content = ""
+# Output goes through the renderer from render_utils: buffered colored text by
+# default, or one JSON line per message and tool call with --output jsonl.
+def process_and_print_streaming_response(response, renderer=None):
+    renderer = renderer or get_renderer()
     last_sender = ""
 
     for chunk in response:
@@ -117,11 +226,7 @@ def process_and_print_streaming_response(response):
             last_sender = chunk["sender"]
 
         if "content" in chunk and chunk["content"] is not None:
-            if not content and last_sender:
-                print(f"\033[94m{last_sender}:\033[0m", end=" ", flush=True)
-                last_sender = ""
-            print(chunk["content"], end="", flush=True)
-            content += chunk["content"]
+            renderer.content(last_sender, chunk["content"])
 
         if "tool_calls" in chunk and chunk["tool_calls"] is not None:
             for tool_call in chunk["tool_calls"]:
@@ -129,13 +234,13 @@ def process_and_print_streaming_response(response):
                 name = f["name"]
                 if not name:
                     continue
-                print(f"\033[94m{last_sender}: \033[95m{name}\033[0m()")
+                renderer.tool_call(last_sender, name)
 
-        if "delim" in chunk and chunk["delim"] == "end" and content:
-            print()  # End of response message
-            content = ""
+        if "delim" in chunk and chunk["delim"] == "end":
+            renderer.message_end()  # End of response message
 
         if "response" in chunk:
+            renderer.response(chunk["response"])
             return chunk["response"]
 
 
@@ -162,19 +267,50 @@ def pretty_print_messages(messages) -> None:
             print(f"\033[95m{name}\033[0m({arg_str[1:-1]})")
 
 def main():
-    mode = choose_mode()
+    parser = argparse.ArgumentParser(description="Run the Based Agent")
+    parser.add_argument("--mode", choices=["chat", "auto", "two-agent", "server"],
+                        help="Skip the mode menu")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface for server mode")
+    parser.add_argument("--port", type=int, default=8000, help="Port for server mode")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus metrics on this port "
+                             "(or BASED_AGENT_METRICS_PORT)")
+    parser.add_argument("--output", choices=list(RENDERERS),
+                        help="Output format (default terminal, or BASED_AGENT_OUTPUT)")
+    parser.add_argument("--llm-replay", choices=["record", "replay", "auto"],
+                        help="Record model responses, or serve recorded ones without "
+                             "the API (or BASED_AGENT_LLM_REPLAY)")
+    parser.add_argument("--llm-cache",
+                        help="Recorded model responses (default "
+                             "llm_responses.jsonl.gz, or BASED_AGENT_LLM_CACHE)")
+    args = parser.parse_args()
+
+    # Read by openai_utils.get_openai_client, so every model call goes through the
+    # recorder
+    if args.llm_replay:
+        os.environ["BASED_AGENT_LLM_REPLAY"] = args.llm_replay
+    if args.llm_cache:
+        os.environ["BASED_AGENT_LLM_CACHE"] = args.llm_cache
+
+    if args.output:
+        set_renderer(args.output)
+    start_exporters(port=args.metrics_port)
+    get_renderer().status("Starting Based Agent...")
+    mode = args.mode or choose_mode()
+
+    from agents import based_agent
     
     mode_functions = {
-        'chat': lambda: run_demo_loop(based_agent),
+        'chat': lambda: run_chat_loop(based_agent),
         'auto': lambda: run_autonomous_loop(based_agent),
-        'two-agent': lambda: run_openai_conversation_loop(based_agent)
+        'two-agent': lambda: run_openai_conversation_loop(based_agent),
+        'server': lambda: run_server_mode(based_agent, args.host, args.port)
     }
     
-    print(f"\nStarting {mode} mode...")
+    get_renderer().status(f"\nStarting {mode} mode...")
     mode_functions[mode]()
 
 if __name__ == "__main__":
-    print("Starting Based Agent...")
     main()
 
 
@@ -0,0 +1,344 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from memory_utils import ConversationMemory
+from metrics_utils import metrics
+from render_utils import get_renderer
+
+
+class Session:
+    def __init__(self, session_id: str, agent):
+        """
+        One user's conversation with the agent
+
+        Args:
+            session_id (str): ID handed to the client
+            agent (Agent): Agent the session starts with
+        """
+        self.id = session_id
+        self.agent = agent
+        self.memory = ConversationMemory()
+        # lock is held for a whole turn; memory_lock only while the history is
+        # read or changed
+        self.lock = threading.Lock()
+        self.memory_lock = threading.Lock()
+        self.last_used = time.time()
+
+    def history(self) -> list:
+        """A copy of the conversation so far, safe to read while a turn is running"""
+        with self.memory_lock:
+            return [dict(message) for message in self.memory.messages()]
+
+
+class AgentService:
+    def __init__(self, agent, client, max_workers: int = None, max_pending: int = None,
+                 max_sessions: int = 1000, idle_timeout: float = 3600):
+        """
+        Runs many concurrent conversations with the agent
+
+        Turns from different sessions run in parallel on a bounded worker
+        pool. Turns within one session run one at a time, in order. Onchain
+        tools are serialized across all sessions by the client's wallet lock
+        (see swarm_utils.ParallelSwarm).
+
+        Args:
+            agent (Agent): Agent new sessions start with
+            client (Swarm): Client used to run turns
+            max_workers (int): Turns run at once (BASED_AGENT_SERVER_WORKERS, default 8)
+            max_pending (int): Turns running or waiting before requests are refused
+                (default 4x workers)
+            max_sessions (int): Sessions kept before idle ones are dropped
+            idle_timeout (float): Seconds after which an unused session may be dropped
+        """
+        self.agent = agent
+        self.client = client
+        self.max_workers = max_workers or int(
+            os.environ.get("BASED_AGENT_SERVER_WORKERS", "8")
+        )
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(self.max_workers,
+                                            thread_name_prefix="session")
+        self._pending = threading.BoundedSemaphore(max_pending or self.max_workers * 4)
+
+    def create_session(self) -> Session:
+        """Start a new conversation, dropping idle ones if there are too many"""
+        with self._sessions_lock:
+            if len(self.sessions) >= self.max_sessions:
+                cutoff = time.time() - self.idle_timeout
+                for session_id, session in list(self.sessions.items()):
+                    if session.last_used < cutoff and not session.lock.locked():
+                        del self.sessions[session_id]
+            if len(self.sessions) >= self.max_sessions:
+                raise OverflowError("Too many active sessions")
+            session = Session(uuid.uuid4().hex, self.agent)
+            self.sessions[session.id] = session
+            return session
+
+    def get_session(self, session_id: str) -> Session:
+        with self._sessions_lock:
+            return self.sessions.get(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._sessions_lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def _run_turn(self, session: Session, content: str) -> list:
+        with session.lock:
+            with session.memory_lock:
+                session.memory.append({"role": "user", "content": content})
+                messages = session.memory.messages()
+            with metrics.timer("turn_seconds", mode="server"):
+                response = self.client.run(agent=session.agent, messages=messages)
+            with session.memory_lock:
+                session.memory.extend(response.messages)
+            session.agent = response.agent or session.agent
+            session.last_used = time.time()
+            return response.messages
+
+    def send(self, session: Session, content: str) -> list:
+        """
+        Run one turn in a session on the worker pool
+
+        Args:
+            session (Session): The conversation
+            content (str): The user's message
+
+        Returns:
+            list: Messages the agent produced this turn
+
+        Raises:
+            BlockingIOError: If the server is already at capacity
+        """
+        if not self._pending.acquire(blocking=False):
+            raise BlockingIOError("Server is busy, try again shortly")
+        try:
+            return self._executor.submit(self._run_turn, session, content).result()
+        finally:
+            self._pending.release()
+
+
+SESSION_PATH = re.compile(r"^/sessions/([0-9a-f]+)(/messages|/ws)?$")
+
+# RFC 6455: the handshake answer is derived from the client's key and this GUID
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x8, 0x9, 0xA
+# Larger client messages close the connection (status 1009)
+MAX_WEBSOCKET_MESSAGE = 1 << 20
+
+
+def websocket_accept(key: str) -> str:
+    """The Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def read_frame(stream):
+    """
+    Read one WebSocket frame, unmasking client payloads
+
+    Args:
+        stream: Binary file to read from (a handler's rfile)
+
+    Returns:
+        tuple: (fin, opcode, payload), or None if the connection was closed
+
+    Raises:
+        ValueError: If the frame is larger than MAX_WEBSOCKET_MESSAGE
+    """
+    header = stream.read(2)
+    if len(header) < 2:
+        return None
+    fin, opcode = bool(header[0] & 0x80), header[0] & 0x0F
+    masked, length = header[1] & 0x80, header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", stream.read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", stream.read(8))[0]
+    if length > MAX_WEBSOCKET_MESSAGE:
+        raise ValueError(f"WebSocket frame of {length} bytes is too large")
+    mask = stream.read(4) if masked else b""
+    payload = stream.read(length)
+    if masked:
+        payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return fin, opcode, payload
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    """A single unmasked server-to-client frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def make_handler(service: AgentService):
+    class AgentRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, body: dict):
+            payload = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length)
+
+        def _turn(self, session: Session, body: bytes):
+            """Run the turn a request body asks for; returns (status, response)"""
+            try:
+                content = json.loads(body or b"{}")["content"]
+            except (ValueError, KeyError, TypeError):
+                content = None
+            if not isinstance(content, str):
+                return 400, {"error": 'Expected a JSON body like {"content": "..."}'}
+            try:
+                messages = service.send(session, content)
+            except BlockingIOError as e:
+                return 503, {"error": str(e)}
+            except Exception as e:
+                return 500, {"error": f"Error running agent: {str(e)}"}
+            return 200, {"session_id": session.id, "messages": messages}
+
+        def _close_websocket(self, code: int):
+            self.wfile.write(encode_frame(WS_CLOSE, struct.pack("!H", code)))
+
+        def _websocket(self, session: Session):
+            """
+            Hold a WebSocket open for a session: each text message is a turn
+            body, answered with the same JSON a POST to /messages returns
+            """
+            key = self.headers.get("Sec-WebSocket-Key")
+            if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+                return self._send_json(400, {"error": "Expected a WebSocket upgrade"})
+            # Clients reject a 101 from an HTTP/1.0 server
+            self.protocol_version = "HTTP/1.1"
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", websocket_accept(key))
+            self.end_headers()
+            self.close_connection = True
+
+            message = b""
+            while True:
+                try:
+                    frame = read_frame(self.rfile)
+                except ValueError:
+                    return self._close_websocket(1009)
+                if frame is None:
+                    return
+                fin, opcode, payload = frame
+                if opcode == WS_CLOSE:
+                    return self.wfile.write(encode_frame(WS_CLOSE, payload[:2]))
+                if opcode == WS_PING:
+                    self.wfile.write(encode_frame(WS_PONG, payload))
+                    continue
+                if opcode not in (0x0, WS_TEXT):
+                    # Pongs and binary messages are ignored
+                    continue
+                message += payload
+                if len(message) > MAX_WEBSOCKET_MESSAGE:
+                    return self._close_websocket(1009)
+                if not fin:
+                    continue
+                _, response = self._turn(session, message)
+                message = b""
+                self.wfile.write(encode_frame(
+                    WS_TEXT, json.dumps(response, default=str).encode()))
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send_json(200, {"status": "ok",
+                                             "sessions": len(service.sessions)})
+            if self.path == "/metrics":
+                payload = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                return self.wfile.write(payload)
+            match = SESSION_PATH.match(self.path)
+            session = match and service.get_session(match.group(1))
+            if session and match.group(2) == "/ws":
+                return self._websocket(session)
+            if not session or match.group(2):
+                return self._send_json(404, {"error": "Session not found"})
+            self._send_json(200, {"session_id": session.id,
+                                  "messages": session.history()})
+
+        def do_POST(self):
+            if self.path == "/sessions":
+                try:
+                    session = service.create_session()
+                except OverflowError as e:
+                    return self._send_json(503, {"error": str(e)})
+                return self._send_json(201, {"session_id": session.id})
+
+            match = SESSION_PATH.match(self.path)
+            if not match or match.group(2) != "/messages":
+                return self._send_json(404, {"error": "Not found"})
+            session = service.get_session(match.group(1))
+            if session is None:
+                return self._send_json(404, {"error": "Session not found"})
+            self._send_json(*self._turn(session, self._read_body()))
+
+        def do_DELETE(self):
+            match = SESSION_PATH.match(self.path)
+            if match and not match.group(2) and service.delete_session(match.group(1)):
+                return self._send_json(200, {"deleted": match.group(1)})
+            self._send_json(404, {"error": "Session not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return AgentRequestHandler
+
+
+def run_server(agent, client, host: str = "127.0.0.1", port: int = 8000):
+    """
+    Serve the agent over a local HTTP and WebSocket API
+
+    Endpoints:
+        POST   /sessions                start a session, returns {"session_id"}
+        POST   /sessions/<id>/messages  send {"content": "..."}, returns new messages
+        GET    /sessions/<id>           the session's history
+        GET    /sessions/<id>/ws        WebSocket: send {"content": "..."} text
+                                        messages, each answered like a POST
+        DELETE /sessions/<id>           end a session
+        GET    /health                  liveness check
+        GET    /metrics                 Prometheus metrics
+
+    Args:
+        agent (Agent): Agent new sessions start with
+        client (Swarm): Client used to run turns
+        host (str): Interface to bind
+        port (int): Port to listen on
+    """
+    service = AgentService(agent, client)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    get_renderer().status(f"Based Agent server listening on http://{host}:{port} "
+                          f"({service.max_workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from swarm import Swarm
+from swarm.types import Response
+from swarm.util import debug_print
+
+from metrics_utils import metrics
+from tool_utils import build_create_params
+
+# Held while an order-sensitive tool runs. Shared by every client in the
+# process so two conversations can't interleave transactions from the wallet.
+wallet_lock = threading.RLock()
+
+
+class ParallelSwarm(Swarm):
+    def __init__(self, client=None, max_workers: int = None,
+                 serialized_tools: Iterable[str] = (), serial_lock=None, router=None):
+        """
+        Swarm client that runs independent tool calls from one turn concurrently
+
+        Tool calls named in serialized_tools (e.g. transfers from the agent's
+        wallet) run one after another, in the order the model issued them,
+        while holding serial_lock. Every other call gets its own slot on a
+        bounded thread pool. Results are returned in the original order.
+
+        Tool schemas are built once (tool_utils.tool_schema) instead of on
+        every request, and with a router each request only offers the tools
+        relevant to the latest user message.
+
+        Every model request and tool call is timed into metrics_utils.metrics.
+        A tool that raises is answered with an error message for the model
+        rather than ending the run.
+
+        Args:
+            client (OpenAI): OpenAI client, a new one is created if omitted
+            max_workers (int): Size of the tool thread pool
+                (BASED_AGENT_TOOL_WORKERS, default 4)
+            serialized_tools (Iterable[str]): Names of tools that must not run
+                concurrently
+            serial_lock (threading.RLock): Lock held around serialized tools, defaults
+                to wallet_lock
+            router (tool_utils.ToolRouter): Picks the tools offered per request, all
+                of them if omitted
+        """
+        super().__init__(client)
+        self.max_workers = max_workers or int(
+            os.environ.get("BASED_AGENT_TOOL_WORKERS", "4")
+        )
+        self.serialized_tools = set(serialized_tools)
+        self.serial_lock = serial_lock or wallet_lock
+        self.router = router
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers,
+                                                        thread_name_prefix="tool")
+        return self._executor
+
+    def get_chat_completion(self, agent, history, context_variables, model_override,
+                            stream, debug):
+        model = model_override or agent.model
+        functions = agent.functions
+        if self.router is not None:
+            functions = self.router.select(agent.functions, history)
+            metrics.increment("tools_offered_total", len(functions), model=model)
+        create_params = build_create_params(agent, history, context_variables, model,
+                                            stream, functions)
+        debug_print(debug, "Getting chat completion for...:", create_params["messages"])
+        labels = {"model": model, "role": "agent"}
+        start = time.perf_counter()
+        try:
+            completion = self.client.chat.completions.create(**create_params)
+        except Exception:
+            metrics.increment("llm_total", outcome="error", **labels)
+            raise
+        if stream:
+            return self._timed_stream(completion, labels, start)
+        metrics.observe("llm_seconds", time.perf_counter() - start, **labels)
+        metrics.increment("llm_total", outcome="success", **labels)
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            metrics.increment("llm_prompt_tokens_total", usage.prompt_tokens, **labels)
+            metrics.increment("llm_completion_tokens_total", usage.completion_tokens,
+                              **labels)
+        return completion
+
+    @staticmethod
+    def _timed_stream(completion, labels: dict, start: float):
+        # Streamed responses carry no usage numbers, so count chunks instead
+        chunks = 0
+        for chunk in completion:
+            if chunks == 0:
+                metrics.observe("llm_first_chunk_seconds", time.perf_counter() - start,
+                                **labels)
+            chunks += 1
+            yield chunk
+        metrics.observe("llm_seconds", time.perf_counter() - start, **labels)
+        metrics.increment("llm_total", outcome="success", **labels)
+        metrics.increment("llm_stream_chunks_total", chunks, **labels)
+
+    def handle_tool_calls(self, tool_calls, functions, context_variables: dict,
+                          debug: bool) -> Response:
+        handle_one = super().handle_tool_calls
+
+        def timed_call(index: int) -> Response:
+            name = tool_calls[index].function.name
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                try:
+                    response = handle_one([tool_calls[index]], functions,
+                                          context_variables, debug)
+                except Exception as e:
+                    # A tool that raises shouldn't end the conversation; the model
+                    # sees the error instead
+                    response = Response(messages=[{
+                        "role": "tool",
+                        "tool_call_id": tool_calls[index].id,
+                        "tool_name": name,
+                        "content": f"Error running {name}: {str(e)}",
+                    }], agent=None, context_variables={})
+                content = ""
+                if response.messages:
+                    content = str(response.messages[0].get("content") or "")
+                if not content.startswith(("Error", "Unexpected error")):
+                    outcome = "success"
+                return response
+            finally:
+                metrics.observe("tool_seconds", time.perf_counter() - start, tool=name)
+                metrics.increment("tool_total", tool=name, outcome=outcome)
+
+        def run_lane(indices: List[int], serialized: bool) -> List[Response]:
+            responses = []
+            for index in indices:
+                if serialized:
+                    waited = time.perf_counter()
+                    with self.serial_lock:
+                        metrics.observe("tool_lock_wait_seconds",
+                                        time.perf_counter() - waited,
+                                        tool=tool_calls[index].function.name)
+                        responses.append(timed_call(index))
+                else:
+                    responses.append(timed_call(index))
+            return responses
+
+        # Every serialized call shares one lane; every other call is its own lane
+        serialized_calls = [call.function.name in self.serialized_tools
+                            for call in tool_calls]
+        serial_lane = [i for i, serialized in enumerate(serialized_calls) if serialized]
+        lanes = [([i], False) for i, serialized in enumerate(serialized_calls)
+                 if not serialized]
+        if serial_lane:
+            lanes.append((serial_lane, True))
+
+        if len(lanes) < 2 or self.max_workers < 2:
+            lane_results = [run_lane(indices, serialized)
+                            for indices, serialized in lanes]
+        else:
+            executor = self._get_executor()
+            futures = [executor.submit(run_lane, indices, serialized)
+                       for indices, serialized in lanes]
+            lane_results = [future.result() for future in futures]
+
+        by_index = {}
+        for (indices, _), responses in zip(lanes, lane_results, strict=True):
+            by_index.update(zip(indices, responses, strict=True))
+
+        partial_response = Response(messages=[], agent=None, context_variables={})
+        for index in range(len(tool_calls)):
+            response = by_index[index]
+            partial_response.messages.extend(response.messages)
+            partial_response.context_variables.update(response.context_variables)
+            if response.agent:
+                partial_response.agent = response.agent
+        return partial_response
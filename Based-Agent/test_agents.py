@@ -0,0 +1,175 @@
+import inspect
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("swarm")
+pytest.importorskip("cdp")
+
+import agents
+from fake_services import FIRST_ADDRESS, FakeSubmission, FakeWallet, Faults
+from journal_utils import OperationJournal
+from registry_utils import ContractRegistry
+from tx_utils import TransactionWatcher, TransferCoalescer
+from wallet_utils import BalanceCache
+
+
+@pytest.fixture
+def wallet(tmp_path, monkeypatch):
+    wallet = FakeWallet(starting_balance="10")
+    monkeypatch.setattr(agents.agent_wallet, "_wallet", wallet)
+    monkeypatch.setattr(agents, "operation_journal",
+                        OperationJournal(path=str(tmp_path / "journal.jsonl")))
+    monkeypatch.setattr(agents, "_journal_reconciled", True)
+    monkeypatch.setattr(agents, "_journal_active_keys", set())
+    monkeypatch.setattr(agents, "balance_cache", BalanceCache(ttl_seconds=60))
+    monkeypatch.setattr(agents, "contract_registry",
+                        ContractRegistry(path=str(tmp_path / "contracts.json")))
+    return wallet
+
+
+def journal_entry(tool, **arguments):
+    key = agents.operation_journal.key(agents.agent_wallet.wallet_id, tool, arguments)
+    return key, agents.operation_journal.get(key)
+
+
+def transfer_key():
+    return journal_entry("transfer_asset", amount=1, asset_id="eth",
+                         destination_address=FIRST_ADDRESS)
+
+
+def test_journaled_tools_offer_repeat():
+    parameters = inspect.signature(agents.transfer_asset).parameters
+    assert list(parameters) == ["amount", "asset_id", "destination_address", "repeat"]
+    assert parameters["repeat"].default is False
+
+
+def test_transfers_are_journaled_and_can_be_repeated_once_done(wallet):
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    assert result == f"Transferred 1 eth to {FIRST_ADDRESS}"
+    _, entry = transfer_key()
+    assert entry["status"] == "complete"
+    assert len(entry["tx_hashes"]) == 1
+
+    assert agents.transfer_asset(1, "eth", FIRST_ADDRESS) == result
+    assert wallet.balance("eth") == 8
+
+
+def test_unfinished_identical_calls_are_held_back(wallet):
+    key, _ = transfer_key()
+    agents.operation_journal.start(key, "transfer_asset", {})
+    agents.operation_journal.submitted(key, ["0xabc"])
+    agents._journal_active_keys.add(key)
+
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    assert "still pending (transactions: 0xabc)" in result
+    assert wallet.balance("eth") == 10
+
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS, repeat=True)
+    assert result == f"Transferred 1 eth to {FIRST_ADDRESS}"
+    assert wallet.balance("eth") == 9
+    # The held back call keeps its own entry
+    assert agents.operation_journal.get(key)["status"] == "submitted"
+
+
+def test_calls_that_submit_nothing_are_rejected_and_retryable(wallet):
+    wallet.faults = Faults(failure_rate=1.0)
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    assert result.startswith("Error transferring asset: injected failure in transfer")
+    _, entry = transfer_key()
+    assert entry["status"] == "rejected"
+
+    wallet.faults = Faults()
+    assert agents.transfer_asset(1, "eth", FIRST_ADDRESS).startswith("Transferred")
+
+
+def test_a_transfer_that_fails_onchain_is_journaled_as_failed(wallet, monkeypatch):
+    monkeypatch.setattr(wallet, "transfer", lambda *_, **__: FakeSubmission(
+        Faults(), confirm_seconds=0, fail=True))
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    assert result == f"Error: the transfer of 1 eth to {FIRST_ADDRESS} failed onchain."
+    _, entry = transfer_key()
+    assert entry["status"] == "failed"
+
+
+def test_a_watcher_timeout_leaves_the_entry_for_the_chain_to_settle(wallet,
+                                                                    monkeypatch):
+    wallet.confirm_seconds = 60
+    monkeypatch.setattr(agents, "CONFIRM_LATER", True)
+    monkeypatch.setattr(agents, "tx_watcher",
+                        TransactionWatcher(poll_interval=0.01, timeout_seconds=0.05))
+    assert "Pending operation" in agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    key, _ = transfer_key()
+    deadline = time.monotonic() + 5
+    while key in agents._journal_active_keys and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert key not in agents._journal_active_keys
+    assert agents.operation_journal.get(key)["status"] == "submitted"
+
+    # The next identical call checks the receipt instead of trusting the watcher
+    monkeypatch.setattr(agents, "check_transaction_receipt", lambda _: "complete")
+    result = agents.transfer_asset(1, "eth", FIRST_ADDRESS)
+    assert result.startswith("Already done")
+    assert wallet.balance("eth") == 9
+
+
+def test_identical_transfers_in_one_coalescing_window_are_merged(wallet, monkeypatch):
+    monkeypatch.setattr(agents, "transfer_coalescer",
+                        TransferCoalescer(agents.send_merged_transfer, 0.3))
+    results = []
+
+    def transfer():
+        results.append(agents.transfer_asset(1, "eth", FIRST_ADDRESS))
+
+    threads = [threading.Thread(target=transfer) for _ in range(2)]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [f"Transferred 2 eth to {FIRST_ADDRESS} (2 transfers combined "
+                       "into one transaction)"] * 2
+    assert wallet.balance("eth") == 8
+    # Each caller keeps its own journal entry, and both are finished
+    assert transfer_key()[1]["status"] == "complete"
+    assert agents.operation_journal.in_flight() == []
+
+
+def test_tokens_cdp_rejected_are_answered_locally_until_the_recheck(wallet,
+                                                                  monkeypatch):
+    from cdp.client.exceptions import ApiException
+    from cdp.errors import UnsupportedAssetError
+
+    agents.contract_registry.register(*agents.registry_scope(), "erc20", "0xM00N",
+                                      "Moon Token", "MOON")
+    calls = []
+
+    def balance(asset_id):
+        calls.append(asset_id)
+        raise UnsupportedAssetError(ApiException(status=400), "unsupported_asset",
+                                    "Asset is not supported")
+
+    monkeypatch.setattr(wallet, "balance", balance)
+    first = agents.get_balance("MOON")
+    assert "isn't indexed by CDP yet" in first
+    assert agents.get_balance("MOON") == first
+    assert "isn't indexed by CDP yet" in agents.transfer_asset(1, "MOON",
+                                                               FIRST_ADDRESS)
+    assert calls == ["0xM00N"]
+
+    agents.contract_registry.index_recheck_seconds = 0
+    agents.get_balance("MOON")
+    assert len(calls) == 2
+
+
+def test_a_faucet_request_without_a_status_watches_the_balance(wallet, monkeypatch):
+    watched = []
+    monkeypatch.setattr(wallet, "faucet",
+                        lambda: types.SimpleNamespace(transaction_hash="0xfaucet"))
+    monkeypatch.setattr(agents.balance_cache, "invalidate_when_changed",
+                        lambda *args, **_: watched.append(args[1:]))
+    assert agents.request_eth_from_faucet().startswith("Requested ETH from faucet")
+    assert watched == [("eth", 10)]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+import threading
+import types
+
+from batch import BatchRunner, load_scenarios
+
+AGENT = types.SimpleNamespace(name="Based Agent")
+
+
+class GuideClient:
+    def __init__(self):
+        """Stands in for the OpenAI client the guide talks through"""
+        self.chat = types.SimpleNamespace(completions=self)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, messages):  # noqa: ARG002
+        with self._lock:
+            self.calls += 1
+        message = types.SimpleNamespace(content=f"guide turn {len(messages)}")
+        return types.SimpleNamespace(usage=None,
+                                     choices=[types.SimpleNamespace(message=message)])
+
+
+class AgentClient:
+    def __init__(self, fail_on=None):
+        """Answers every turn with one tool call; raises on a chosen guide message"""
+        self.fail_on = fail_on
+
+    def run(self, agent, messages):
+        prompt = messages[-1]["content"]
+        if prompt == self.fail_on:
+            raise RuntimeError("model unavailable")
+        tool = {"role": "tool", "tool_name": "get_balance",
+                "content": "Error: wallet offline" if "4" in prompt else "1 eth"}
+        reply = {"role": "assistant", "sender": agent.name, "content": "done"}
+        return types.SimpleNamespace(messages=[tool, reply], agent=agent)
+
+
+def run(runner, conversations, scenarios=None):
+    return asyncio.run(runner.run(conversations, scenarios))
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_every_conversation_runs_its_turns(tmp_path):
+    output_dir = str(tmp_path)
+    guide = GuideClient()
+    runner = BatchRunner(AGENT, AgentClient(), guide, turns=2, concurrency=3,
+                         output_dir=output_dir)
+    summary = run(runner, 3, ["tokens", "nfts"])
+
+    assert summary["turns"] == 6
+    assert summary["failed_conversations"] == 0
+    assert summary["tool_calls"] == 6
+    # The second guide turn sees 4 messages, and the agent's tool reports an error
+    assert summary["tool_errors"] == 3
+    assert guide.calls == 6
+    assert [result["scenario"] for result in summary["results"]] == [
+        "tokens", "nfts", "tokens"]
+    with open(os.path.join(output_dir, "summary.json")) as f:
+        assert json.load(f)["turns"] == 6
+    assert len(read_jsonl(os.path.join(output_dir, "timings.jsonl"))) == 6
+
+    transcript = read_jsonl(os.path.join(output_dir, "transcripts",
+                                         "conversation-0001.jsonl"))
+    assert [record["role"] for record in transcript] == [
+        "scenario", "guide", "tool", "assistant", "guide", "tool", "assistant"]
+    assert transcript[0]["content"] == "nfts"
+
+
+def test_a_failing_conversation_does_not_stop_the_others(tmp_path):
+    runner = BatchRunner(AGENT, AgentClient(fail_on="guide turn 4"), GuideClient(),
+                         turns=3, concurrency=2, output_dir=str(tmp_path))
+    summary = run(runner, 2)
+
+    assert summary["failed_conversations"] == 2
+    assert [result["turns"] for result in summary["results"]] == [1, 1]
+    assert summary["results"][0]["error"] == "RuntimeError: model unavailable"
+    transcript = read_jsonl(os.path.join(str(tmp_path), "transcripts",
+                                         "conversation-0000.jsonl"))
+    assert transcript[-1]["role"] == "error"
+
+
+def test_load_scenarios(tmp_path):
+    json_path = tmp_path / "scenarios.json"
+    json_path.write_text('["swap", "mint"]')
+    text_path = tmp_path / "scenarios.txt"
+    text_path.write_text("swap\n\n  mint  \n")
+    assert load_scenarios(str(json_path)) == ["swap", "mint"]
+    assert load_scenarios(str(text_path)) == ["swap", "mint"]
@@ -0,0 +1,123 @@
+import threading
+import types
+from datetime import datetime
+
+import pytest
+
+from event_utils import (
+    CronSchedule,
+    Event,
+    EventScheduler,
+    balance_change_source,
+    format_events,
+)
+
+
+def test_cron_fields():
+    schedule = CronSchedule("*/15 9-17 * * 1-5")
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == set(range(9, 18))
+    assert schedule.weekdays == {1, 2, 3, 4, 5}
+    assert CronSchedule("5,10 0 1 1 *").minutes == {5, 10}
+    assert CronSchedule("30/10 * * * *").minutes == {30, 40, 50}
+
+
+@pytest.mark.parametrize("expression",
+                         ["* * * *", "60 * * * *", "* 5-2 * * *", "x * * * *"])
+def test_invalid_cron_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_matches():
+    schedule = CronSchedule("0 12 * * 0")
+    assert schedule.matches(datetime(2024, 6, 2, 12, 0, 30))  # a Sunday
+    assert not schedule.matches(datetime(2024, 6, 3, 12, 0))
+    assert not schedule.matches(datetime(2024, 6, 2, 12, 1))
+
+
+def test_restricted_day_of_month_and_weekday_either_match():
+    # The 1st and 15th of the month, and every Monday
+    schedule = CronSchedule("0 9 1,15 * 1")
+    assert schedule.matches(datetime(2024, 6, 1, 9, 0))  # a Saturday
+    assert schedule.matches(datetime(2024, 6, 3, 9, 0))  # a Monday
+    assert not schedule.matches(datetime(2024, 6, 4, 9, 0))
+    # With either field unrestricted the other one decides alone
+    assert not CronSchedule("0 9 */2 * *").matches(datetime(2024, 6, 4, 9, 0))
+    assert not CronSchedule("0 9 * * 1").matches(datetime(2024, 6, 1, 9, 0))
+
+
+def test_emitted_events_are_batched():
+    scheduler = EventScheduler()
+    scheduler.emit("tx", "op-1 confirmed")
+    scheduler.emit("tx", "op-2 confirmed")
+    descriptions = [event.description for event in scheduler.wait(timeout=1)]
+    assert descriptions == ["op-1 confirmed", "op-2 confirmed"]
+
+
+def test_wait_wakes_on_emit_from_another_thread():
+    scheduler = EventScheduler()
+    threading.Timer(0.05, scheduler.emit, ("tx", "op-1 confirmed")).start()
+    assert len(scheduler.wait(timeout=5)) == 1
+
+
+def test_wait_times_out():
+    assert EventScheduler().wait(timeout=0.05) == []
+
+
+def test_polling_backs_off_while_idle():
+    scheduler = EventScheduler()
+    news = []
+    scheduler.add_source("feed", lambda: news, min_interval=1, max_interval=4)
+    intervals = []
+    for now in range(4):
+        scheduler._poll_sources(now * 100)
+        intervals.append(scheduler.status()[0]["interval"])
+    news.append("something happened")
+    scheduler._poll_sources(1000)
+    assert intervals == [2, 4, 4, 4]
+    assert scheduler.status()[0]["interval"] == 1
+    assert scheduler.wait(timeout=0)[0].description == "something happened"
+
+
+def test_polling_errors_count_as_no_news(capsys):
+    def broken():
+        raise RuntimeError("rate limited")
+
+    scheduler = EventScheduler()
+    scheduler.add_source("feed", broken, min_interval=1, max_interval=8)
+    scheduler._poll_sources(0)
+    assert scheduler.status()[0]["interval"] == 2
+    assert "rate limited" in capsys.readouterr().err
+
+
+def test_schedules_fire_once_per_minute():
+    scheduler = EventScheduler()
+    scheduler.add_schedule("daily", "* * * * *", "Post an update")
+    now = datetime(2024, 6, 2, 12, 0, 5).timestamp()
+    scheduler._check_schedules(now)
+    scheduler._check_schedules(now + 30)
+    scheduler._check_schedules(now + 60)
+    events = scheduler._pending
+    assert [event.source for event in events] == ["daily", "daily"]
+    assert events[0].data == {"prompt": True}
+
+
+def test_balance_source_reports_increases_only():
+    balances = [1, 1, 0.5, 2]
+    wallet = types.SimpleNamespace(balance=lambda _asset_id: balances.pop(0))
+    poll = balance_change_source(wallet)
+    assert [poll() for _ in range(3)] == [[], [], []]
+    assert poll() == ["ETH balance increased from 0.5 to 2"]
+
+
+def test_format_events():
+    events = [
+        Event("daily", "Post an update", data={"prompt": True}),
+        Event("balance", "ETH balance increased from 1 to 2"),
+    ]
+    prompt = format_events(events)
+    assert prompt.startswith("Since your last turn, the following happened:\n"
+                             "- [balance] ETH balance")
+    assert prompt.endswith("\n\nPost an update")
+    assert format_events(events[:1]) == "Post an update"
@@ -0,0 +1,42 @@
+from fleet import Fleet, merge_snapshots, worker_path
+
+CONFIGS = [{"name": name, "wallet_id": f"wallet-{name}", "seed_file": "seed.json"}
+           for name in ("alice", "bob")]
+
+
+def test_worker_paths_keep_the_configured_location():
+    assert worker_path("contracts.json", "alice") == "contracts_alice.json"
+    assert (worker_path("/var/agent/operation_journal.jsonl", "bob")
+            == "/var/agent/operation_journal_bob.jsonl")
+    assert worker_path("state", "alice") == "state_alice"
+
+
+def test_worker_metrics_are_merged_with_an_agent_label():
+    merged = merge_snapshots({
+        "bob": {"counters": {"tool_total": [{"tool": "get_balance", "value": 2}]},
+                "histograms": {}},
+        "alice": {"counters": {"tool_total": [{"tool": "get_balance", "value": 1}]},
+                  "histograms": {"turn_seconds": [{"mode": "auto", "count": 3}]}},
+        "carol": {},
+    })
+    assert merged == {
+        "counters": {"tool_total": [
+            {"tool": "get_balance", "value": 1, "agent": "alice"},
+            {"tool": "get_balance", "value": 2, "agent": "bob"},
+        ]},
+        "histograms": {"turn_seconds": [{"mode": "auto", "count": 3,
+                                         "agent": "alice"}]},
+    }
+
+
+def test_forwarded_metrics_land_in_the_snapshot(capsys):
+    fleet = Fleet(CONFIGS)
+    fleet._record({"type": "worker_metrics", "agent": "alice", "ts": 0,
+                   "content": {"counters": {"turn_total": [{"value": 4}]}}})
+    fleet._record({"type": "tool_call", "agent": "alice", "ts": 0})
+    snapshot = fleet.snapshot()
+    assert snapshot["metrics"]["counters"] == {
+        "turn_total": [{"value": 4, "agent": "alice"}]}
+    assert snapshot["agents"]["alice"]["tool_calls"] == 1
+    # Only the tool call was printed
+    assert len(capsys.readouterr().out.splitlines()) == 1
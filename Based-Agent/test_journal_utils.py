@@ -0,0 +1,110 @@
+import json
+
+from journal_utils import OperationJournal, describe_entry
+
+
+def make_journal(tmp_path, **kwargs):
+    return OperationJournal(path=str(tmp_path / "journal.jsonl"), dedupe_seconds=600,
+                            **kwargs)
+
+
+def transfer_key(amount, destination_address):
+    args = {"amount": amount, "destination_address": destination_address}
+    return OperationJournal.key("wallet", "transfer_asset", args)
+
+
+def test_key_normalizes_equivalent_arguments():
+    key = transfer_key(0.1, "0xABC")
+    same = transfer_key("0.10", "0xabc")
+    other = transfer_key(0.2, "0xabc")
+    assert key == same
+    assert key != other
+
+
+def test_unfinished_calls_dedupe(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start("k", "transfer_asset", {"amount": 1})
+    assert journal.recent("k")["status"] == "started"
+    journal.submitted("k", ["0x1"])
+    assert journal.recent("k")["tx_hashes"] == ["0x1"]
+    journal.finish("k", "interrupted")
+    assert journal.recent("k") is not None
+
+
+def test_finished_calls_can_be_repeated(tmp_path):
+    journal = make_journal(tmp_path)
+    for status in ("complete", "failed", "rejected"):
+        journal.start(status, "transfer_asset", {})
+        journal.finish(status, status, result="done")
+        assert journal.recent(status) is None
+
+
+def test_dedupe_window(tmp_path):
+    journal = OperationJournal(path=str(tmp_path / "journal.jsonl"), dedupe_seconds=0)
+    journal.start("k", "transfer_asset", {})
+    assert journal.recent("k") is None
+
+
+def test_state_survives_reload_and_torn_line(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start("k", "create_token", {"symbol": "MOON"})
+    journal.submitted("k", ["0x1"])
+    with open(journal.path, "a") as f:
+        f.write('{"key": "k", "status": "comp')
+
+    reloaded = make_journal(tmp_path)
+    entry = reloaded.get("k")
+    assert entry["status"] == "submitted"
+    assert entry["tx_hashes"] == ["0x1"]
+    assert [entry["key"] for entry in reloaded.in_flight()] == ["k"]
+
+    reloaded.finish("k", "complete", result="sent")
+    assert make_journal(tmp_path).get("k")["status"] == "complete"
+
+
+def test_compaction_keeps_latest_state(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start("k", "bulk_mint_nft", {})
+    for index in range(150):
+        journal.submitted("k", [f"0x{index}"])
+    journal.start("other", "mint_nft", {})
+    journal.finish("other", "complete", result="ok")
+
+    reloaded = make_journal(tmp_path)
+    entry = reloaded.get("k")
+    with open(journal.path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 2
+    assert entry["status"] == "submitted"
+    assert len(entry["tx_hashes"]) == 150
+    assert reloaded.get("other")["result"] == "ok"
+
+
+def test_reconcile_settles_in_flight_entries(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start("done", "transfer_asset", {})
+    journal.submitted("done", ["0xa"])
+    journal.start("failed", "transfer_asset", {})
+    journal.submitted("failed", ["0xb"])
+    journal.start("unknown", "transfer_asset", {})
+    journal.submitted("unknown", ["0xc"])
+    journal.start("no_hash", "transfer_asset", {})
+    journal.start("active", "transfer_asset", {})
+
+    statuses = {"0xa": "complete", "0xb": "failed", "0xc": None}
+    journal.reconcile(statuses.get, active_keys={"active"})
+
+    assert journal.get("done")["status"] == "complete"
+    assert journal.get("failed")["status"] == "failed"
+    assert journal.get("unknown")["status"] == "submitted"
+    assert journal.get("no_hash")["status"] == "interrupted"
+    assert journal.get("active")["status"] == "started"
+
+
+def test_describe_entry_offers_repeat_for_pending_calls(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.start("k", "transfer_asset", {})
+    journal.submitted("k", ["0x1"])
+    message = describe_entry(journal.get("k"))
+    assert "still pending" in message
+    assert "repeat=true" in message
@@ -0,0 +1,60 @@
+from memory_utils import ConversationMemory, estimate_tokens
+
+
+def turn(index, tool_output="ok"):
+    return [
+        {"role": "user", "content": f"request {index}"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"function": {"name": "get_balance", "arguments": '{"asset_id": "eth"}'}},
+        ]},
+        {"role": "tool", "tool_name": "get_balance", "content": tool_output},
+        {"role": "assistant", "sender": "Based Agent", "content": f"answer {index}"},
+    ]
+
+
+def test_estimate_tokens_counts_tool_calls():
+    plain = {"role": "assistant", "content": "x" * 40}
+    tool_call = {"function": {"name": "abcd", "arguments": "abcd"}}
+    with_call = dict(plain, tool_calls=[tool_call])
+    assert estimate_tokens(plain) == 14
+    assert estimate_tokens(with_call) == 16
+
+
+def test_under_budget_history_is_untouched():
+    memory = ConversationMemory(token_budget=10_000)
+    messages = turn(1) + turn(2)
+    memory.extend(messages)
+    assert memory.messages() == messages
+    assert not memory.summary
+
+
+def test_old_turns_are_summarized_and_system_is_pinned():
+    memory = ConversationMemory(token_budget=200, keep_recent_turns=2)
+    memory.append({"role": "system", "content": "You are a Base agent"})
+    for index in range(10):
+        memory.extend(turn(index, tool_output="x" * 100))
+
+    messages = memory.messages()
+    assert messages[0] == {"role": "system", "content": "You are a Base agent"}
+    assert messages[1]["content"].startswith("Summary of earlier conversation")
+    assert any(line.startswith("Called get_balance(") for line in memory.summary)
+    assert sum(map(len, memory.summary)) // 4 <= memory.token_budget // 4
+    assert len(memory.turns) == 2
+    assert memory.turns[-1][0]["content"] == "request 9"
+
+
+def test_repeated_prompts_are_summarized_once():
+    memory = ConversationMemory(token_budget=200, keep_recent_turns=1)
+    for _ in range(50):
+        memory.append({"role": "user", "content": "same prompt"})
+    assert list(memory.summary) == ["User: same prompt"]
+
+
+def test_older_tool_outputs_are_cut():
+    memory = ConversationMemory(token_budget=300, keep_recent_turns=3,
+                                max_tool_output_chars=50)
+    memory.extend(turn(1, tool_output="y" * 1000))
+    memory.extend(turn(2, tool_output="z" * 1000))
+    first, latest = memory.turns
+    assert len(first[2]["content"]) == 50
+    assert len(latest[2]["content"]) == 1000
@@ -0,0 +1,99 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics_utils import Histogram, MetricsRegistry, percentile
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 2, 20):
+        histogram.observe(value)
+    # A value equal to a bound lands in that bound's bucket
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.6) == 1
+    assert histogram.quantile(0.99) == float("inf")
+    assert histogram.summary() == {"count": 5, "sum": 22.65, "mean": 4.53,
+                                   "p50": 1, "p90": float("inf"),
+                                   "p99": float("inf")}
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 11)), 0.95) == 10
+    assert percentile(list(range(1, 101)), 0.99) == 99
+    assert percentile(list(range(1, 101)), 0.5) == 50
+    assert percentile([5], 0.99) == 5
+
+
+def test_timer_records_latency_and_outcome():
+    registry = MetricsRegistry()
+    with registry.timer("external_seconds", service="twitter"):
+        pass
+    with pytest.raises(RuntimeError), registry.timer("external_seconds",
+                                                     service="twitter"):
+        raise RuntimeError("down")
+    snapshot = registry.snapshot()
+    assert sorted((row["outcome"], row["value"])
+                  for row in snapshot["counters"]["external_total"]) == [
+        ("error", 1), ("success", 1)]
+    [histogram] = snapshot["histograms"]["external_seconds"]
+    assert (histogram["service"], histogram["count"]) == ("twitter", 2)
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry()
+    registry.increment("tool_total", tool="get_balance", outcome="success")
+    registry.increment("tool_total", 2, tool="get_balance", outcome="success")
+    registry.increment("llm_total", model='say "hi"')
+    registry.observe("tool_seconds", 0.2, tool="get_balance")
+    registry.observe("tool_seconds", 400, tool="get_balance")
+    lines = registry.prometheus().splitlines()
+    assert "# TYPE based_agent_tool_total counter" in lines
+    assert ('based_agent_tool_total{outcome="success",tool="get_balance"} 3'
+            in lines)
+    assert 'based_agent_llm_total{model="say \\"hi\\""} 1' in lines
+    assert "# TYPE based_agent_tool_seconds histogram" in lines
+    assert 'based_agent_tool_seconds_bucket{tool="get_balance",le="0.1"} 0' in lines
+    assert 'based_agent_tool_seconds_bucket{tool="get_balance",le="0.25"} 1' in lines
+    assert 'based_agent_tool_seconds_bucket{tool="get_balance",le="300"} 1' in lines
+    assert 'based_agent_tool_seconds_bucket{tool="get_balance",le="+Inf"} 2' in lines
+    assert 'based_agent_tool_seconds_sum{tool="get_balance"} 400.2' in lines
+    assert 'based_agent_tool_seconds_count{tool="get_balance"} 2' in lines
+
+
+def test_json_snapshot_and_reset(tmp_path):
+    registry = MetricsRegistry()
+    registry.increment("turn_total", mode="chat")
+    registry.observe("turn_seconds", 1.5, mode="chat")
+    path = str(tmp_path / "metrics.json")
+    registry.write_snapshot(path)
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert snapshot["counters"] == {"turn_total": [{"mode": "chat", "value": 1}]}
+    assert snapshot["histograms"]["turn_seconds"][0]["sum"] == 1.5
+    registry.reset()
+    assert registry.snapshot()["counters"] == {}
+
+
+def test_http_exporter_serves_both_formats():
+    registry = MetricsRegistry()
+    registry.increment("turn_total", mode="chat")
+    server = registry.serve(port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'based_agent_turn_total{mode="chat"} 1' in response.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json", timeout=5) as response:
+            assert json.load(response)["counters"]["turn_total"][0]["value"] == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,51 @@
+import os
+import time
+
+from openai_utils import ArtCache, normalize_prompt
+
+REQUEST = ("dall-e-3", "1024x1024", "standard")
+
+
+def test_near_identical_prompts_share_an_entry(tmp_path):
+    assert normalize_prompt("  A Red   Fox! ") == "a red fox"
+    cache = ArtCache(directory=str(tmp_path))
+    cache.put("A red fox.", *REQUEST, url="https://img/fox")
+    assert cache.get("a  RED fox", *REQUEST) == "https://img/fox"
+    assert cache.get("a red fox", "dall-e-3", "1024x1024", "hd") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_urls_are_misses(tmp_path):
+    cache = ArtCache(directory=str(tmp_path), url_ttl_seconds=60)
+    cache.put("fox", *REQUEST, url="https://img/fox")
+    assert cache.get("fox", *REQUEST) == "https://img/fox"
+    cache.url_ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("fox", *REQUEST) is None
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtCache(directory=str(tmp_path), max_bytes=10_000)
+    cache.put("first", *REQUEST, url="https://img/1")
+    entry_size = os.path.getsize(os.path.join(str(tmp_path), os.listdir(tmp_path)[0]))
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    old = time.time() - 100
+    os.utime(cache._path(cache.key("first", *REQUEST)), (old, old))
+    cache.put("second", *REQUEST, url="https://img/2")
+    os.utime(cache._path(cache.key("second", *REQUEST)), (old + 1, old + 1))
+
+    # Reading "first" makes it the most recently used, so "second" goes
+    assert cache.get("first", *REQUEST) == "https://img/1"
+    cache.put("third", *REQUEST, url="https://img/3")
+    assert len(os.listdir(tmp_path)) == 2
+    assert cache.get("second", *REQUEST) is None
+    assert cache.get("first", *REQUEST) == "https://img/1"
+    assert cache.get("third", *REQUEST) == "https://img/3"
+
+
+def test_missing_directory_is_a_miss(tmp_path):
+    cache = ArtCache(directory=str(tmp_path / "art"))
+    assert cache.get("fox", *REQUEST) is None
+    cache.put("fox", *REQUEST, url="https://img/fox")
+    assert cache.get("fox", *REQUEST) == "https://img/fox"
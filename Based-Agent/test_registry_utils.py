@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from registry_utils import ContractRegistry, describe_contract
+
+OWNER = "0x00000000000000000000000000000000000000BA"
+OTHER_OWNER = "0x00000000000000000000000000000000000000CD"
+TOKEN = "0x00000000000000000000000000000000000000AA"
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ContractRegistry(path=str(tmp_path / "contracts.json"),
+                            index_delay_seconds=1800)
+
+
+def register_moon(registry, **details):
+    return registry.register("base-sepolia", OWNER, "erc20", TOKEN, "Moon Token",
+                             "MOON", **details)
+
+
+def test_lookup_by_address_symbol_or_name(registry):
+    register_moon(registry, initial_supply=1000)
+    for identifier in (TOKEN.lower(), "moon", " Moon Token "):
+        assert registry.lookup(identifier, "base-sepolia", OWNER)["address"] == TOKEN
+    assert registry.lookup("MOON", "base-sepolia", OWNER, kind="erc721") is None
+    assert registry.resolve("MOON", "base-sepolia", OWNER) == TOKEN
+    assert registry.resolve("usdc", "base-sepolia", OWNER) == "usdc"
+
+
+def test_entries_are_scoped_to_network_and_owner(registry):
+    register_moon(registry)
+    assert registry.lookup("MOON", "base-mainnet", OWNER) is None
+    assert registry.lookup("MOON", "base-sepolia", OTHER_OWNER) is None
+    assert registry.lookup("MOON", "base-sepolia", OWNER.lower()) is not None
+
+
+def test_newest_deployment_wins(registry, monkeypatch):
+    register_moon(registry)
+    later = time.time() + 60
+    monkeypatch.setattr(time, "time", lambda: later)
+    registry.register("base-sepolia", OWNER, "erc20", "0xBB", "Moon Token v2", "MOON")
+    assert registry.resolve("MOON", "base-sepolia", OWNER) == "0xBB"
+    contracts = registry.contracts("base-sepolia", OWNER)
+    assert [entry["address"] for entry in contracts] == ["0xBB", TOKEN]
+
+
+def test_registry_persists(registry):
+    registry.register("base-sepolia", OWNER, "erc721", TOKEN, "Art", "ART",
+                      base_uri="https://example.com/")
+    reloaded = ContractRegistry(path=registry.path)
+    entry = reloaded.lookup("ART", "base-sepolia", OWNER)
+    assert entry["base_uri"] == "https://example.com/"
+    assert entry["indexed"] is None
+
+
+def test_set_indexed(registry, monkeypatch):
+    register_moon(registry)
+    assert registry.lookup("MOON", "base-sepolia", OWNER)["indexed"] is False
+
+    registry.set_indexed("base-sepolia", OWNER, TOKEN.lower(), True)
+    reloaded = ContractRegistry(path=registry.path)
+    assert reloaded.lookup("MOON", "base-sepolia", OWNER)["indexed"] is True
+
+    saves = []
+    monkeypatch.setattr(registry, "_save", lambda: saves.append(1))
+    registry.set_indexed("base-sepolia", OWNER, TOKEN, True)
+    registry.set_indexed("base-sepolia", OWNER, "0xunknown", True)
+    assert saves == []
+
+
+def test_unsupported_answers_are_trusted_for_the_recheck_interval(registry,
+                                                                  monkeypatch):
+    register_moon(registry)
+    # Registered tokens aren't indexed yet, but CDP hasn't been asked
+    assert registry.awaiting_index("base-sepolia", OWNER, TOKEN) is None
+
+    registry.set_indexed("base-sepolia", OWNER, TOKEN, False)
+    assert registry.awaiting_index("base-sepolia", OWNER, TOKEN)["symbol"] == "MOON"
+    reloaded = ContractRegistry(path=registry.path)
+    assert reloaded.awaiting_index("base-sepolia", OWNER, TOKEN.lower()) is not None
+
+    checked_at = time.time()
+    monkeypatch.setattr(time, "time", lambda: checked_at + 61)
+    assert registry.awaiting_index("base-sepolia", OWNER, TOKEN) is None
+    registry.set_indexed("base-sepolia", OWNER, TOKEN, True)
+    assert registry.awaiting_index("base-sepolia", OWNER, TOKEN) is None
+
+
+def test_expected_index_wait_and_description(registry):
+    entry = register_moon(registry)
+    assert 1790 < registry.expected_index_wait(entry) <= 1800
+    assert registry.expected_index_wait(dict(entry, deployed_at=0)) == 0
+    assert "not yet indexed by CDP" in describe_contract(entry)
+    description = describe_contract(dict(entry, indexed=True))
+    assert description.startswith("MOON (Moon Token): ERC20 at")
@@ -0,0 +1,88 @@
+import io
+import json
+import types
+
+import pytest
+
+import render_utils
+from render_utils import JsonlRenderer, TerminalRenderer, get_renderer, set_renderer
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_terminal_buffers_streamed_tokens_until_the_message_ends():
+    stream = CountingStream()
+    renderer = TerminalRenderer(stream=stream, flush_interval=60)
+    renderer.content("Based Agent", "Hello")
+    renderer.content("Based Agent", ", world")
+    assert stream.getvalue() == ""
+    renderer.message_end()
+    assert stream.getvalue() == "\033[94mBased Agent:\033[0m Hello, world\n"
+    assert stream.writes == 1
+
+
+def test_terminal_flushes_when_the_interval_has_passed():
+    stream = io.StringIO()
+    renderer = TerminalRenderer(stream=stream, flush_interval=0)
+    renderer.content("Based Agent", "Hi")
+    assert stream.getvalue().endswith("Hi")
+    renderer.tool_call("Based Agent", "get_balance")
+    assert "\033[95mget_balance\033[0m()\n" in stream.getvalue()
+
+
+def test_terminal_status_and_notes_are_written_at_once():
+    stream = io.StringIO()
+    renderer = TerminalRenderer(stream=stream, flush_interval=60)
+    renderer.status("Starting")
+    renderer.note("Autonomous Thought", "go", color="93")
+    assert stream.getvalue() == "Starting\n\n\033[93mAutonomous Thought:\033[0m go\n"
+
+
+def test_jsonl_writes_one_record_per_message_tool_call_and_result():
+    stream = io.StringIO()
+    renderer = JsonlRenderer(stream=stream)
+    renderer.content("Based Agent", "ignored while streaming")
+    response = types.SimpleNamespace(messages=[
+        {"role": "assistant", "sender": "Based Agent", "content": None,
+         "tool_calls": [{"id": "call-1", "function": {
+             "name": "get_balance", "arguments": '{"asset_id": "eth"}'}}]},
+        {"role": "tool", "tool_call_id": "call-1", "tool_name": "get_balance",
+         "content": "1 eth"},
+        {"role": "assistant", "sender": "Based Agent", "content": "You have 1 eth"},
+    ])
+    renderer.status("Starting")
+    renderer.response(response)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["type"] for record in records] == [
+        "status", "tool_call", "tool_result", "message"]
+    assert records[1]["name"] == "get_balance"
+    assert records[1]["arguments"] == '{"asset_id": "eth"}'
+    assert records[2] == dict(records[2], id="call-1", content="1 eth")
+    assert records[3]["content"] == "You have 1 eth"
+    assert all("ts" in record for record in records)
+
+
+def test_renderer_is_chosen_by_name_or_environment(monkeypatch):
+    # monkeypatch puts the process-wide renderer back afterwards
+    monkeypatch.setattr(render_utils, "_renderer", None)
+    monkeypatch.setenv("BASED_AGENT_OUTPUT", "jsonl")
+    assert isinstance(get_renderer(), JsonlRenderer)
+    set_renderer("terminal")
+    assert isinstance(get_renderer(), TerminalRenderer)
+    with pytest.raises(ValueError, match="Unknown output mode"):
+        set_renderer("html")
+
+
+def test_a_renderer_instance_can_be_installed(monkeypatch):
+    monkeypatch.setattr(render_utils, "_renderer", None)
+    custom = JsonlRenderer(stream=io.StringIO())
+    set_renderer(custom)
+    assert get_renderer() is custom
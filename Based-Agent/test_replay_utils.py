@@ -0,0 +1,99 @@
+import pytest
+
+from fake_services import FakeOpenAI
+from replay_utils import ReplayMiss, ReplayOpenAI, ResponseStore, request_key
+
+PARAMS = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "user", "content": "hi"}],
+    "stream": False,
+}
+
+
+class CountingOpenAI(FakeOpenAI):
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+        create = self.chat.completions.create
+
+        def counting_create(**params):
+            self.requests += 1
+            return create(**params)
+
+        self.chat.completions.create = counting_create
+
+
+def test_request_key_ignores_key_order():
+    reordered = dict(reversed(PARAMS.items()))
+    assert request_key(PARAMS) == request_key(reordered)
+    assert request_key(PARAMS) != request_key(dict(PARAMS, model="gpt-4o"))
+
+
+@pytest.mark.parametrize("name", ["responses.jsonl", "responses.jsonl.gz"])
+def test_store_persists_and_survives_a_torn_tail(tmp_path, name):
+    path = str(tmp_path / name)
+    ResponseStore(path).put("a", {"completion": 1})
+    ResponseStore(path).put("b", {"completion": 2})
+    with open(path, "ab") as f:
+        f.write(b"\x1f\x8b\x08" if name.endswith(".gz") else b'{"key": "c", "resp')
+
+    store = ResponseStore(path)
+    assert store.get("a") == {"completion": 1}
+    assert store.get("b") == {"completion": 2}
+    assert len(store) == 2
+    store.put("c", {"completion": 3})
+    assert ResponseStore(path).get("c") == {"completion": 3}
+
+
+def test_auto_mode_records_then_replays(tmp_path):
+    client = CountingOpenAI()
+    replay = ReplayOpenAI(client, path=str(tmp_path / "responses.jsonl.gz"))
+    first = replay.chat.completions.create(**PARAMS)
+    second = replay.chat.completions.create(**PARAMS)
+    assert client.requests == 1
+    assert second.choices[0].message.content == first.choices[0].message.content
+    assert second is not first
+    assert replay.stats() == {"mode": "auto", "hits": 1, "misses": 1, "recorded": 1}
+
+
+def test_replay_mode_never_calls_the_api(tmp_path):
+    path = str(tmp_path / "responses.jsonl.gz")
+    ReplayOpenAI(CountingOpenAI(), path=path).chat.completions.create(**PARAMS)
+
+    client = CountingOpenAI()
+    replay = ReplayOpenAI(client, path=path, mode="replay")
+    replay.chat.completions.create(**PARAMS)
+    with pytest.raises(ReplayMiss):
+        replay.chat.completions.create(**dict(PARAMS, model="gpt-4o"))
+    assert client.requests == 0
+
+
+def test_record_mode_always_calls_the_api(tmp_path):
+    client = CountingOpenAI()
+    replay = ReplayOpenAI(client, path=str(tmp_path / "responses.jsonl"), mode="record")
+    replay.chat.completions.create(**PARAMS)
+    replay.chat.completions.create(**PARAMS)
+    assert client.requests == 2
+
+
+def test_streams_are_recorded_once_read(tmp_path):
+    client = CountingOpenAI()
+    replay = ReplayOpenAI(client, path=str(tmp_path / "responses.jsonl.gz"))
+    params = dict(PARAMS, stream=True)
+    recorded = list(replay.chat.completions.create(**params))
+    replayed = list(replay.chat.completions.create(**params))
+    assert client.requests == 1
+    dumped = [chunk.model_dump() for chunk in recorded]
+    assert [chunk.model_dump() for chunk in replayed] == dumped
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ReplayOpenAI(CountingOpenAI(), path=str(tmp_path / "responses.jsonl"),
+                     mode="live")
+
+
+def test_other_endpoints_pass_through(tmp_path):
+    client = CountingOpenAI()
+    replay = ReplayOpenAI(client, path=str(tmp_path / "responses.jsonl"))
+    assert replay.images is client.images
@@ -0,0 +1,219 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import types
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from server import (
+    WS_CLOSE,
+    WS_PING,
+    WS_PONG,
+    WS_TEXT,
+    AgentService,
+    make_handler,
+    read_frame,
+    websocket_accept,
+)
+
+AGENT = types.SimpleNamespace(name="Based Agent")
+
+
+class EchoClient:
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Semaphore(0)
+
+    def run(self, agent, messages):
+        self.started.release()
+        self.release.wait(5)
+        reply = {"role": "assistant", "sender": agent.name,
+                 "content": f"echo: {messages[-1]['content']}"}
+        return types.SimpleNamespace(messages=[reply], agent=agent)
+
+
+@pytest.fixture
+def client():
+    return EchoClient()
+
+
+@pytest.fixture
+def service(client):
+    return AgentService(AGENT, client, max_workers=2, max_pending=2)
+
+
+@pytest.fixture
+def server(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def request_json(server):
+    def request(method, path, body=None):
+        connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        payload = body
+        if not isinstance(body, (bytes, type(None))):
+            payload = json.dumps(body).encode()
+        connection.request(method, path, body=payload)
+        response = connection.getresponse()
+        status, data = response.status, response.read()
+        connection.close()
+        if response.getheader("Content-Type") == "application/json":
+            data = json.loads(data)
+        return status, data
+
+    return request
+
+
+def test_conversation_round_trip(request_json):
+    status, body = request_json("POST", "/sessions")
+    assert status == 201
+    session_id = body["session_id"]
+
+    status, body = request_json("POST", f"/sessions/{session_id}/messages",
+                                {"content": "gm"})
+    assert status == 200
+    assert body["messages"][0]["content"] == "echo: gm"
+
+    status, body = request_json("GET", f"/sessions/{session_id}")
+    assert [message["role"] for message in body["messages"]] == ["user", "assistant"]
+
+    assert request_json("DELETE", f"/sessions/{session_id}")[0] == 200
+    assert request_json("GET", f"/sessions/{session_id}")[0] == 404
+
+
+@pytest.mark.parametrize("body",
+                         [b"not json", b"[1, 2]", {"text": "gm"}, {"content": 5}])
+def test_bad_message_bodies_are_rejected(request_json, body):
+    session_id = request_json("POST", "/sessions")[1]["session_id"]
+    status, response = request_json("POST", f"/sessions/{session_id}/messages", body)
+    assert status == 400
+    assert "content" in response["error"]
+
+
+def test_unknown_paths_and_sessions(request_json):
+    status, _ = request_json("POST", "/sessions/abc123/messages", {"content": "gm"})
+    assert status == 404
+    assert request_json("POST", "/nowhere")[0] == 404
+    assert request_json("DELETE", "/sessions/abc123")[0] == 404
+    assert request_json("GET", "/health") == (200, {"status": "ok", "sessions": 0})
+
+
+def test_history_can_be_read_during_a_turn(request_json, client, service):
+    session_id = request_json("POST", "/sessions")[1]["session_id"]
+    client.release.clear()
+    turn = threading.Thread(target=request_json, args=(
+        "POST", f"/sessions/{session_id}/messages", {"content": "gm"}))
+    turn.start()
+    try:
+        status, body = request_json("GET", f"/sessions/{session_id}")
+        assert status == 200
+    finally:
+        client.release.set()
+        turn.join()
+    assert len(service.get_session(session_id).history()) == 2
+
+
+def test_busy_server_refuses_turns(service, client):
+    client.release.clear()
+    sessions = [service.create_session() for _ in range(2)]
+    turns = [threading.Thread(target=service.send, args=(session, "gm"))
+             for session in sessions]
+    for turn in turns:
+        turn.start()
+    try:
+        for _ in turns:
+            assert client.started.acquire(timeout=5)
+        with pytest.raises(BlockingIOError):
+            service.send(service.create_session(), "gm")
+    finally:
+        client.release.set()
+        for turn in turns:
+            turn.join()
+
+
+def test_idle_sessions_make_room(client):
+    service = AgentService(AGENT, client, max_sessions=1, idle_timeout=0)
+    first = service.create_session()
+    first.last_used -= 1
+    second = service.create_session()
+    assert service.get_session(first.id) is None
+    assert service.get_session(second.id) is second
+
+
+def client_frame(opcode, payload, fin=True):
+    """A masked client-to-server frame"""
+    mask = os.urandom(4)
+    masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return struct.pack("!BB", (0x80 if fin else 0) | opcode,
+                       0x80 | len(payload)) + mask + masked
+
+
+def open_websocket(server, path):
+    sock = socket.create_connection(server.server_address, timeout=5)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+                  "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+                  "\r\n").encode())
+    stream = sock.makefile("rb")
+    status = stream.readline()
+    headers = {}
+    for line in iter(stream.readline, b"\r\n"):
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return sock, stream, status, headers, key
+
+
+def test_websocket_accept_matches_the_rfc_example():
+    accept = websocket_accept("dGhlIHNhbXBsZSBub25jZQ==")
+    assert accept == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+def test_websocket_conversation(server, request_json):
+    session_id = request_json("POST", "/sessions")[1]["session_id"]
+    sock, stream, status, headers, key = open_websocket(server,
+                                                        f"/sessions/{session_id}/ws")
+    try:
+        assert status.startswith(b"HTTP/1.1 101")
+        assert headers["sec-websocket-accept"] == websocket_accept(key)
+
+        sock.sendall(client_frame(WS_PING, b"hi"))
+        assert read_frame(stream) == (True, WS_PONG, b"hi")
+
+        # A message split over two frames is one turn
+        sock.sendall(client_frame(WS_TEXT, b'{"content":', fin=False))
+        sock.sendall(client_frame(0x0, b' "gm"}'))
+        fin, opcode, payload = read_frame(stream)
+        assert (fin, opcode) == (True, WS_TEXT)
+        assert json.loads(payload)["messages"][0]["content"] == "echo: gm"
+
+        sock.sendall(client_frame(WS_TEXT, b'{"text": "gm"}'))
+        assert "content" in json.loads(read_frame(stream)[2])["error"]
+
+        sock.sendall(client_frame(WS_CLOSE, struct.pack("!H", 1000)))
+        assert read_frame(stream) == (True, WS_CLOSE, struct.pack("!H", 1000))
+    finally:
+        stream.close()
+        sock.close()
+    history = request_json("GET", f"/sessions/{session_id}")[1]["messages"]
+    assert [message["role"] for message in history] == ["user", "assistant"]
+
+
+def test_websocket_needs_an_upgrade_and_a_session(request_json):
+    session_id = request_json("POST", "/sessions")[1]["session_id"]
+    assert request_json("GET", f"/sessions/{session_id}/ws")[0] == 400
+    assert request_json("GET", "/sessions/abc123/ws")[0] == 404
+    status, _ = request_json("POST", f"/sessions/{session_id}/ws", {"content": "gm"})
+    assert status == 404
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("swarm")
+
+from swarm_utils import ParallelSwarm
+
+
+def tool_call(index, name, **arguments):
+    function = types.SimpleNamespace(name=name, arguments=json.dumps(arguments))
+    return types.SimpleNamespace(id=f"call-{index}", function=function)
+
+
+class StubTools:
+    def __init__(self, lock):
+        """Tools that record the order they ran in and whether the lock was held"""
+        self.lock = lock
+        self.events = []
+        self.lock_held = []
+        self._events_lock = threading.Lock()
+
+    def record(self, event):
+        with self._events_lock:
+            self.events.append(event)
+
+    def functions(self):
+        def transfer(label: str, delay: float = 0):
+            """Send from the wallet"""
+            self.lock_held.append(self.lock.locked())
+            self.record(f"start {label}")
+            time.sleep(delay)
+            self.record(f"end {label}")
+            return f"sent {label}"
+
+        def read(label: str, delay: float = 0):
+            """Read something"""
+            time.sleep(delay)
+            self.record(f"read {label}")
+            return f"read {label}"
+
+        def fail(label: str):
+            """Always raises"""
+            raise RuntimeError(f"boom {label}")
+
+        return [transfer, read, fail]
+
+
+def make_client(max_workers=4):
+    lock = threading.Lock()
+    tools = StubTools(lock)
+    client = ParallelSwarm(client=object(), max_workers=max_workers,
+                           serialized_tools=["transfer"], serial_lock=lock)
+    return client, tools
+
+
+def contents(response):
+    return [message["content"] for message in response.messages]
+
+
+def test_results_keep_the_order_the_model_issued():
+    client, tools = make_client()
+    calls = [
+        tool_call(0, "read", label="slow", delay=0.2),
+        tool_call(1, "transfer", label="a"),
+        tool_call(2, "read", label="fast"),
+    ]
+    response = client.handle_tool_calls(calls, tools.functions(), {}, False)
+    assert contents(response) == ["read slow", "sent a", "read fast"]
+    assert [message["tool_call_id"] for message in response.messages] == [
+        "call-0", "call-1", "call-2"]
+    # The fast read wasn't held up behind the slow one
+    assert tools.events.index("read fast") < tools.events.index("read slow")
+
+
+def test_serialized_tools_run_in_order_under_the_lock():
+    client, tools = make_client()
+    calls = [
+        tool_call(0, "transfer", label="a", delay=0.05),
+        tool_call(1, "read", label="x"),
+        tool_call(2, "transfer", label="b"),
+        tool_call(3, "transfer", label="c"),
+    ]
+    response = client.handle_tool_calls(calls, tools.functions(), {}, False)
+    assert contents(response) == ["sent a", "read x", "sent b", "sent c"]
+    transfers = [event for event in tools.events if not event.startswith("read")]
+    assert transfers == ["start a", "end a", "start b", "end b", "start c", "end c"]
+    assert tools.lock_held == [True, True, True]
+
+
+def test_serialized_tools_wait_for_the_lock():
+    client, tools = make_client()
+    calls = [tool_call(0, "transfer", label="a"), tool_call(1, "read", label="x")]
+    with tools.lock:
+        thread = threading.Thread(
+            target=client.handle_tool_calls,
+            args=(calls, tools.functions(), {}, False),
+        )
+        thread.start()
+        time.sleep(0.1)
+        # The read ran; the transfer is still waiting for another holder of the lock
+        assert tools.events == ["read x"]
+    thread.join(timeout=2)
+    assert tools.events == ["read x", "start a", "end a"]
+
+
+def test_independent_calls_run_concurrently():
+    client, tools = make_client()
+    barrier = threading.Barrier(2, timeout=2)
+
+    def meet(label: str):
+        """Returns once another call is running at the same time"""
+        barrier.wait()
+        return label
+
+    calls = [tool_call(0, "meet", label="a"), tool_call(1, "meet", label="b")]
+    response = client.handle_tool_calls(calls, [meet, *tools.functions()], {}, False)
+    assert contents(response) == ["a", "b"]
+
+
+def test_a_single_worker_runs_every_lane_inline():
+    client, tools = make_client(max_workers=1)
+    calls = [tool_call(0, "read", label="x"), tool_call(1, "transfer", label="a")]
+    response = client.handle_tool_calls(calls, tools.functions(), {}, False)
+    assert contents(response) == ["read x", "sent a"]
+    assert client._executor is None
+
+
+def test_a_raising_tool_becomes_an_error_message():
+    client, tools = make_client()
+    calls = [tool_call(0, "fail", label="x"), tool_call(1, "read", label="y")]
+    response = client.handle_tool_calls(calls, tools.functions(), {}, False)
+    assert contents(response) == ["Error running fail: boom x", "read y"]
@@ -0,0 +1,101 @@
+import types
+
+import pytest
+
+pytest.importorskip("swarm")
+
+from tool_utils import ToolRouter, build_create_params, tool_schema
+
+
+def get_balance(asset_id: str):
+    """Get the balance of an asset"""
+
+
+def transfer_asset(amount: str, asset_id: str, destination_address: str):
+    """Transfer an asset"""
+
+
+def post_tweet(tweet_text: str):
+    """Post a tweet"""
+
+
+def check_operation(context_variables: dict, operation_id: str):
+    """Check an operation"""
+
+
+FUNCTIONS = [get_balance, transfer_asset, post_tweet, check_operation]
+
+
+def make_router():
+    return ToolRouter(
+        {
+            "wallet": {
+                "tools": ["get_balance", "transfer_asset"],
+                "keywords": [r"\bsend\b", "balance"],
+            },
+            "twitter": {"tools": ["post_tweet"], "keywords": ["tweet"]},
+        },
+        always=["check_operation"],
+    )
+
+
+def names(functions):
+    return [function.__name__ for function in functions]
+
+
+def test_matching_groups_narrow_the_tools():
+    history = [{"role": "user", "content": "What's my BALANCE?"}]
+    assert make_router().route(history) == ["wallet"]
+    selected = names(make_router().select(FUNCTIONS, history))
+    assert selected == ["get_balance", "transfer_asset", "check_operation"]
+
+
+def test_no_match_offers_every_tool():
+    history = [{"role": "user", "content": "Surprise me"}]
+    assert make_router().select(FUNCTIONS, history) == FUNCTIONS
+
+
+def test_only_the_latest_user_message_routes():
+    history = [
+        {"role": "user", "content": "tweet something"},
+        {"role": "assistant", "content": "done"},
+        {"role": "user", "content": "send 1 eth"},
+    ]
+    assert make_router().route(history) == ["wallet"]
+
+
+def test_tools_called_this_turn_stay_available():
+    history = [
+        {"role": "user", "content": "send 1 eth"},
+        {"role": "assistant", "tool_calls": [
+            {"function": {"name": "post_tweet", "arguments": "{}"}},
+        ]},
+    ]
+    assert "post_tweet" in names(make_router().select(FUNCTIONS, history))
+
+
+def test_tool_schema_hides_context_variables_and_is_cached():
+    schema = tool_schema(check_operation)
+    parameters = schema["function"]["parameters"]
+    assert "context_variables" not in parameters["properties"]
+    assert parameters["required"] == ["operation_id"]
+    assert tool_schema(check_operation) is schema
+
+
+def test_build_create_params():
+    agent = types.SimpleNamespace(
+        instructions=lambda context: f"Hello {context['name']}",
+        functions=FUNCTIONS,
+        tool_choice=None,
+        parallel_tool_calls=True,
+    )
+    history = [{"role": "user", "content": "hi"}]
+    params = build_create_params(agent, history, {"name": "base"}, "gpt-4o-mini", False,
+                                 functions=[post_tweet])
+    assert params["messages"][0] == {"role": "system", "content": "Hello base"}
+    assert [tool["function"]["name"] for tool in params["tools"]] == ["post_tweet"]
+    assert params["parallel_tool_calls"] is True
+
+    params = build_create_params(agent, history, {}, "gpt-4o-mini", False, functions=[])
+    assert params["tools"] is None
+    assert "parallel_tool_calls" not in params
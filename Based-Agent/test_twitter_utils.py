@@ -0,0 +1,193 @@
+import time
+import types
+
+import pytest
+import tweepy
+
+from twitter_utils import LRUCache, RateLimited, RateLimitScheduler, TwitterBot
+
+
+class StubApi:
+    def __init__(self):
+        """Records calls; each one can set the rate limit headers of its response"""
+        self.last_response = None
+        self.posts = []
+        self.lookups = []
+        self.status_requests = []
+        self.users = {}
+
+    def respond(self, remaining, reset):
+        headers = {"x-rate-limit-remaining": str(remaining),
+                   "x-rate-limit-reset": str(reset)}
+        self.last_response = types.SimpleNamespace(headers=headers)
+
+    def update_status(self, status=None, **kwargs):
+        self.posts.append((status, kwargs.get("in_reply_to_status_id")))
+        return types.SimpleNamespace(id=len(self.posts))
+
+    def get_status(self, tweet_id):
+        self.status_requests.append(tweet_id)
+        return self.tweet(tweet_id)
+
+    def statuses_lookup(self, ids):
+        self.lookups.append(list(ids))
+        return [self.tweet(tweet_id) for tweet_id in ids]
+
+    def tweet(self, tweet_id):
+        screen_name = self.users.get(str(tweet_id), "someone")
+        user = types.SimpleNamespace(screen_name=screen_name)
+        return types.SimpleNamespace(id=int(tweet_id), user=user)
+
+
+def rate_limit_error():
+    return tweepy.TweepError("Rate limit exceeded",
+                             response=types.SimpleNamespace(status_code=429))
+
+
+def test_call_tracks_the_window_from_headers():
+    api = StubApi()
+    scheduler = RateLimitScheduler(api)
+
+    def read():
+        api.respond(remaining=0, reset=time.time() + 60)
+        return "mentions"
+
+    assert scheduler.call("statuses/mentions_timeline", read) == "mentions"
+    assert 55 < scheduler.wait_time("statuses/mentions_timeline") <= 60
+    with pytest.raises(RateLimited, match="try again in"):
+        scheduler.call("statuses/mentions_timeline", read)
+    # Other endpoints have their own windows
+    assert scheduler.wait_time("search/tweets") == 0
+
+
+def test_rate_limit_errors_back_off_exponentially():
+    scheduler = RateLimitScheduler(StubApi(), max_backoff=40)
+
+    def limited():
+        raise rate_limit_error()
+
+    waits = []
+    for _ in range(3):
+        with pytest.raises(tweepy.TweepError):
+            scheduler.call("search/tweets", limited)
+        waits.append(scheduler.wait_time("search/tweets"))
+        scheduler._backoff_until.clear()
+    assert [round(wait) for wait in waits] == [15, 30, 40]
+
+
+def test_posts_beyond_the_burst_are_queued_and_sent_in_order():
+    api = StubApi()
+    scheduler = RateLimitScheduler(api, posts_per_minute=600, burst=1)
+
+    def post(text):
+        return lambda: f"posted {api.update_status(text).id}"
+
+    assert scheduler.submit("statuses/update", post("first"), "tweet",
+                            "Error") == "posted 1"
+    queued = [scheduler.submit("statuses/update", post(text), f"tweet {text}", "Error")
+              for text in ("second", "third")]
+    assert "queued (position 1" in queued[0]
+    assert "queued (position 2" in queued[1]
+    assert scheduler.pending() == ["tweet second", "tweet third"]
+
+    deadline = time.time() + 2
+    while scheduler.pending() or len(scheduler.completed) < 2:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert [text for text, _ in api.posts] == ["first", "second", "third"]
+    assert list(scheduler.completed) == ["posted 2", "posted 3"]
+
+
+def test_other_post_errors_are_reported_not_queued():
+    scheduler = RateLimitScheduler(StubApi())
+
+    def broken():
+        raise tweepy.TweepError("Status is a duplicate")
+
+    result = scheduler.submit("statuses/update", broken, "tweet", "Error posting tweet")
+    assert result == "Error posting tweet: Status is a duplicate"
+    assert scheduler.pending() == []
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+@pytest.fixture
+def bot(tmp_path):
+    bot = TwitterBot("key", "secret", "token", "token-secret",
+                     state_file=str(tmp_path / "twitter_state.json"))
+    bot.api = bot.scheduler.api = StubApi()
+    return bot
+
+
+def test_replies_use_the_cached_author(bot):
+    bot.authors.put("7", "alice")
+    assert bot.reply_to_tweet("7", "hi") == "Successfully replied to tweet 7"
+    assert bot.api.posts == [("@alice hi", "7")]
+    assert bot.api.status_requests == []
+
+
+def test_uncached_authors_are_looked_up_once(bot):
+    bot.api.users["8"] = "bob"
+    bot.reply_to_tweet("8", "one")
+    bot.reply_to_tweet("8", "two")
+    assert bot.api.status_requests == ["8"]
+    assert [text for text, _ in bot.api.posts] == ["@bob one", "@bob two"]
+
+
+def test_prefetch_looks_up_missing_authors_in_batches_of_100(bot):
+    bot.authors.put("0", "cached")
+    tweet_ids = [str(tweet_id) for tweet_id in range(150)] + ["5"]
+    assert bot.prefetch_authors(tweet_ids) == 149
+    assert [len(batch) for batch in bot.api.lookups] == [100, 49]
+    assert "0" not in bot.api.lookups[0]
+    bot.reply_to_tweets([{"tweet_id": 120, "content": "thanks"}])
+    assert bot.api.status_requests == []
+
+
+class Timeline:
+    def __init__(self, bot):
+        """Mentions with increasing IDs, paged like tweepy's Cursor"""
+        self.ids = []
+        self.pages = []
+        bot._page_mentions = self.page
+
+    def page(self, limit, since_id, max_id=None):
+        self.pages.append((limit, since_id, max_id))
+        ids = [tweet_id for tweet_id in reversed(self.ids)
+               if tweet_id > since_id and (max_id is None or tweet_id <= max_id)]
+        user = types.SimpleNamespace(screen_name="fan")
+        return [types.SimpleNamespace(id=tweet_id, text=f"gm {tweet_id}", user=user,
+                                      created_at="today")
+                for tweet_id in ids[:limit]]
+
+
+def ids(mentions):
+    return [mention["id"] for mention in mentions]
+
+
+def test_a_long_backlog_is_read_over_several_calls_without_gaps(bot):
+    timeline = Timeline(bot)
+    bot.mention_store.add([{"id": 100, "text": "", "user": "fan",
+                            "created_at": "earlier"}])
+    timeline.ids = list(range(101, 126))
+
+    assert ids(bot.read_mentions(max_backlog=10)) == list(range(125, 115, -1))
+    assert bot.mention_store.gaps == [[100, 115]]
+    timeline.ids.append(126)
+    # New mentions come first, then the backlog continues where it stopped
+    assert ids(bot.read_mentions(max_backlog=10)) == [126, *range(115, 106, -1)]
+    assert ids(bot.read_mentions(max_backlog=10)) == list(range(106, 100, -1))
+    assert bot.mention_store.gaps == []
+    assert bot.read_mentions(max_backlog=10) == []
+
+    reloaded = TwitterBot("key", "secret", "token", "token-secret",
+                          state_file=bot.mention_store.path)
+    assert reloaded.mention_store.since_id == 126
@@ -0,0 +1,164 @@
+import threading
+import time
+import types
+from decimal import Decimal
+
+import pytest
+
+from tx_utils import (
+    TransactionWatcher,
+    TransferCoalescer,
+    is_terminal,
+    reports_status,
+    transaction_status,
+)
+
+
+class Submission:
+    def __init__(self, polls_until_final=0, status="complete"):
+        self.polls_until_final = polls_until_final
+        self.final_status = status
+        self.transaction = types.SimpleNamespace(terminal_state=False,
+                                                 status="broadcast")
+        self.reloads = 0
+
+    def reload(self):
+        self.reloads += 1
+        if self.reloads >= self.polls_until_final:
+            self.transaction = types.SimpleNamespace(terminal_state=True,
+                                                     status=self.final_status)
+
+
+class SponsoredSend:
+    def __init__(self, status):
+        self.status = types.SimpleNamespace(value=status)
+
+    @property
+    def terminal_state(self):
+        return self.status.value in ("complete", "failed")
+
+
+def test_gasless_transfer_is_pending_until_its_sponsored_send_lands():
+    transfer = types.SimpleNamespace(transaction=None,
+                                     sponsored_send=SponsoredSend("submitted"))
+    assert not is_terminal(transfer)
+    assert transaction_status(transfer) == "submitted"
+    transfer.sponsored_send = SponsoredSend("complete")
+    assert is_terminal(transfer)
+    assert transaction_status(transfer) == "complete"
+
+
+def test_status_fallbacks():
+    assert not is_terminal(types.SimpleNamespace(status="pending"))
+    assert is_terminal(types.SimpleNamespace(status="failed"))
+    assert is_terminal(object())
+
+
+def test_objects_without_a_state_are_not_watchable():
+    # A faucet transaction from an older SDK: a hash and nothing else
+    assert not reports_status(types.SimpleNamespace(transaction_hash="0xabc"))
+    assert reports_status(types.SimpleNamespace(status="pending"))
+    assert reports_status(Submission())
+
+
+@pytest.fixture
+def watcher():
+    return TransactionWatcher(poll_interval=0.01, timeout_seconds=1)
+
+
+def test_watcher_completes_and_notifies(watcher):
+    finished = []
+    watcher.add_listener(finished.append)
+    operation = watcher.track("transfer_asset", Submission(polls_until_final=2),
+                              "transfer", lambda _: "sent")
+    assert operation.wait(2)
+    assert (operation.status, operation.result) == ("complete", "sent")
+    assert finished == [operation]
+    assert watcher.get(operation.id) is operation
+
+
+def test_watcher_reports_failures(watcher):
+    operation = watcher.track("mint_nft", Submission(status="failed"), "mint")
+    assert operation.wait(2)
+    assert operation.status == "failed"
+
+
+def test_watcher_times_out():
+    watcher = TransactionWatcher(poll_interval=0.01, timeout_seconds=0.05)
+    operation = watcher.track("mint_nft", Submission(polls_until_final=10 ** 6), "mint")
+    assert operation.wait(2)
+    assert operation.status == "timeout"
+
+
+def test_on_complete_error_keeps_operation_complete(watcher):
+    def on_complete(_):
+        raise OSError("disk full")
+
+    finished = []
+    operation = watcher.track("create_token", Submission(), "deployment", on_complete,
+                              on_finish=finished.append)
+    assert operation.wait(2)
+    assert operation.status == "complete"
+    assert "disk full" in operation.result
+    assert finished == [operation]
+
+
+def test_wait_for_many(watcher):
+    operations = [watcher.track("batch_transfer", Submission(polls_until_final=n),
+                                f"row {n}") for n in range(3)]
+    assert watcher.wait(operations, timeout=2)
+    assert not watcher.in_flight()
+
+
+def test_coalescer_merges_same_destination():
+    sent = []
+
+    def send(amount, asset_id, destination):
+        sent.append((amount, asset_id, destination))
+        return f"tx-{len(sent)}"
+
+    coalescer = TransferCoalescer(send, window_seconds=0.2)
+    groups = []
+
+    def transfer(amount, destination):
+        groups.append(coalescer.transfer(amount, "eth", destination))
+
+    threads = [threading.Thread(target=transfer, args=args)
+               for args in ((1, "0xA"), (2, "0xa"), (3, "0xB"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(sent) == [(Decimal(3), "eth", "0xA"), (Decimal(3), "eth", "0xB")]
+    merged = [group for group in groups if group.destination == "0xA"]
+    assert len(merged) == 2 and merged[0] is merged[1]
+    assert merged[0].count == 2
+
+
+def test_coalescer_reports_open_groups():
+    coalescer = TransferCoalescer(lambda *_: "tx", window_seconds=0.2)
+    thread = threading.Thread(target=coalescer.transfer, args=(1, "eth", "0xA"))
+    thread.start()
+    time.sleep(0.05)
+    assert coalescer.is_open("ETH", "0xa")
+    assert not coalescer.is_open("eth", "0xB")
+    thread.join()
+    assert not coalescer.is_open("eth", "0xA")
+
+
+def test_coalescer_shares_send_errors():
+    def send(*_):
+        raise RuntimeError("rejected")
+
+    group = TransferCoalescer(send, window_seconds=0).transfer(1, "eth", "0xA")
+    assert isinstance(group.error, RuntimeError)
+
+
+def test_group_once_runs_once():
+    coalescer = TransferCoalescer(lambda *_: "tx", window_seconds=0)
+    group = coalescer.transfer(1, "eth", "0xA")
+    calls = []
+    assert group.once("result", lambda: calls.append(1) or "first") == "first"
+    assert group.once("result", lambda: calls.append(2) or "second") == "first"
+    assert calls == [1]
@@ -0,0 +1,91 @@
+import threading
+from decimal import Decimal
+
+from wallet_utils import BalanceCache, LazyWallet
+
+
+class CountingWallet:
+    def __init__(self, wallet_id="wallet-1", balance=Decimal(10)):
+        self.id = wallet_id
+        self.balances = {}
+        self.default = balance
+        self.reads = 0
+
+    def balance(self, asset_id):
+        self.reads += 1
+        return self.balances.get(asset_id, self.default)
+
+
+def test_hits_within_ttl():
+    cache = BalanceCache(ttl_seconds=60)
+    wallet = CountingWallet()
+    assert cache.get(wallet, "ETH") == 10
+    assert cache.get(wallet, "eth") == 10
+    assert wallet.reads == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_entries_are_refetched():
+    cache = BalanceCache(ttl_seconds=0)
+    wallet = CountingWallet()
+    cache.get(wallet, "eth")
+    cache.get(wallet, "eth")
+    assert wallet.reads == 2
+
+
+def test_adjust_only_changes_cached_balances():
+    cache = BalanceCache(ttl_seconds=60)
+    wallet = CountingWallet()
+    cache.adjust(wallet, "eth", -1)
+    cache.get(wallet, "eth")
+    cache.adjust(wallet, "eth", Decimal("-2.5"))
+    assert cache.get(wallet, "eth") == Decimal("7.5")
+    assert wallet.reads == 1
+
+
+def test_invalidate_is_per_wallet_and_asset():
+    cache = BalanceCache(ttl_seconds=60)
+    first, second = CountingWallet("a"), CountingWallet("b")
+    for wallet in (first, second):
+        cache.get(wallet, "eth")
+        cache.get(wallet, "usdc")
+    cache.invalidate(first, "eth")
+    cache.get(first, "eth")
+    cache.get(first, "usdc")
+    cache.get(second, "eth")
+    assert (first.reads, second.reads) == (3, 2)
+
+    cache.invalidate(first)
+    cache.get(first, "usdc")
+    assert first.reads == 4
+
+
+def test_balance_is_polled_until_it_changes():
+    cache = BalanceCache(ttl_seconds=60)
+    wallet = CountingWallet()
+    previous = cache.get(wallet, "eth")
+    thread = cache.invalidate_when_changed(wallet, "eth", previous, poll_interval=0.01)
+    threading.Timer(0.05, wallet.balances.__setitem__, ("eth", Decimal(11))).start()
+    thread.join(timeout=5)
+    reads = wallet.reads
+    assert cache.get(wallet, "eth") == Decimal(11)
+    assert wallet.reads == reads
+
+
+def test_balance_that_never_changes_is_dropped_after_the_timeout():
+    cache = BalanceCache(ttl_seconds=60)
+    wallet = CountingWallet()
+    previous = cache.get(wallet, "eth")
+    cache.invalidate_when_changed(wallet, "eth", previous, timeout_seconds=0.05,
+                                  poll_interval=0.01).join(timeout=5)
+    reads = wallet.reads
+    cache.get(wallet, "eth")
+    assert wallet.reads == reads + 1
+
+
+def test_lazy_wallet_does_not_connect_until_used():
+    wallet = LazyWallet(api_key_file="missing.json", wallet_id="wallet-1",
+                        seed_file="seed.json")
+    assert not wallet.connected
+    assert wallet.wallet_id == "wallet-1"
+    assert "not connected" in repr(wallet)
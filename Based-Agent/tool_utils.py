@@ -0,0 +1,138 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List
+
+from swarm.util import function_to_json
+
+# Swarm's name for the hidden argument that carries context variables
+CONTEXT_VARIABLES_ARG = "context_variables"
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def tool_schema(function: Callable) -> Dict:
+    """
+    JSON schema of a tool, built once per function
+
+    Swarm introspects every function's signature and docstring on every
+    model request; the result never changes, so it is cached here. The
+    returned dict is shared and must not be modified.
+
+    Args:
+        function (Callable): Tool function
+
+    Returns:
+        Dict: Tool schema in the OpenAI format, without the context_variables argument
+    """
+    schema = _schemas.get(function)
+    if schema is None:
+        schema = function_to_json(function)
+        parameters = schema["function"]["parameters"]
+        parameters["properties"].pop(CONTEXT_VARIABLES_ARG, None)
+        if CONTEXT_VARIABLES_ARG in parameters["required"]:
+            parameters["required"].remove(CONTEXT_VARIABLES_ARG)
+        with _schemas_lock:
+            schema = _schemas.setdefault(function, schema)
+    return schema
+
+
+def build_create_params(agent, history: List, context_variables: dict, model: str,
+                        stream: bool, functions: Iterable[Callable] = None) -> Dict:
+    """
+    Keyword arguments for chat.completions.create, built as Swarm does but with
+    cached schemas
+
+    Args:
+        agent (Agent): Agent taking the turn
+        history (List): Conversation so far
+        context_variables (dict): Swarm context variables
+        model (str): Model to call
+        stream (bool): Whether to stream the response
+        functions (Iterable[Callable]): Tools to offer, defaults to all of the agent's
+
+    Returns:
+        Dict: Request parameters
+    """
+    instructions = agent.instructions
+    if callable(instructions):
+        instructions = instructions(defaultdict(str, context_variables))
+    if functions is None:
+        functions = agent.functions
+    tools = [tool_schema(function) for function in functions]
+    create_params = {
+        "model": model,
+        "messages": [{"role": "system", "content": instructions}] + history,
+        "tools": tools or None,
+        "tool_choice": agent.tool_choice,
+        "stream": stream,
+    }
+    if tools:
+        create_params["parallel_tool_calls"] = agent.parallel_tool_calls
+    return create_params
+
+
+class ToolRouter:
+    def __init__(self, groups: Dict[str, Dict], always: Iterable[str] = ()):
+        """
+        Picks which tools to offer the model for a turn
+
+        Each group lists its tools and the keywords (regular expressions,
+        matched case-insensitively against the latest user message) that
+        call for it. A turn gets the tools of every matching group plus the
+        always-on tools, and keeps any tool already called earlier in the
+        turn. When nothing matches, every tool is offered, so an open-ended
+        prompt loses nothing.
+
+        Args:
+            groups (Dict[str, Dict]): Group name -> {"tools": [...], "keywords": [...]}
+            always (Iterable[str]): Tools offered whenever the subset is narrowed
+        """
+        self.groups = {
+            name: (
+                set(group["tools"]),
+                re.compile("|".join(group["keywords"]), re.IGNORECASE),
+            )
+            for name, group in groups.items()
+        }
+        self.always = set(always)
+
+    @staticmethod
+    def _current_turn(history: List):
+        # The latest user message and everything after it (the tool calls and
+        # results of this turn)
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].get("role") == "user":
+                return history[index], history[index + 1:]
+        return None, history
+
+    def route(self, history: List) -> List[str]:
+        """Names of the groups that match the latest user message"""
+        message, _ = self._current_turn(history)
+        content = str((message or {}).get("content") or "")
+        return [name for name, (_, keywords) in self.groups.items()
+                if keywords.search(content)]
+
+    def select(self, functions: List[Callable], history: List) -> List[Callable]:
+        """
+        The tools to offer for the current turn
+
+        Args:
+            functions (List[Callable]): All of the agent's tools
+            history (List): Conversation so far
+
+        Returns:
+            List[Callable]: A subset of functions, in their original order
+        """
+        groups = self.route(history)
+        if not groups:
+            return functions
+        names = set(self.always)
+        for name in groups:
+            names |= self.groups[name][0]
+        _, turn = self._current_turn(history)
+        for message in turn:
+            for tool_call in message.get("tool_calls") or []:
+                names.add(tool_call["function"]["name"])
+        return [function for function in functions if function.__name__ in names]
@@ -1,17 +1,328 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List
+
 import tweepy
-from time import sleep
-from typing import List, Dict, Optional
+
+from metrics_utils import metrics
+from render_utils import get_renderer
+
+
+class LRUCache:
+    def __init__(self, max_size: int = 1000):
+        """
+        Thread-safe least-recently-used cache
+        
+        Args:
+            max_size (int): Entries kept before the least recently used is evicted
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class MentionStore:
+    def __init__(self, path: str, max_mentions: int = 200):
+        """
+        Local record of mentions the bot has already seen
+        
+        Persists the since_id cursor and the most recent mentions to a JSON
+        file so a restarted bot only fetches what arrived while it was away.
+        gaps holds [since_id, max_id] ranges of a backlog that was too long to
+        read at once and still has to be fetched.
+        
+        Args:
+            path (str): JSON file to keep the state in
+            max_mentions (int): Number of recent mentions to keep
+        """
+        self.path = path
+        self.max_mentions = max_mentions
+        self.since_id = None
+        self.mentions = []
+        self.gaps = []
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.since_id = state.get("since_id")
+            self.mentions = state.get("mentions", [])
+            self.gaps = state.get("gaps", [])
+
+    def add(self, mentions: List[Dict], gaps: List[List[int]] = None):
+        """
+        Record newly fetched mentions and advance the cursor
+        
+        Args:
+            mentions (List[Dict]): New mentions, newest first
+            gaps (List[List[int]]): Backlog ranges still to fetch, if they changed
+        """
+        if not mentions and gaps is None:
+            return
+        with self._lock:
+            if mentions:
+                self.since_id = max([self.since_id or 0]
+                                    + [mention['id'] for mention in mentions])
+                stored = [dict(mention, created_at=str(mention['created_at']))
+                          for mention in mentions]
+                self.mentions = (stored + self.mentions)[:self.max_mentions]
+            if gaps is not None:
+                self.gaps = gaps
+            # Write to a temporary file first so a crash never leaves a half-written
+            # cursor
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"since_id": self.since_id, "mentions": self.mentions,
+                           "gaps": self.gaps}, f)
+            os.replace(tmp_path, self.path)
+
+class RateLimited(tweepy.TweepError):
+    """Raised instead of calling an endpoint whose rate limit window is exhausted"""
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether a tweepy error means the rate limit was hit (HTTP 429 / error code 88)"""
+    if isinstance(error, getattr(tweepy, "RateLimitError", ())):
+        return True
+    response = getattr(error, "response", None)
+    return (getattr(response, "status_code", None) == 429
+            or getattr(error, "api_code", None) == 88)
+
+class RateLimitScheduler:
+    def __init__(self, api, posts_per_minute: float = 1.0, burst: int = 5,
+                 max_backoff: float = 900):
+        """
+        Rate-limit-aware scheduler for Twitter API calls
+        
+        Tracks each endpoint's rate limit window from the x-rate-limit-*
+        response headers. Reads are refused with a RateLimited error (which
+        says when to retry) while their window is exhausted. Posts and replies
+        go through a token bucket; when no token is available, or the endpoint
+        is limited, they are queued and sent by a background thread. HTTP 429
+        responses back off until the window resets, or exponentially if the
+        reset time is unknown.
+        
+        Args:
+            api (tweepy.API): Authenticated API client
+            posts_per_minute (float): Sustained rate for outbound posts
+            burst (int): Number of posts that may be sent back-to-back
+            max_backoff (float): Longest backoff in seconds after repeated 429s
+        """
+        self.api = api
+        self.rate = posts_per_minute / 60
+        self.capacity = burst
+        self.max_backoff = max_backoff
+        self.windows = {}
+        self.completed = deque(maxlen=50)
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._backoff_until = {}
+        self._failures = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _record_headers(self, endpoint: str):
+        response = getattr(self.api, "last_response", None)
+        headers = getattr(response, "headers", None) or {}
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is not None and reset is not None:
+            self.windows[endpoint] = {"remaining": int(remaining),
+                                      "reset": float(reset)}
+
+    def _record_rate_limit(self, endpoint: str):
+        failures = self._failures.get(endpoint, 0) + 1
+        self._failures[endpoint] = failures
+        window = self.windows.get(endpoint)
+        if window and window["reset"] > time.time():
+            delay = window["reset"] - time.time()
+        else:
+            delay = min(self.max_backoff, 15 * 2 ** (failures - 1))
+        self._backoff_until[endpoint] = time.time() + delay
+
+    def wait_time(self, endpoint: str) -> float:
+        """
+        Seconds until an endpoint may be called again
+        
+        Args:
+            endpoint (str): API endpoint name, e.g. "statuses/update"
+            
+        Returns:
+            float: 0 if the endpoint can be called now
+        """
+        now = time.time()
+        wait = self._backoff_until.get(endpoint, 0) - now
+        window = self.windows.get(endpoint)
+        if window and window["remaining"] <= 0:
+            wait = max(wait, window["reset"] - now)
+        return max(0.0, wait)
+
+    def call(self, endpoint: str, fn: Callable, *args, **kwargs):
+        """
+        Make a read call now, tracking the endpoint's rate limit
+        
+        Args:
+            endpoint (str): API endpoint name, e.g. "search/tweets"
+            fn (Callable): The API call to make
+            
+        Returns:
+            Whatever fn returns
+            
+        Raises:
+            RateLimited: If the endpoint's window is exhausted
+        """
+        wait = self.wait_time(endpoint)
+        if wait > 0:
+            metrics.increment("external_rate_limited_total", service="twitter",
+                              endpoint=endpoint)
+            raise RateLimited(f"Rate limit reached for {endpoint}; "
+                              f"try again in {wait:.0f} seconds")
+        try:
+            with metrics.timer("external_seconds", service="twitter",
+                               endpoint=endpoint):
+                result = fn(*args, **kwargs)
+        except tweepy.TweepError as e:
+            with self._cond:
+                self._record_headers(endpoint)
+                if is_rate_limit_error(e):
+                    self._record_rate_limit(endpoint)
+            raise
+        with self._cond:
+            self._record_headers(endpoint)
+            self._failures.pop(endpoint, None)
+        return result
+
+    def submit(self, endpoint: str, fn: Callable, description: str,
+               error_prefix: str) -> str:
+        """
+        Send an outbound post now if allowed, otherwise queue it
+        
+        Args:
+            endpoint (str): API endpoint name, e.g. "statuses/update"
+            fn (Callable): Makes the call and returns a status message
+            description (str): What is being sent, e.g. "tweet"
+            error_prefix (str): Prefix for non-rate-limit error messages
+            
+        Returns:
+            str: The result of the call, or where it sits in the queue and when it
+                should go out
+        """
+        with self._cond:
+            self._refill()
+            send_now = (not self._queue and self._tokens >= 1
+                        and self.wait_time(endpoint) == 0)
+            if send_now:
+                self._tokens -= 1
+        if send_now:
+            try:
+                return self.call(endpoint, fn)
+            except tweepy.TweepError as e:
+                if not is_rate_limit_error(e):
+                    return f"{error_prefix}: {str(e)}"
+        return self._enqueue(endpoint, fn, description, error_prefix)
+
+    def _enqueue(self, endpoint: str, fn: Callable, description: str,
+                 error_prefix: str) -> str:
+        with self._cond:
+            self._queue.append((endpoint, fn, description, error_prefix))
+            position = len(self._queue)
+            eta = max(self.wait_time(endpoint),
+                      max(0.0, position - self._tokens) / self.rate)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain,
+                                                name="twitter-outbox", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return (f"Rate limit reached, so the {description} was queued "
+                f"(position {position}, ETA ~{eta:.0f}s). "
+                "It will be sent automatically.")
+
+    def pending(self) -> List[str]:
+        """Descriptions of queued posts, in send order"""
+        with self._cond:
+            return [item[2] for item in self._queue]
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._thread = None
+                    return
+                endpoint = self._queue[0][0]
+                self._refill()
+                wait = self.wait_time(endpoint)
+                if self._tokens < 1:
+                    wait = max(wait, (1 - self._tokens) / self.rate)
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                self._tokens -= 1
+                endpoint, fn, description, error_prefix = self._queue.popleft()
+            try:
+                result = self.call(endpoint, fn)
+            except tweepy.TweepError as e:
+                if is_rate_limit_error(e):
+                    # Back to the front of the line; _record_rate_limit set the backoff
+                    with self._cond:
+                        self._queue.appendleft((endpoint, fn, description,
+                                                error_prefix))
+                    continue
+                result = f"{error_prefix}: {str(e)}"
+            get_renderer().status(f"Queued {description} sent: {result}")
+            self.completed.append(result)
 
 class TwitterBot:
-    def __init__(self, api_key: str, api_secret: str, access_token: str, access_token_secret: str):
-        """Initialize Twitter bot with credentials"""
+    def __init__(self, api_key: str, api_secret: str, access_token: str,
+                 access_token_secret: str, state_file: str = None):
+        """Initialize Twitter bot with credentials and its mention store"""
         auth = tweepy.OAuthHandler(api_key, api_secret)
         auth.set_access_token(access_token, access_token_secret)
         self.api = tweepy.API(auth)
+        state_file = state_file or os.environ.get("TWITTER_STATE_FILE",
+                                                  "twitter_state.json")
+        self.mention_store = MentionStore(state_file)
+        self.scheduler = RateLimitScheduler(self.api)
+        # Tweet ID -> author screen name, so replies don't need to look the tweet up
+        # first
+        self.authors = LRUCache(max_size=5000)
+        for mention in reversed(self.mention_store.mentions):
+            self.authors.put(str(mention['id']), mention['user'])
+        # One mention read at a time, so concurrent callers don't fetch the same
+        # mentions or move the cursor past each other
+        self._mentions_lock = threading.Lock()
         
     def post_tweet(self, content: str) -> str:
         """
-        Post a tweet
+        Post a tweet, or queue it if the rate limit has been reached
         
         Args:
             content (str): The content of the tweet
@@ -19,36 +330,82 @@ class TwitterBot:
         Returns:
             str: Status message about the tweet
         """
-        try:
+        def post():
             tweet = self.api.update_status(content)
             return f"Successfully posted tweet with ID: {tweet.id}"
-        except tweepy.TweepError as e:
-            return f"Error posting tweet: {str(e)}"
 
-    def read_mentions(self, count: int = 10) -> List[Dict]:
+        return self.scheduler.submit("statuses/update", post, "tweet",
+                                     "Error posting tweet")
+
+    def _page_mentions(self, limit: int, since_id: int, max_id: int = None) -> List:
+        """Up to limit mentions after since_id and up to max_id, newest first"""
+        kwargs = {"since_id": since_id, "count": 200}
+        if max_id is not None:
+            kwargs["max_id"] = max_id
+        return list(tweepy.Cursor(self.api.mentions_timeline, **kwargs).items(limit))
+
+    def read_mentions(self, count: int = 10, max_backlog: int = 800) -> List[Dict]:
         """
-        Read recent mentions
+        Read mentions that arrived since the last call
+        
+        Only mentions newer than the stored since_id cursor are fetched. After
+        downtime the backlog is paged through, up to max_backlog mentions per
+        call. If there are more, the range that wasn't reached is remembered and
+        read on the following calls, so no mention is skipped.
         
         Args:
-            count (int): Number of recent mentions to retrieve
+            count (int): Number of recent mentions to retrieve on the very first call
+            max_backlog (int): Maximum number of mentions to page through per call
             
         Returns:
-            List[Dict]: List of mention objects containing relevant information
+            List[Dict]: New mention objects, newest first
         """
-        try:
-            mentions = self.api.mentions_timeline(count=count)
-            return [{
-                'id': mention.id,
-                'text': mention.text,
-                'user': mention.user.screen_name,
-                'created_at': mention.created_at
-            } for mention in mentions]
-        except tweepy.TweepError as e:
-            return [{'error': str(e)}]
+        with self._mentions_lock:
+            try:
+                since_id = self.mention_store.since_id
+                gaps = [list(gap) for gap in self.mention_store.gaps]
+
+                def fetch():
+                    if since_id is None:
+                        return list(self.api.mentions_timeline(count=count))
+                    fetched = self._page_mentions(max_backlog, since_id)
+                    if len(fetched) >= max_backlog:
+                        gaps.append([since_id, fetched[-1].id - 1])
+                    # Older gaps get whatever this call's budget has left, newest
+                    # first
+                    for gap in sorted(gaps, key=lambda gap: gap[1], reverse=True):
+                        budget = max_backlog - len(fetched)
+                        if budget <= 0:
+                            break
+                        older = self._page_mentions(budget, *gap)
+                        fetched.extend(older)
+                        gap[1] = older[-1].id - 1 if len(older) >= budget else gap[0]
+                    return fetched
+
+                mentions = self.scheduler.call("statuses/mentions_timeline", fetch)
+                gaps = [gap for gap in gaps if gap[1] > gap[0]]
+                new_mentions = [{
+                    'id': mention.id,
+                    'text': mention.text,
+                    'user': mention.user.screen_name,
+                    'created_at': mention.created_at
+                } for mention in mentions]
+                new_mentions.sort(key=lambda mention: mention['id'], reverse=True)
+                for mention in new_mentions:
+                    self.authors.put(str(mention['id']), mention['user'])
+                changed = gaps != self.mention_store.gaps
+                self.mention_store.add(new_mentions, gaps if changed else None)
+                if gaps:
+                    get_renderer().status(
+                        f"Twitter: more than {max_backlog} mentions to catch up on; "
+                        "older ones are read on the next calls")
+                return new_mentions
+            except tweepy.TweepError as e:
+                return [{'error': str(e)}]
 
     def reply_to_tweet(self, tweet_id: str, content: str) -> str:
         """
-        Reply to a specific tweet
+        Reply to a specific tweet, or queue the reply if the rate limit has been reached
         
         Args:
             tweet_id (str): ID of the tweet to reply to
@@ -57,19 +414,64 @@ class TwitterBot:
         Returns:
             str: Status message about the reply
         """
-        try:
-            tweet = self.api.get_status(tweet_id)
-            username = tweet.user.screen_name
+        def reply():
+            username = self.authors.get(str(tweet_id))
+            if username is None:
+                tweet = self.api.get_status(tweet_id)
+                username = tweet.user.screen_name
+                self.authors.put(str(tweet_id), username)
             reply_content = f"@{username} {content}"
             
-            reply = self.api.update_status(
+            self.api.update_status(
                 status=reply_content,
                 in_reply_to_status_id=tweet_id,
                 auto_populate_reply_metadata=True
             )
             return f"Successfully replied to tweet {tweet_id}"
+
+        return self.scheduler.submit("statuses/update", reply,
+                                     f"reply to tweet {tweet_id}",
+                                     "Error replying to tweet")
+
+    def prefetch_authors(self, tweet_ids: List[str]) -> int:
+        """
+        Look up the authors of tweets that aren't cached yet, 100 per request
+        
+        Args:
+            tweet_ids (List[str]): IDs of tweets about to be replied to
+            
+        Returns:
+            int: Number of authors fetched
+        """
+        missing = list(dict.fromkeys(str(tweet_id) for tweet_id in tweet_ids
+                                     if str(tweet_id) not in self.authors))
+        # tweepy 4 renamed statuses_lookup to lookup_statuses
+        lookup = getattr(self.api, "lookup_statuses", None) or self.api.statuses_lookup
+        fetched = 0
+        for start in range(0, len(missing), 100):
+            batch = missing[start:start + 100]
+            for tweet in self.scheduler.call("statuses/lookup", lookup, batch):
+                self.authors.put(str(tweet.id), tweet.user.screen_name)
+                fetched += 1
+        return fetched
+
+    def reply_to_tweets(self, replies: List[Dict]) -> List[str]:
+        """
+        Reply to several tweets, looking up uncached authors in bulk first
+        
+        Args:
+            replies (List[Dict]): Objects with 'tweet_id' and 'content'
+            
+        Returns:
+            List[str]: Status message for each reply
+        """
+        try:
+            self.prefetch_authors([reply['tweet_id'] for reply in replies])
         except tweepy.TweepError as e:
-            return f"Error replying to tweet: {str(e)}"
+            # Replies still work without the prefetch; they fall back to single lookups
+            print(f"Error prefetching tweet authors: {str(e)}", file=sys.stderr)
+        return [self.reply_to_tweet(str(reply['tweet_id']), reply['content'])
+                for reply in replies]
 
     def search_tweets(self, query: str, count: int = 10) -> List[Dict]:
         """
@@ -83,12 +485,18 @@ class TwitterBot:
             List[Dict]: List of matching tweets
         """
         try:
-            tweets = tweepy.Cursor(self.api.search, q=query).items(count)
-            return [{
+            tweets = self.scheduler.call(
+                "search/tweets",
+                lambda: list(tweepy.Cursor(self.api.search, q=query).items(count)),
+            )
+            results = [{
                 'id': tweet.id,
                 'text': tweet.text,
                 'user': tweet.user.screen_name,
                 'created_at': tweet.created_at
             } for tweet in tweets]
+            for tweet in results:
+                self.authors.put(str(tweet['id']), tweet['user'])
+            return results
         except tweepy.TweepError as e:
             return [{'error': str(e)}]
\ No newline at end of file
@@ -0,0 +1,416 @@
+import itertools
+import sys
+import threading
+import time
+from decimal import Decimal
+from typing import Callable, List, Optional
+
+TERMINAL_STATUSES = ("complete", "failed")
+
+
+def _send_delegate(submitted):
+    # The object that carries the onchain state: the transaction, or the
+    # sponsored send of a gasless transfer (which has no transaction)
+    transaction = getattr(submitted, "transaction", None)
+    return transaction or getattr(submitted, "sponsored_send", None)
+
+
+def _status_value(status) -> str:
+    # CDP status enums don't all stringify to their value
+    return str(getattr(status, "value", status))
+
+
+def is_terminal(submitted) -> bool:
+    """
+    Check whether a submitted CDP object (Transfer, SmartContract,
+    ContractInvocation, Trade, ...) has landed onchain or failed
+
+    Args:
+        submitted: Object returned by a CDP wallet call
+
+    Returns:
+        bool: True once the transaction is complete or failed
+    """
+    if hasattr(submitted, "terminal_state"):
+        return submitted.terminal_state
+    delegate = _send_delegate(submitted)
+    if delegate is not None:
+        return delegate.terminal_state
+    if hasattr(submitted, "status"):
+        return _status_value(submitted.status) in TERMINAL_STATUSES
+    # Nothing onchain to wait for
+    return True
+
+
+def reports_status(submitted) -> bool:
+    """
+    Check whether a submitted object exposes an onchain state the watcher can
+    follow (older SDKs return faucet transactions that only carry a hash)
+
+    Args:
+        submitted: Object returned by a CDP wallet call
+
+    Returns:
+        bool: True if is_terminal can tell when it has landed
+    """
+    return (hasattr(submitted, "terminal_state")
+            or _send_delegate(submitted) is not None
+            or hasattr(submitted, "status"))
+
+
+def transaction_status(submitted) -> str:
+    """Return the CDP transaction status as a plain string"""
+    delegate = _send_delegate(submitted)
+    if delegate is not None:
+        return _status_value(delegate.status)
+    return _status_value(getattr(submitted, "status", "unknown"))
+
+
+def transaction_link(submitted) -> Optional[str]:
+    """Return the block explorer link for a submitted object, if there is one yet"""
+    try:
+        return submitted.transaction_link
+    except Exception:
+        transaction = getattr(submitted, "transaction", None)
+        return getattr(transaction, "transaction_link", None)
+
+
+def transaction_hash(submitted) -> Optional[str]:
+    """Return the transaction hash for a submitted object, if it has been broadcast"""
+    try:
+        return submitted.transaction_hash
+    except Exception:
+        transaction = getattr(submitted, "transaction", None)
+        return getattr(transaction, "transaction_hash", None)
+
+
+class PendingOperation:
+    def __init__(self, op_id: str, kind: str, description: str, submitted,
+                 on_complete: Callable = None, on_finish: Callable = None):
+        """
+        A transaction that was submitted but not yet confirmed
+
+        Args:
+            op_id (str): Handle returned to the agent
+            kind (str): Name of the tool that submitted it
+            description (str): Human readable description of the operation
+            submitted: The CDP object to poll
+            on_complete (Callable): Builds the result message from the confirmed object
+            on_finish (Callable): Called with the operation once it reaches any
+                final state
+        """
+        self.id = op_id
+        self.kind = kind
+        self.description = description
+        self.submitted = submitted
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.confirmed_at = None
+        self._on_complete = on_complete
+        self._on_finish = on_finish
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Block until the operation reaches a final state
+
+        Args:
+            timeout (float): Maximum seconds to wait, None to wait forever
+
+        Returns:
+            bool: True if the operation finished within the timeout
+        """
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str, result: str = None, error: str = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.confirmed_at = time.time()
+        if self._on_finish:
+            try:
+                self._on_finish(self)
+            except Exception as e:
+                print(f"Error in on_finish for {self.id}: {str(e)}", file=sys.stderr)
+        self._done.set()
+
+    def summary(self) -> str:
+        """One line description of the operation for the agent"""
+        if self.status == "complete":
+            detail = self.result
+        elif self.error:
+            detail = f"{self.description}: {self.error}"
+        else:
+            waited = time.time() - self.submitted_at
+            detail = f"{self.description} (waiting {waited:.0f}s)"
+        link = transaction_link(self.submitted)
+        link_msg = f" [{link}]" if link else ""
+        return f"{self.id} [{self.status}] {detail}{link_msg}"
+
+
+class TransactionWatcher:
+    def __init__(self, poll_interval: float = 1.0, timeout_seconds: float = 300):
+        """
+        Polls every in-flight transaction from a single background thread
+
+        The thread starts when the first operation is tracked and exits once
+        nothing is left in flight.
+
+        Args:
+            poll_interval (float): Seconds between polling rounds
+            timeout_seconds (float): Give up on an operation after this long
+        """
+        self.poll_interval = poll_interval
+        self.timeout_seconds = timeout_seconds
+        self._operations = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, listener: Callable):
+        """
+        Call listener(operation) whenever any tracked operation reaches a final state
+
+        Args:
+            listener (Callable): Called from the watcher thread with the finished
+                PendingOperation
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, operation: PendingOperation):
+        for listener in self._listeners:
+            try:
+                listener(operation)
+            except Exception as e:
+                print(f"Error in watcher listener for {operation.id}: {str(e)}",
+                      file=sys.stderr)
+
+    def track(self, kind: str, submitted, description: str,
+              on_complete: Callable = None,
+              on_finish: Callable = None) -> PendingOperation:
+        """
+        Start watching a submitted transaction
+
+        Args:
+            kind (str): Name of the tool that submitted it
+            submitted: The CDP object returned by the wallet call
+            description (str): Human readable description of the operation
+            on_complete (Callable): Builds the result message from the confirmed object
+            on_finish (Callable): Called with the operation once it reaches any
+                final state
+
+        Returns:
+            PendingOperation: Handle for the operation
+        """
+        with self._lock:
+            operation = PendingOperation(f"op-{next(self._ids)}", kind, description,
+                                         submitted, on_complete, on_finish)
+            self._operations[operation.id] = operation
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="tx-watcher",
+                                                daemon=True)
+                self._thread.start()
+        return operation
+
+    def get(self, op_id: str) -> Optional[PendingOperation]:
+        """Look up an operation by ID"""
+        return self._operations.get(op_id)
+
+    def operations(self) -> List[PendingOperation]:
+        """All tracked operations, oldest first"""
+        with self._lock:
+            return list(self._operations.values())
+
+    def in_flight(self) -> List[PendingOperation]:
+        """Operations that have not reached a final state"""
+        return [op for op in self.operations() if not op.done]
+
+    def wait(self, operations: List[PendingOperation] = None,
+             timeout: float = None) -> bool:
+        """
+        Wait for several operations at once
+
+        Args:
+            operations (List[PendingOperation]): Operations to wait for, defaults to
+                all in flight
+            timeout (float): Maximum seconds to wait in total
+
+        Returns:
+            bool: True if every operation finished within the timeout
+        """
+        operations = self.in_flight() if operations is None else operations
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for operation in operations:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            if not operation.wait(remaining):
+                return False
+        return True
+
+    def _run(self):
+        while True:
+            in_flight = self.in_flight()
+            if not in_flight:
+                with self._lock:
+                    # Re-check under the lock so a concurrent track() can't be missed
+                    if not any(not op.done for op in self._operations.values()):
+                        self._thread = None
+                        return
+                continue
+            for operation in in_flight:
+                self._poll(operation)
+            time.sleep(self.poll_interval)
+
+    def _poll(self, operation: PendingOperation):
+        submitted = operation.submitted
+        try:
+            if not is_terminal(submitted):
+                submitted.reload()
+            terminal = is_terminal(submitted)
+            failed = terminal and transaction_status(submitted) == "failed"
+        except Exception as e:
+            # Transient API errors are retried on the next round until the timeout
+            operation.error = str(e)
+            terminal = False
+        if terminal:
+            if failed:
+                operation._finish("failed", error="transaction failed onchain")
+            else:
+                operation._finish("complete", result=self._complete_result(operation))
+            self._notify(operation)
+            return
+        if time.time() - operation.submitted_at > self.timeout_seconds:
+            error = f"not confirmed after {self.timeout_seconds:.0f} seconds"
+            operation._finish("timeout", error=error)
+            self._notify(operation)
+
+    @staticmethod
+    def _complete_result(operation: PendingOperation) -> str:
+        # The transaction has landed whatever on_complete does, so its errors are
+        # reported in the result instead of being retried as if it were pending
+        if not operation._on_complete:
+            return operation.description
+        try:
+            return operation._on_complete(operation.submitted)
+        except Exception as e:
+            return (f"{operation.description} confirmed onchain, but recording the "
+                    f"result failed: {str(e)}")
+
+
+class CoalescedTransfer:
+    def __init__(self, asset_id: str, destination: str):
+        """
+        Transfers of one asset to one address that are sent as a single transaction
+
+        Args:
+            asset_id (str): Asset being sent
+            destination (str): Recipient address
+        """
+        self.asset_id = asset_id
+        self.destination = destination
+        self.amounts = []
+        self.submitted = None
+        self.error = None
+        self._sent = threading.Event()
+        self._lock = threading.Lock()
+        self._shared = {}
+
+    @property
+    def total(self) -> Decimal:
+        return sum((Decimal(str(amount)) for amount in self.amounts), Decimal(0))
+
+    @property
+    def count(self) -> int:
+        return len(self.amounts)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the merged transfer has been submitted (or failed to submit)"""
+        return self._sent.wait(timeout)
+
+    def once(self, name: str, fn: Callable):
+        """
+        Run fn the first time name is asked for and give every caller the same outcome
+
+        Used so the merged transaction is confirmed (or tracked) once, no
+        matter how many callers joined it. An exception is shared the same way.
+        """
+        with self._lock:
+            if name not in self._shared:
+                try:
+                    self._shared[name] = (fn(), None)
+                except Exception as e:
+                    self._shared[name] = (None, e)
+            result, error = self._shared[name]
+        if error is not None:
+            raise error
+        return result
+
+
+class TransferCoalescer:
+    def __init__(self, send: Callable, window_seconds: float = 2.0):
+        """
+        Merges transfers of the same asset to the same address made close together
+
+        The first transfer for an (asset, destination) pair opens a group and
+        waits window_seconds; transfers to the same pair arriving meanwhile
+        join it. The group is then sent as one transfer of the summed amount,
+        and every caller gets the same CoalescedTransfer back.
+
+        Args:
+            send (Callable): send(amount, asset_id, destination) submits one transfer
+                and returns the CDP object
+            window_seconds (float): How long a group stays open
+        """
+        self.send = send
+        self.window_seconds = window_seconds
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def is_open(self, asset_id: str, destination: str) -> bool:
+        """Whether a transfer to this pair would join a group that hasn't been sent"""
+        with self._lock:
+            return (asset_id.lower(), destination.lower()) in self._open
+
+    def transfer(self, amount, asset_id: str, destination: str) -> CoalescedTransfer:
+        """
+        Add a transfer and block until the group it joined has been submitted
+
+        Args:
+            amount (Union[int, float, Decimal]): Amount to send
+            asset_id (str): Asset to send
+            destination (str): Recipient address
+
+        Returns:
+            CoalescedTransfer: The group, with submitted set, or error set if sending
+                failed
+        """
+        key = (asset_id.lower(), destination.lower())
+        with self._lock:
+            group = self._open.get(key)
+            leader = group is None
+            if leader:
+                group = self._open[key] = CoalescedTransfer(asset_id, destination)
+            group.amounts.append(amount)
+        if not leader:
+            group.wait()
+            return group
+
+        time.sleep(self.window_seconds)
+        with self._lock:
+            # Closed: later transfers to this pair start a new group
+            del self._open[key]
+        try:
+            group.submitted = self.send(group.total, group.asset_id, group.destination)
+        except Exception as e:
+            group.error = e
+        finally:
+            group._sent.set()
+        return group
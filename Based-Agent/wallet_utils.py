@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from decimal import Decimal
+
+from metrics_utils import metrics
+from render_utils import get_renderer
+
+# Defaults for the agent's persisted wallet. Each can be overridden with an
+# environment variable so different deployments don't need to edit this file.
+DEFAULT_API_KEY_FILE = "./Based-Agent/cdp_api_key.json"
+DEFAULT_WALLET_ID = "9dfbb57e-888e-4d64-96ae-70699c0a7b7c"
+DEFAULT_SEED_FILE = "wallet_seed.json"
+
+# Wallet methods that submit transactions; their latency is recorded as
+# submit time, separately from the wait for confirmation.
+SUBMIT_METHODS = {
+    "transfer", "deploy_token", "deploy_nft", "invoke_contract", "trade", "faucet",
+}
+
+
+class LazyWallet:
+    def __init__(self, api_key_file: str = None, wallet_id: str = None,
+                 seed_file: str = None):
+        """
+        Wallet handle that connects to CDP on first use
+
+        Nothing is imported or fetched until an attribute of the wallet is
+        accessed, so importing the agent (e.g. to read its tool schemas) stays
+        cheap and works without network access or credentials.
+
+        Args:
+            api_key_file (str): Path to the CDP API key JSON file
+            wallet_id (str): ID of the wallet to fetch
+            seed_file (str): Path to the saved wallet seed
+        """
+        self._lock = threading.Lock()
+        self._wallet = None
+        self.configure(api_key_file, wallet_id, seed_file)
+
+    def configure(self, api_key_file: str = None, wallet_id: str = None,
+                  seed_file: str = None):
+        """
+        Point the handle at a (possibly different) wallet
+
+        Any existing connection is dropped; the next access reconnects.
+
+        Args:
+            api_key_file (str): Path to the CDP API key JSON file
+            wallet_id (str): ID of the wallet to fetch
+            seed_file (str): Path to the saved wallet seed
+        """
+        env = os.environ
+        api_key_file = api_key_file or env.get("CDP_API_KEY_FILE", DEFAULT_API_KEY_FILE)
+        wallet_id = wallet_id or env.get("CDP_WALLET_ID", DEFAULT_WALLET_ID)
+        seed_file = seed_file or env.get("CDP_WALLET_SEED_FILE", DEFAULT_SEED_FILE)
+        with self._lock:
+            self.api_key_file = api_key_file
+            self.wallet_id = wallet_id
+            self.seed_file = seed_file
+            self._wallet = None
+
+    @property
+    def connected(self) -> bool:
+        """Whether the wallet has been fetched yet"""
+        return self._wallet is not None
+
+    def get(self):
+        """
+        Return the underlying CDP wallet, connecting if needed
+
+        Returns:
+            Wallet: The fetched wallet with its seed loaded
+        """
+        wallet = self._wallet
+        if wallet is None:
+            with self._lock:
+                if self._wallet is None:
+                    self._wallet = self._connect()
+                wallet = self._wallet
+        return wallet
+
+    def _connect(self):
+        # Imported here: the CDP SDK alone takes seconds to import
+        from cdp import Cdp, Wallet
+
+        # This loads the API key from a JSON file. Make sure this file exists and
+        # contains valid credentials.
+        Cdp.configure_from_json(self.api_key_file)
+
+        # WARNING: This is for development only - implement secure storage in
+        # production!
+        wallet = Wallet.fetch(self.wallet_id)
+        wallet.load_seed(self.seed_file)
+        address = wallet.default_address.address_id
+        get_renderer().status(f"Agent wallet address: {address}")
+        return wallet
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined above, i.e. the wallet's own API
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attribute = getattr(self.get(), name)
+        if name not in SUBMIT_METHODS:
+            return attribute
+
+        def submit(*args, **kwargs):
+            with metrics.timer("submit_seconds", method=name):
+                return attribute(*args, **kwargs)
+
+        return submit
+
+    def __repr__(self) -> str:
+        state = "connected" if self.connected else "not connected"
+        return f"<LazyWallet {self.wallet_id} ({state})>"
+
+
+class BalanceCache:
+    def __init__(self, ttl_seconds: float = None):
+        """
+        Per-wallet, per-asset balance cache with a time-to-live
+
+        Tools that move funds adjust the cached value optimistically when they
+        submit a transaction and invalidate it once the transaction settles, so
+        the next read after a write goes back to CDP.
+
+        Args:
+            ttl_seconds (float): How long a fetched balance is trusted
+                (BALANCE_CACHE_TTL, default 30)
+        """
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get("BALANCE_CACHE_TTL", "30"))
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _wallet_key(wallet) -> str:
+        # LazyWallet knows its ID without connecting; a CDP Wallet exposes .id
+        return getattr(wallet, "wallet_id", None) or wallet.id
+
+    def get(self, wallet, asset_id: str) -> Decimal:
+        """
+        Return the wallet's balance of an asset, fetching it on a miss
+
+        Args:
+            wallet: The wallet to read
+            asset_id (str): Asset identifier or contract address
+
+        Returns:
+            Decimal: The balance
+        """
+        key = (self._wallet_key(wallet), asset_id.lower())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                metrics.increment("balance_cache_total", result="hit")
+                return entry[0]
+            self.misses += 1
+        metrics.increment("balance_cache_total", result="miss")
+
+        with metrics.timer("balance_fetch_seconds"):
+            balance = wallet.balance(asset_id)
+        with self._lock:
+            self._entries[key] = (balance, time.monotonic())
+        return balance
+
+    def adjust(self, wallet, asset_id: str, delta):
+        """
+        Optimistically apply a pending change to a cached balance
+
+        Nothing happens if the balance isn't cached; the next read fetches it.
+
+        Args:
+            wallet: The wallet that changed
+            asset_id (str): Asset identifier or contract address
+            delta (Union[int, float, Decimal]): Amount to add (negative for spends)
+        """
+        key = (self._wallet_key(wallet), asset_id.lower())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0] + Decimal(str(delta)), entry[1])
+
+    def invalidate(self, wallet, *asset_ids: str):
+        """
+        Drop cached balances so the next read goes to CDP
+
+        Args:
+            wallet: The wallet whose balances changed
+            *asset_ids (str): Assets to drop; all of the wallet's assets if none are
+                given
+        """
+        wallet_key = self._wallet_key(wallet)
+        assets = {asset_id.lower() for asset_id in asset_ids}
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == wallet_key and (not assets or key[1] in assets):
+                    del self._entries[key]
+
+    def invalidate_when_changed(self, wallet, asset_id: str, previous,
+                                timeout_seconds: float = 300,
+                                poll_interval: float = 5) -> threading.Thread:
+        """
+        Poll a balance in the background and refresh the cached value once it
+        differs from previous
+
+        For changes with no transaction to watch. The entry is dropped if the
+        balance hasn't moved after timeout_seconds.
+
+        Args:
+            wallet: The wallet that is about to change
+            asset_id (str): Asset identifier or contract address
+            previous (Decimal): The balance before the change
+            timeout_seconds (float): How long to keep polling
+            poll_interval (float): Seconds between reads
+
+        Returns:
+            threading.Thread: The polling thread
+        """
+        key = (self._wallet_key(wallet), asset_id.lower())
+
+        def poll():
+            deadline = time.monotonic() + timeout_seconds
+            while time.monotonic() < deadline:
+                time.sleep(poll_interval)
+                try:
+                    balance = wallet.balance(asset_id)
+                except Exception:
+                    # Transient errors are retried on the next round
+                    continue
+                if balance != previous:
+                    with self._lock:
+                        self._entries[key] = (balance, time.monotonic())
+                    return
+            self.invalidate(wallet, asset_id)
+
+        thread = threading.Thread(target=poll, name="balance-poll", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        """Hit and miss counts for the cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+            }